@@ -32,6 +32,7 @@ if __name__ == "__main__":
         description="Default blueprints for stacker",
         long_description=read("README.rst"),
         packages=find_packages(),
+        package_data={"stacker_blueprints": ["engines.json"]},
         install_requires=install_requires,
         tests_require=tests_require,
         test_suite="nose.collector",
@@ -2,20 +2,601 @@ import copy
 
 from troposphere import (
     Ref, FindInMap, Not, Equals, And, Condition, Join, ec2, autoscaling,
-    If, GetAtt
+    If, GetAtt, Select, Base64, Output
 )
 from troposphere import elasticloadbalancing as elb
-from troposphere.autoscaling import Tag as ASTag
+from troposphere import elasticloadbalancingv2 as elbv2
+from troposphere import iam, sqs as sqs_resources
+from troposphere.autoscaling import Tag as ASTag, StepAdjustments
+from troposphere.cloudwatch import Alarm, MetricDimension
+from troposphere.policies import (
+    AutoScalingCreationPolicy, AutoScalingRollingUpdate, CreationPolicy,
+    ResourceSignal, UpdatePolicy
+)
 from troposphere.route53 import RecordSetType
 
+from awacs import sns, sqs
+from awacs.aws import Allow, Policy, Statement
+from awacs.helpers.trust import make_simple_assume_statement
+
 from stacker.blueprints.base import Blueprint
 
+from . import compat
+from .compat import basestring
+from .launch_template import (
+    create_autoscaling_group,
+    create_placement_group,
+    enhanced_networking_pattern,
+    requires_enhanced_networking,
+    validate_enhanced_networking,
+)
+from .load_balancer import (
+    classic_elb_parameters,
+    classic_elb_properties,
+    create_classic_elb_conditions,
+)
+from .util import boolean
+
 CLUSTER_SG_NAME = "%sSG"
 ELB_SG_NAME = "%sElbSG"
 ELB_NAME = "%sLoadBalancer"
+TARGET_GROUP_NAME = "%sTargetGroup"
+ASG_NAME = "%sASG"
+QUEUE_NAME = "%sQueue"
+SCALING_POLICY_NAME = "%s%sScalingPolicy"
+SCALING_ALARM_NAME = "%s%sAlarm"
+# How step scaling policies aggregate the metric their alarm is on.
+METRIC_AGGREGATION_TYPES = ("Minimum", "Maximum", "Average")
+SCHEDULED_ACTION_NAME = "%s%sScheduledAction"
+SCHEDULED_ACTION_SIZES = ("MinSize", "MaxSize", "DesiredCapacity")
+LIFECYCLE_HOOK_NAME = "%s%sLifecycleHook"
+LIFECYCLE_HOOK_ROLE = "%sLifecycleHookRole"
+WARM_POOL_NAME = "%sWarmPool"
+
+LIFECYCLE_TRANSITIONS = {
+    "launching": "autoscaling:EC2_INSTANCE_LAUNCHING",
+    "terminating": "autoscaling:EC2_INSTANCE_TERMINATING",
+}
+LIFECYCLE_RESULTS = ("CONTINUE", "ABANDON")
+WARM_POOL_STATES = ("Stopped", "Running", "Hibernated")
+TERMINATION_POLICIES = [
+    "Default",
+    "AllocationStrategy",
+    "OldestLaunchTemplate",
+    "OldestLaunchConfiguration",
+    "ClosestToNextInstanceHour",
+    "NewestInstance",
+    "OldestInstance",
+]
+
+LOAD_BALANCER_TYPES = ("classic", "application", "network")
+# LoadBalancer settings a classic ELB can't use, it's tuned by the ELB*
+# parameters instead.
+LOAD_BALANCER_V2_SETTINGS = (
+    "Listeners", "TargetPort", "TargetProtocol", "HealthCheck", "SlowStart",
+    "DeregistrationDelay", "Http2", "IdleTimeout", "CrossZone", "ElasticIPs",
+    "AZCount",
+)
+LISTENER_PROTOCOLS = {
+    "application": ("HTTP", "HTTPS"),
+    "network": ("TCP", "TLS", "UDP", "TCP_UDP"),
+}
+SECURE_PROTOCOLS = ("HTTPS", "TLS")
+HEALTH_CHECK_DEFAULTS = {
+    "application": {
+        "Protocol": "HTTP",
+        "Path": "/",
+        "Port": "traffic-port",
+        "Interval": 10,
+        "Timeout": 5,
+        "HealthyThreshold": 3,
+        "UnhealthyThreshold": 3,
+    },
+    "network": {
+        "Protocol": "TCP",
+        "Port": "traffic-port",
+        "Interval": 10,
+        "HealthyThreshold": 3,
+        "UnhealthyThreshold": 3,
+    },
+}
+
+PREDEFINED_METRICS = (
+    "ASGAverageCPUUtilization",
+    "ASGAverageNetworkIn",
+    "ASGAverageNetworkOut",
+    "ALBRequestCountPerTarget",
+)
+
+# Processes that could replace or add instances behind the back of a rolling
+# update that is waiting on their signals.
+SUSPENDED_DURING_UPDATE = [
+    "HealthCheck",
+    "ReplaceUnhealthy",
+    "AZRebalance",
+    "AlarmNotification",
+    "ScheduledActions",
+]
+
+
+def health_check_parameters():
+    """Returns the CloudFormation parameters for a group's health checks,
+    termination policies and metrics."""
+    return {
+        "HealthCheckType": {
+            "type": "String",
+            "description": "EC2 to replace instances that fail EC2 status "
+                           "checks, or ELB to also replace those failing the "
+                           "load balancer's health check. Defaults to ELB "
+                           "when the group is behind a load balancer.",
+            "allowed_values": ["", "EC2", "ELB"],
+            "default": ""},
+        "HealthCheckGracePeriod": {
+            "type": "Number",
+            "description": "Seconds after an instance launches before its "
+                           "health is checked.",
+            "default": "300"},
+        "TerminationPolicies": {
+            "type": "CommaDelimitedList",
+            "description": "The order to pick instances to terminate in when "
+                           "scaling in. Any of %s." % ", ".join(
+                               TERMINATION_POLICIES),
+            "default": "Default"},
+        "GroupMetrics": {
+            "type": "String",
+            "description": "Send the group's metrics to CloudWatch every "
+                           "minute.",
+            "allowed_values": ["true", "false"],
+            "default": "true"},
+    }
+
+
+def create_health_check_conditions(template):
+    template.add_condition(
+        "UseDefaultHealthCheckType",
+        Equals(Ref("HealthCheckType"), ""))
+    template.add_condition(
+        "CollectGroupMetrics",
+        Equals(Ref("GroupMetrics"), "true"))
+
+
+def health_check_properties(default_health_check_type="EC2"):
+    """Returns a group's health check, termination and metrics properties.
+
+    Args:
+        default_health_check_type (str, optional): The HealthCheckType to use
+            when the parameter isn't given.
+
+    Returns:
+        dict: Properties for an AutoScalingGroup.
+    """
+    return {
+        "HealthCheckType": If("UseDefaultHealthCheckType",
+                              default_health_check_type,
+                              Ref("HealthCheckType")),
+        "HealthCheckGracePeriod": Ref("HealthCheckGracePeriod"),
+        "TerminationPolicies": Ref("TerminationPolicies"),
+        "MetricsCollection": If(
+            "CollectGroupMetrics",
+            [autoscaling.MetricsCollection(Granularity="1Minute")],
+            Ref("AWS::NoValue")),
+    }
+
+
+def create_scheduled_actions(template, asg_name, schedules):
+    """Adds ScheduledActions that resize an autoscaling group.
+
+    Args:
+        template (:class:`troposphere.Template`): The template to add the
+            actions to.
+        asg_name (str): The name of the AutoScalingGroup resource.
+        schedules (list): A list of dicts, each with a Name, a cron
+            Recurrence (in UTC) and at least one of MinSize, MaxSize and
+            DesiredCapacity. StartTime & EndTime are optional.
+    """
+    for schedule in schedules:
+        name = schedule.get("Name")
+        if not name:
+            raise ValueError("Scheduled actions need a Name.")
+        recurrence = schedule.get("Recurrence")
+        if recurrence and len(recurrence.split()) != 5:
+            raise ValueError("Recurrence for scheduled action %s must be a "
+                             "5 field cron expression." % name)
+        if not (recurrence or schedule.get("StartTime")):
+            raise ValueError("Scheduled action %s needs a Recurrence or a "
+                             "StartTime." % name)
+        sizes = dict((k, schedule[k]) for k in SCHEDULED_ACTION_SIZES
+                     if k in schedule)
+        if not sizes:
+            raise ValueError("Scheduled action %s needs at least one of %s." %
+                             (name, ", ".join(SCHEDULED_ACTION_SIZES)))
+        for attr in ("Recurrence", "StartTime", "EndTime"):
+            if attr in schedule:
+                sizes[attr] = schedule[attr]
+        template.add_resource(autoscaling.ScheduledAction(
+            SCHEDULED_ACTION_NAME % (asg_name, name),
+            AutoScalingGroupName=Ref(asg_name),
+            **sizes))
+
+
+def lifecycle_hook_policy(targets):
+    return Policy(
+        Statement=[
+            Statement(
+                Effect=Allow,
+                Resource=targets,
+                Action=[sqs.SendMessage, sqs.GetQueueUrl, sns.Publish])])
+
+
+def create_lifecycle_hooks(template, asg_name, hooks):
+    """Adds LifecycleHooks that hold instances as they launch or terminate.
+
+    Instances wait in a pending (or terminating) state until something calls
+    complete-lifecycle-action for them, or HeartbeatTimeout passes.
+
+    Args:
+        template (:class:`troposphere.Template`): The template to add the
+            hooks to.
+        asg_name (str): The name of the AutoScalingGroup resource.
+        hooks (list): A list of dicts, each with a Name and a Transition of
+            launching or terminating. Target, the ARN of an SQS queue or SNS
+            topic, is notified of each instance, using a role created for the
+            group unless RoleARN is given. HeartbeatTimeout (default: 300),
+            DefaultResult (default: CONTINUE) & NotificationMetadata are
+            optional.
+    """
+    role = LIFECYCLE_HOOK_ROLE % asg_name
+    role_targets = []
+    for hook in hooks:
+        name = hook.get("Name")
+        if not name:
+            raise ValueError("Lifecycle hooks need a Name.")
+        try:
+            transition = LIFECYCLE_TRANSITIONS[hook.get("Transition")]
+        except KeyError:
+            raise ValueError("Transition for lifecycle hook %s must be one "
+                             "of %s." % (name, ", ".join(
+                                 sorted(LIFECYCLE_TRANSITIONS))))
+        result = hook.get("DefaultResult", "CONTINUE")
+        if result not in LIFECYCLE_RESULTS:
+            raise ValueError("DefaultResult for lifecycle hook %s must be one "
+                             "of %s." % (name, ", ".join(LIFECYCLE_RESULTS)))
+        attrs = {
+            "AutoScalingGroupName": Ref(asg_name),
+            "LifecycleTransition": transition,
+            "HeartbeatTimeout": hook.get("HeartbeatTimeout", 300),
+            "DefaultResult": result,
+        }
+        if "NotificationMetadata" in hook:
+            attrs["NotificationMetadata"] = hook["NotificationMetadata"]
+        if "Target" in hook:
+            attrs["NotificationTargetARN"] = hook["Target"]
+            if "RoleARN" in hook:
+                attrs["RoleARN"] = hook["RoleARN"]
+            else:
+                attrs["RoleARN"] = GetAtt(role, "Arn")
+                role_targets.append(hook["Target"])
+        template.add_resource(compat.LifecycleHook(
+            LIFECYCLE_HOOK_NAME % (asg_name, name), **attrs))
+
+    if role_targets:
+        template.add_resource(iam.Role(
+            role,
+            AssumeRolePolicyDocument=Policy(
+                Statement=[make_simple_assume_statement(
+                    "autoscaling.amazonaws.com")]),
+            Path="/",
+            Policies=[
+                iam.Policy(
+                    PolicyName="lifecycle-hook-notifications",
+                    PolicyDocument=lifecycle_hook_policy(role_targets))]))
+
+
+def create_warm_pool(template, asg_name, settings, mixed_instances=None):
+    """Adds a WarmPool of pre-initialized instances for a group to scale
+    out into.
+
+    Args:
+        template (:class:`troposphere.Template`): The template to add the
+            warm pool to.
+        asg_name (str): The name of the AutoScalingGroup resource.
+        settings (dict): PoolState (Stopped, Running or Hibernated, default:
+            Stopped), optionally MinSize, MaxGroupPreparedCapacity and
+            ReuseOnScaleIn. Hibernated pools need the launch template's
+            Hibernation option.
+        mixed_instances (dict, optional): The group's MixedInstancesPolicy,
+            which warm pools can't be used with.
+    """
+    if mixed_instances:
+        raise ValueError("Warm pools can't be used with a "
+                         "MixedInstancesPolicy.")
+    state = settings.get("PoolState", "Stopped")
+    if state not in WARM_POOL_STATES:
+        raise ValueError("PoolState must be one of %s." %
+                         ", ".join(WARM_POOL_STATES))
+    attrs = {
+        "AutoScalingGroupName": Ref(asg_name),
+        "PoolState": state,
+    }
+    for attr in ("MinSize", "MaxGroupPreparedCapacity"):
+        if attr in settings:
+            attrs[attr] = settings[attr]
+    if "ReuseOnScaleIn" in settings:
+        attrs["InstanceReusePolicy"] = compat.InstanceReusePolicy(
+            ReuseOnScaleIn=boolean(settings["ReuseOnScaleIn"]))
+    template.add_resource(compat.WarmPool(
+        WARM_POOL_NAME % asg_name, **attrs))
+
+
+def metric_stat_query(query_id, namespace, metric_name, dimensions, stat):
+    """Returns a metric math query for a single metric, whose data is only
+    used by other queries."""
+    return compat.TargetTrackingMetricDataQuery(
+        Id=query_id,
+        MetricStat=compat.TargetTrackingMetricStat(
+            Metric=compat.TargetTrackingMetric(
+                Namespace=namespace,
+                MetricName=metric_name,
+                Dimensions=[compat.MetricDimension(Name=k, Value=v)
+                            for k, v in sorted(dimensions.items())]),
+            Stat=stat),
+        ReturnData=False)
+
+
+def _validate_percent(settings, name):
+    percent = int(settings.get("MinSuccessfulInstancesPercent", 100))
+    if not 0 <= percent <= 100:
+        raise ValueError("%s MinSuccessfulInstancesPercent must be between 0 "
+                         "and 100." % name)
+
+
+def rolling_update_policy(settings):
+    """Builds an UpdatePolicy that replaces an autoscaling group's instances
+    in batches whenever its launch template changes.
+
+    Args:
+        settings (dict): MaxBatchSize, MinInstancesInService, PauseTime (ie:
+            PT5M), WaitOnResourceSignals, MinSuccessfulInstancesPercent and
+            SuspendProcesses. When waiting on signals, SuspendProcesses
+            defaults to :data:`SUSPENDED_DURING_UPDATE`.
+
+    Returns:
+        :class:`troposphere.policies.UpdatePolicy`: The policy.
+    """
+    attrs = dict(settings)
+    _validate_percent(attrs, "RollingUpdate")
+    if boolean(attrs.get("WaitOnResourceSignals", False)):
+        attrs.setdefault("SuspendProcesses", list(SUSPENDED_DURING_UPDATE))
+    return UpdatePolicy(
+        AutoScalingRollingUpdate=AutoScalingRollingUpdate(**attrs))
+
+
+def creation_policy(settings, count):
+    """Builds a CreationPolicy that waits for instances to signal they booted.
+
+    Args:
+        settings (dict): Timeout (default: PT15M), optionally Count and
+            MinSuccessfulInstancesPercent.
+        count: The number of signals to wait for when settings has no Count,
+            usually the group's MinSize.
+
+    Returns:
+        :class:`troposphere.policies.CreationPolicy`: The policy.
+    """
+    _validate_percent(settings, "CreationPolicy")
+    policy = {
+        "ResourceSignal": ResourceSignal(
+            Count=settings.get("Count", count),
+            Timeout=settings.get("Timeout", "PT15M")),
+    }
+    if "MinSuccessfulInstancesPercent" in settings:
+        policy["AutoScalingCreationPolicy"] = AutoScalingCreationPolicy(
+            MinSuccessfulInstancesPercent=settings[
+                "MinSuccessfulInstancesPercent"])
+    return CreationPolicy(**policy)
+
+
+def signals_required(rolling_update, creation):
+    """Returns True if instances need to signal CloudFormation on boot."""
+    return bool(creation) or boolean(
+        rolling_update.get("WaitOnResourceSignals", False))
+
+
+def cfn_signal(resource, check):
+    """Returns a script signalling a resource with the exit status of a
+    readiness check.
+
+    The script is a list of strings to Join. It runs cfn-signal, so it needs
+    cfn-bootstrap on the instance's image. Without it no signal is sent, and
+    the stack waits out the policy's Timeout before failing.
+
+    Args:
+        resource (str): The autoscaling group to signal.
+        check (str): Shell commands that exit 0 once the instance is ready,
+            ie: polling the app's health check until it passes.
+    """
+    if not check:
+        raise ValueError("Instances of %s wait on signals, which needs a "
+                         "SignalCheck telling when they're ready." % resource)
+    return ["(\n", check, "\n)\n",
+            "cfn-signal -e $? --stack ", Ref("AWS::StackName"),
+            " --resource ", resource, " --region ", Ref("AWS::Region"), "\n"]
 
 
 class AutoscalingGroup(Blueprint):
+    LOCAL_PARAMETERS = {
+        # A list of target tracking policies, ie:
+        #   - Name: CPU
+        #     PredefinedMetric: ASGAverageCPUUtilization
+        #     TargetValue: 50
+        #   - Name: Backlog
+        #     CustomMetric:
+        #       MetricName: ApproximateNumberOfMessagesVisible
+        #       Namespace: AWS/SQS
+        #       Statistic: Average
+        #       Dimensions:
+        #         QueueName: jobs
+        #     TargetValue: 100
+        #     DisableScaleIn: true
+        # ALBRequestCountPerTarget also needs a ResourceLabel, unless the
+        # LoadBalancer is an application load balancer, which is then used.
+        "TargetTrackingPolicies": {
+            "type": list,
+            "default": [],
+        },
+        # A list of step scaling policies, each triggered by a CloudWatch
+        # alarm on the given metric, ie:
+        #   - Name: HighCPU
+        #     MetricName: CPUUtilization
+        #     ComparisonOperator: GreaterThanOrEqualToThreshold
+        #     Threshold: 70
+        #     Steps:
+        #       - {LowerBound: 0, UpperBound: 20, Adjustment: 1}
+        #       - {LowerBound: 20, Adjustment: 2}
+        # The alarm defaults to the group's average over 2 periods of 60
+        # seconds in the AWS/EC2 namespace. Its Statistic can be any
+        # CloudWatch statistic, but the policy's MetricAggregationType
+        # (default: Average) can only be Minimum, Maximum or Average.
+        "StepScalingPolicies": {
+            "type": list,
+            "default": [],
+        },
+        # A list of scheduled changes to the group's size, ie:
+        #   - Name: WeekdayPeak
+        #     Recurrence: "0 13 * * 1-5"
+        #     MinSize: 10
+        #     DesiredCapacity: 10
+        # See create_scheduled_actions.
+        "ScheduledActions": {
+            "type": list,
+            "default": [],
+        },
+        # Launch from a mix of instance types and spot instances, ie:
+        #   InstanceTypes: [c5.large, c5a.large, m5.large]
+        #   OnDemandBaseCapacity: 1
+        #   OnDemandPercentageAboveBaseCapacity: 25
+        #   SpotAllocationStrategy: capacity-optimized
+        # See stacker_blueprints.launch_template.mixed_instances_policy.
+        "MixedInstancesPolicy": {
+            "type": dict,
+            "default": {},
+        },
+        # Launch template settings that launch configurations lack, ie:
+        #   EbsOptimized: true
+        #   DetailedMonitoring: true
+        #   MetadataOptions:
+        #     HttpTokens: required
+        #   PlacementGroup: my-group
+        #   Tenancy: dedicated
+        #   Hibernation: true
+        # See stacker_blueprints.launch_template.launch_template_data.
+        "LaunchTemplateOptions": {
+            "type": dict,
+            "default": {},
+        },
+        # The load balancer created when ELBHostName is given. Defaults to a
+        # classic ELB. An application or network load balancer can be used
+        # instead, ie:
+        #   Type: application
+        #   Listeners:
+        #     - {Port: 80, Protocol: HTTP}
+        #     - {Port: 443, Protocol: HTTPS}
+        #   TargetPort: 8080
+        #   TargetProtocol: HTTP
+        #   HealthCheck:
+        #     Path: /health
+        #     Interval: 10
+        #     HealthyThreshold: 2
+        #   SlowStart: 30
+        #   DeregistrationDelay: 30
+        #   Http2: true
+        # Secure listeners use the ELBCertName certificate. Network load
+        # balancers keep a static IP in each AZ; set ElasticIPs & AZCount to
+        # give them Elastic IPs instead. Only Type applies to a classic ELB,
+        # which is tuned by the ELB* parameters, and those parameters don't
+        # apply to application or network load balancers.
+        "LoadBalancer": {
+            "type": dict,
+            "default": {},
+        },
+        # Replace instances in batches when the launch template changes, ie:
+        #   MaxBatchSize: 2
+        #   MinInstancesInService: 2
+        #   PauseTime: PT10M
+        #   WaitOnResourceSignals: true
+        # See stacker_blueprints.asg.rolling_update_policy.
+        "RollingUpdate": {
+            "type": dict,
+            "default": {},
+        },
+        # Wait for instances to signal they booted before the group is
+        # created, ie:
+        #   Timeout: PT15M
+        # Count defaults to MinSize. When instances need to signal, a user
+        # data script runs SignalCheck and signals its exit status, unless
+        # the launch configuration already has UserData, which should then
+        # signal itself.
+        "CreationPolicy": {
+            "type": dict,
+            "default": {},
+        },
+        # Shell commands that exit 0 once an instance is ready, ie:
+        #   timeout 300 sh -c 'until curl -sf localhost/health; do sleep 5;
+        #   done'
+        # Needed when the CreationPolicy or RollingUpdate waits on signals,
+        # which are sent with its exit status. They're sent by cfn-signal,
+        # so the image needs cfn-bootstrap installed, or the stack waits out
+        # the Timeout and fails.
+        "SignalCheck": {
+            "type": str,
+            "default": "",
+        },
+        # Hold instances as they launch or terminate, ie: to warm caches
+        # before they take traffic, ie:
+        #   - Name: Warmup
+        #     Transition: launching
+        #     Target: arn:aws:sqs:us-east-1:123456789012:warmup
+        #     HeartbeatTimeout: 600
+        # See stacker_blueprints.asg.create_lifecycle_hooks.
+        "LifecycleHooks": {
+            "type": list,
+            "default": [],
+        },
+        # Keep pre-initialized instances ready to scale out into, ie:
+        #   PoolState: Stopped
+        #   MinSize: 2
+        #   ReuseOnScaleIn: true
+        # See stacker_blueprints.asg.create_warm_pool.
+        "WarmPool": {
+            "type": dict,
+            "default": {},
+        },
+        # Launch the instances into a placement group created for them, ie:
+        #   Strategy: cluster
+        # or:
+        #   Strategy: partition
+        #   PartitionCount: 3
+        # Cluster placement groups need instance types with enhanced
+        # networking; set RequireEnhancedNetworking to change that.
+        "PlacementGroup": {
+            "type": dict,
+            "default": {},
+        },
+        # Scale workers on the backlog of an SQS queue per InService
+        # instance, keeping it to what they can get through within an
+        # acceptable latency, ie:
+        #   QueueName: jobs
+        #   AcceptableLatency: 300
+        #   ProcessingTime: 0.5
+        # scales to keep 300 / 0.5 = 600 messages per instance. Leave out
+        # QueueName to create a queue, or give TargetBacklogPerInstance
+        # rather than AcceptableLatency & ProcessingTime. Needs GroupMetrics.
+        "QueueScaling": {
+            "type": dict,
+            "default": {},
+        },
+    }
+
     PARAMETERS = {
         'VpcId': {'type': 'AWS::EC2::VPC::Id', 'description': 'Vpc Id'},
         'DefaultSG': {'type': 'AWS::EC2::SecurityGroup::Id',
@@ -60,7 +641,50 @@ class AutoscalingGroup(Blueprint):
             'type': 'String',
             'description': 'The SSL certificate type to use on the ELB.',
             'default': ''},
+        'Cooldown': {
+            'type': 'Number',
+            'description': 'Seconds to wait after a scaling activity before '
+                           'another can start.',
+            'default': '300'},
+        'EstimatedInstanceWarmup': {
+            'type': 'Number',
+            'description': 'Seconds until a new instance contributes to the '
+                           'metrics of target tracking and step scaling '
+                           'policies.',
+            'default': '300'},
     }
+    PARAMETERS.update(classic_elb_parameters())
+    PARAMETERS.update(health_check_parameters())
+
+    def _get_parameters(self):
+        parameters = dict(self.PARAMETERS)
+        placement_group = self.local_parameters["PlacementGroup"]
+        if placement_group and requires_enhanced_networking(placement_group):
+            instance_type = dict(parameters["InstanceType"])
+            instance_type["description"] += (
+                ", which must support enhanced networking.")
+            instance_type["allowed_pattern"] = enhanced_networking_pattern()
+            parameters["InstanceType"] = instance_type
+        return parameters
+
+    def validate_placement_group(self):
+        settings = self.local_parameters["PlacementGroup"]
+        if self.local_parameters["LaunchTemplateOptions"].get(
+                "PlacementGroup"):
+            raise ValueError("Use either the PlacementGroup or the "
+                             "LaunchTemplateOptions PlacementGroup, not "
+                             "both.")
+        if not requires_enhanced_networking(settings):
+            return
+        instance_types = list(self.local_parameters[
+            "MixedInstancesPolicy"].get("InstanceTypes", []))
+        # Stack outputs aren't known until the stack is built, leaving them
+        # to the parameter's AllowedPattern.
+        instance_type = self.context.parameters.get("InstanceType")
+        if isinstance(instance_type, basestring) and "::" not in \
+                instance_type:
+            instance_types.append(instance_type)
+        validate_enhanced_networking(instance_types)
 
     def create_conditions(self):
         self.template.add_condition(
@@ -81,6 +705,58 @@ class AutoscalingGroup(Blueprint):
         self.template.add_condition(
             "UseIAMCert",
             Not(Equals(Ref("ELBCertType"), "acm")))
+        create_classic_elb_conditions(self.template)
+        create_health_check_conditions(self.template)
+
+    def get_load_balancer_type(self):
+        lb = self.local_parameters["LoadBalancer"]
+        lb_type = lb.get("Type", "classic")
+        if lb_type not in LOAD_BALANCER_TYPES:
+            raise ValueError("LoadBalancer Type must be one of %s." %
+                             ", ".join(LOAD_BALANCER_TYPES))
+        if lb_type == "classic":
+            unused = [k for k in LOAD_BALANCER_V2_SETTINGS if k in lb]
+            if unused:
+                raise ValueError("LoadBalancer %s only apply to application "
+                                 "or network load balancers, set Type or "
+                                 "use the ELB* parameters." %
+                                 ", ".join(unused))
+        return lb_type
+
+    def get_target(self):
+        """Returns the port & protocol the load balancer sends traffic to."""
+        lb = self.local_parameters["LoadBalancer"]
+        lb_type = self.get_load_balancer_type()
+        default_protocol = "HTTP" if lb_type == "application" else "TCP"
+        protocol = lb.get("TargetProtocol", default_protocol)
+        if protocol not in LISTENER_PROTOCOLS[lb_type]:
+            raise ValueError("TargetProtocol for an %s load balancer must be "
+                             "one of %s." % (lb_type, ", ".join(
+                                 LISTENER_PROTOCOLS[lb_type])))
+        return int(lb.get("TargetPort", 80)), protocol
+
+    def get_listeners(self):
+        """Returns the listeners of an application or network load balancer.
+
+        Each listener is a dict with a Port, a Protocol and optionally an
+        SslPolicy & the Condition to create it under.
+        """
+        lb_type = self.get_load_balancer_type()
+        listeners = self.local_parameters["LoadBalancer"].get("Listeners")
+        if not listeners and lb_type == "application":
+            listeners = [
+                {"Port": 80, "Protocol": "HTTP"},
+                {"Port": 443, "Protocol": "HTTPS",
+                 "Condition": "CreateSSLELB"},
+            ]
+        elif not listeners:
+            listeners = [{"Port": 80, "Protocol": "TCP"}]
+        for listener in listeners:
+            if listener.get("Protocol") not in LISTENER_PROTOCOLS[lb_type]:
+                raise ValueError("Listener Protocol for an %s load balancer "
+                                 "must be one of %s." % (lb_type, ", ".join(
+                                     LISTENER_PROTOCOLS[lb_type])))
+        return listeners
 
     def create_security_groups(self):
         t = self.template
@@ -90,6 +766,22 @@ class AutoscalingGroup(Blueprint):
             asg_sg,
             GroupDescription=asg_sg,
             VpcId=Ref("VpcId")))
+        lb_type = self.get_load_balancer_type()
+        if lb_type == "network":
+            # Network load balancers have no security groups, and pass the
+            # client's address through to the instances.
+            port, protocol = self.get_target()
+            ip_protocols = {"UDP": ["udp"], "TCP_UDP": ["tcp", "udp"]}
+            for ip_protocol in ip_protocols.get(protocol, ["tcp"]):
+                t.add_resource(ec2.SecurityGroupIngress(
+                    "InternetTo%s%sPort%s" % (self.name,
+                                              ip_protocol.capitalize(), port),
+                    IpProtocol=ip_protocol, FromPort=port, ToPort=port,
+                    CidrIp="0.0.0.0/0",
+                    GroupId=Ref(asg_sg),
+                    Condition="CreateELB"))
+            return
+
         # ELB Security group, if ELB is used
         t.add_resource(
             ec2.SecurityGroup(
@@ -97,6 +789,24 @@ class AutoscalingGroup(Blueprint):
                 GroupDescription=elb_sg,
                 VpcId=Ref("VpcId"),
                 Condition="CreateELB"))
+        if lb_type == "application":
+            port, _ = self.get_target()
+            t.add_resource(ec2.SecurityGroupIngress(
+                "%sElbToASGPort%s" % (self.name, port),
+                IpProtocol="tcp", FromPort=port, ToPort=port,
+                SourceSecurityGroupId=Ref(elb_sg),
+                GroupId=Ref(asg_sg),
+                Condition="CreateELB"))
+            for listener in self.get_listeners():
+                t.add_resource(ec2.SecurityGroupIngress(
+                    "InternetTo%sElbPort%s" % (self.name, listener["Port"]),
+                    IpProtocol="tcp", FromPort=listener["Port"],
+                    ToPort=listener["Port"],
+                    CidrIp="0.0.0.0/0",
+                    GroupId=Ref(elb_sg),
+                    Condition=listener.get("Condition", "CreateELB")))
+            return
+
         # Add SG rules here
         # Allow ELB to connect to ASG on port 80
         t.add_resource(ec2.SecurityGroupIngress(
@@ -119,14 +829,7 @@ class AutoscalingGroup(Blueprint):
             GroupId=Ref(elb_sg),
             Condition="CreateSSLELB"))
 
-    def setup_listeners(self):
-        no_ssl = [elb.Listener(
-            LoadBalancerPort=80,
-            Protocol='HTTP',
-            InstancePort=80,
-            InstanceProtocol='HTTP'
-        )]
-
+    def get_certificate_arn(self):
         # Choose proper certificate source
         acm_cert = Join("", [
             "arn:aws:acm:", Ref("AWS::Region"), ":", Ref("AWS::AccountId"),
@@ -134,7 +837,15 @@ class AutoscalingGroup(Blueprint):
         iam_cert = Join("", [
             "arn:aws:iam::", Ref("AWS::AccountId"), ":server-certificate/",
             Ref("ELBCertName")])
-        cert_id = If("UseIAMCert", iam_cert, acm_cert)
+        return If("UseIAMCert", iam_cert, acm_cert)
+
+    def setup_listeners(self):
+        no_ssl = [elb.Listener(
+            LoadBalancerPort=80,
+            Protocol='HTTP',
+            InstancePort=80,
+            InstanceProtocol='HTTP'
+        )]
 
         with_ssl = copy.deepcopy(no_ssl)
         with_ssl.append(elb.Listener(
@@ -142,27 +853,133 @@ class AutoscalingGroup(Blueprint):
             InstancePort=80,
             Protocol='HTTPS',
             InstanceProtocol="HTTP",
-            SSLCertificateId=cert_id))
+            SSLCertificateId=self.get_certificate_arn()))
         listeners = If("UseSSL", with_ssl, no_ssl)
 
         return listeners
 
-    def create_load_balancer(self):
+    def create_classic_load_balancer(self):
         t = self.template
         elb_name = ELB_NAME % self.name
         elb_sg = ELB_SG_NAME % self.name
         t.add_resource(elb.LoadBalancer(
             elb_name,
-            HealthCheck=elb.HealthCheck(
-                Target='HTTP:80/',
-                HealthyThreshold=3,
-                UnhealthyThreshold=3,
-                Interval=5,
-                Timeout=3),
             Listeners=self.setup_listeners(),
             SecurityGroups=[Ref(elb_sg), ],
             Subnets=Ref("PublicSubnets"),
-            Condition="CreateELB"))
+            Condition="CreateELB",
+            **classic_elb_properties('HTTP:80/')))
+
+    def get_target_group_parameters(self):
+        lb = self.local_parameters["LoadBalancer"]
+        lb_type = self.get_load_balancer_type()
+        port, protocol = self.get_target()
+        health_check = dict(HEALTH_CHECK_DEFAULTS[lb_type],
+                            **lb.get("HealthCheck", {}))
+        params = {
+            'Port': port,
+            'Protocol': protocol,
+            'VpcId': Ref("VpcId"),
+            'HealthCheckProtocol': health_check["Protocol"],
+            'HealthCheckPort': str(health_check["Port"]),
+            'HealthCheckIntervalSeconds': health_check["Interval"],
+            'HealthyThresholdCount': health_check["HealthyThreshold"],
+            'UnhealthyThresholdCount': health_check["UnhealthyThreshold"],
+        }
+        if health_check["Protocol"] in ("HTTP", "HTTPS"):
+            params['HealthCheckPath'] = health_check.get("Path", "/")
+            if "Matcher" in health_check:
+                params['Matcher'] = elbv2.Matcher(
+                    HttpCode=str(health_check["Matcher"]))
+        if "Timeout" in health_check:
+            params['HealthCheckTimeoutSeconds'] = health_check["Timeout"]
+
+        attributes = {}
+        if "DeregistrationDelay" in lb:
+            attributes["deregistration_delay.timeout_seconds"] = \
+                lb["DeregistrationDelay"]
+        if "SlowStart" in lb:
+            if lb_type != "application":
+                raise ValueError("SlowStart is only supported by application "
+                                 "load balancers.")
+            attributes["slow_start.duration_seconds"] = lb["SlowStart"]
+        if attributes:
+            params['TargetGroupAttributes'] = [
+                elbv2.TargetGroupAttribute(Key=k, Value=str(v))
+                for k, v in sorted(attributes.items())]
+        return params
+
+    def create_load_balancer_v2(self):
+        t = self.template
+        lb = self.local_parameters["LoadBalancer"]
+        lb_type = self.get_load_balancer_type()
+        elb_name = ELB_NAME % self.name
+        target_group = TARGET_GROUP_NAME % self.name
+
+        attributes = {}
+        params = {"Type": lb_type}
+        if lb_type == "application":
+            params["SecurityGroups"] = [Ref(ELB_SG_NAME % self.name)]
+            attributes["routing.http2.enabled"] = lb.get("Http2", True)
+            if "IdleTimeout" in lb:
+                attributes["idle_timeout.timeout_seconds"] = lb["IdleTimeout"]
+        elif "CrossZone" in lb:
+            attributes["load_balancing.cross_zone.enabled"] = lb["CrossZone"]
+
+        if lb_type == "network" and boolean(lb.get("ElasticIPs", False)):
+            try:
+                az_count = int(lb["AZCount"])
+            except KeyError:
+                raise ValueError("ElasticIPs needs the AZCount of the "
+                                 "PublicSubnets.")
+            mappings = []
+            for i in range(az_count):
+                eip = t.add_resource(ec2.EIP(
+                    "%sEIP%s" % (elb_name, i),
+                    Domain="vpc",
+                    Condition="CreateELB"))
+                mappings.append(compat.SubnetMapping(
+                    AllocationId=GetAtt(eip, "AllocationId"),
+                    SubnetId=Select(i, Ref("PublicSubnets"))))
+            params["SubnetMappings"] = mappings
+        else:
+            params["Subnets"] = Ref("PublicSubnets")
+
+        if attributes:
+            params["LoadBalancerAttributes"] = [
+                elbv2.LoadBalancerAttributes(Key=k, Value=str(v).lower())
+                for k, v in sorted(attributes.items())]
+        t.add_resource(compat.LoadBalancerV2(
+            elb_name, Condition="CreateELB", **params))
+        t.add_resource(compat.TargetGroup(
+            target_group, Condition="CreateELB",
+            **self.get_target_group_parameters()))
+
+        for listener in self.get_listeners():
+            params = {
+                "LoadBalancerArn": Ref(elb_name),
+                "Port": listener["Port"],
+                "Protocol": listener["Protocol"],
+                "DefaultActions": [elbv2.Action(
+                    Type="forward", TargetGroupArn=Ref(target_group))],
+            }
+            if listener["Protocol"] in SECURE_PROTOCOLS:
+                params["Certificates"] = [elbv2.Certificate(
+                    CertificateArn=self.get_certificate_arn())]
+            if "SslPolicy" in listener:
+                params["SslPolicy"] = listener["SslPolicy"]
+            t.add_resource(elbv2.Listener(
+                "%sListener%s" % (elb_name, listener["Port"]),
+                Condition=listener.get("Condition", "CreateELB"),
+                **params))
+
+    def create_load_balancer(self):
+        t = self.template
+        elb_name = ELB_NAME % self.name
+        if self.get_load_balancer_type() == "classic":
+            self.create_classic_load_balancer()
+        else:
+            self.create_load_balancer_v2()
 
         # Setup ELB DNS
         t.add_resource(
@@ -187,37 +1004,254 @@ class AutoscalingGroup(Blueprint):
             'SecurityGroups': self.get_launch_configuration_security_groups(),
         }
 
-    def get_autoscaling_group_parameters(self, launch_config_name, elb_name):
-        return {
+    def get_autoscaling_group_parameters(self, elb_name):
+        params = {
             'AvailabilityZones': Ref("AvailabilityZones"),
-            'LaunchConfigurationName': Ref(launch_config_name),
             'MinSize': Ref("MinSize"),
             'MaxSize': Ref("MaxSize"),
+            'Cooldown': Ref("Cooldown"),
             'VPCZoneIdentifier': Ref("PrivateSubnets"),
-            'LoadBalancerNames': If("CreateELB", [Ref(elb_name), ], []),
             'Tags': [ASTag('Name', self.name, True)],
         }
+        params.update(health_check_properties(If("CreateELB", "ELB", "EC2")))
+        if self.get_load_balancer_type() == "classic":
+            params['LoadBalancerNames'] = If(
+                "CreateELB", [Ref(elb_name), ], [])
+        else:
+            params['TargetGroupARNs'] = If(
+                "CreateELB", [Ref(TARGET_GROUP_NAME % self.name)], [])
+        return params
 
     def get_launch_configuration_security_groups(self):
         sg_name = CLUSTER_SG_NAME % self.name
         return [Ref("DefaultSG"), Ref(sg_name)]
 
     def create_autoscaling_group(self):
-        name = "%sASG" % self.name
-        launch_config = "%sLaunchConfig" % name
+        name = ASG_NAME % self.name
+        launch_template = "%sLaunchTemplate" % name
         elb_name = ELB_NAME % self.name
+        launch_config = self.get_launch_configuration_parameters()
+        group = self.get_autoscaling_group_parameters(elb_name)
+        rolling_update = self.local_parameters["RollingUpdate"]
+        creation = self.local_parameters["CreationPolicy"]
+        if rolling_update:
+            group["UpdatePolicy"] = rolling_update_policy(rolling_update)
+        if creation:
+            group["CreationPolicy"] = creation_policy(creation, Ref("MinSize"))
+        placement_group = self.local_parameters["PlacementGroup"]
+        if placement_group:
+            self.validate_placement_group()
+            create_placement_group(
+                self.template, "%sPlacementGroup" % name, placement_group)
+            group["PlacementGroup"] = Ref("%sPlacementGroup" % name)
+        if (signals_required(rolling_update, creation) and
+                "UserData" not in launch_config):
+            launch_config["UserData"] = Base64(Join(
+                "", ["#!/bin/bash\n"] + cfn_signal(
+                    name, self.local_parameters["SignalCheck"])))
+        create_autoscaling_group(
+            self.template, name, launch_template, launch_config, group,
+            self.local_parameters["MixedInstancesPolicy"],
+            self.local_parameters["LaunchTemplateOptions"])
+
+    def get_target_tracking_configuration(self, policy):
+        try:
+            target_value = policy["TargetValue"]
+        except KeyError:
+            raise ValueError("Target tracking policy %s needs a "
+                             "TargetValue." % policy.get("Name"))
+        config = {
+            "TargetValue": target_value,
+            "DisableScaleIn": policy.get("DisableScaleIn", False),
+        }
+        if "PredefinedMetric" in policy:
+            metric = policy["PredefinedMetric"]
+            if metric not in PREDEFINED_METRICS:
+                raise ValueError("PredefinedMetric must be one of %s." %
+                                 ", ".join(PREDEFINED_METRICS))
+            spec = {"PredefinedMetricType": metric}
+            if "ResourceLabel" in policy:
+                spec["ResourceLabel"] = policy["ResourceLabel"]
+            elif metric == "ALBRequestCountPerTarget":
+                spec["ResourceLabel"] = self.get_resource_label()
+            config["PredefinedMetricSpecification"] = \
+                compat.PredefinedMetricSpecification(**spec)
+        elif "CustomMetric" in policy:
+            metric = dict(policy["CustomMetric"])
+            metric["Dimensions"] = [
+                compat.MetricDimension(Name=k, Value=v)
+                for k, v in metric.get("Dimensions", {}).items()]
+            config["CustomizedMetricSpecification"] = \
+                compat.CustomizedMetricSpecification(**metric)
+        else:
+            raise ValueError("Target tracking policy %s needs either a "
+                             "PredefinedMetric or a CustomMetric." %
+                             policy.get("Name"))
+        return compat.TargetTrackingConfiguration(**config)
+
+    def get_resource_label(self):
+        """Identifies the blueprint's own target group to CloudWatch."""
+        if self.get_load_balancer_type() != "application":
+            raise ValueError("ALBRequestCountPerTarget needs a ResourceLabel "
+                             "unless the LoadBalancer Type is application.")
+        return Join("/", [
+            GetAtt(ELB_NAME % self.name, "LoadBalancerFullName"),
+            GetAtt(TARGET_GROUP_NAME % self.name, "TargetGroupFullName")])
+
+    def create_target_tracking_policy(self, asg_name, policy):
+        t = self.template
+        params = {}
+        if (policy.get("PredefinedMetric") == "ALBRequestCountPerTarget" and
+                "ResourceLabel" not in policy):
+            # The target group only exists when the ELB does.
+            params["Condition"] = "CreateELB"
+        t.add_resource(compat.ScalingPolicy(
+            SCALING_POLICY_NAME % (asg_name, policy["Name"]),
+            AutoScalingGroupName=Ref(asg_name),
+            PolicyType="TargetTrackingScaling",
+            EstimatedInstanceWarmup=policy.get(
+                "EstimatedInstanceWarmup", Ref("EstimatedInstanceWarmup")),
+            TargetTrackingConfiguration=self.get_target_tracking_configuration(
+                policy),
+            **params))
+
+    def create_step_scaling_policy(self, asg_name, policy):
+        t = self.template
+        policy_name = SCALING_POLICY_NAME % (asg_name, policy["Name"])
+        if not policy.get("Steps"):
+            raise ValueError("Step scaling policy %s needs at least one "
+                             "step." % policy["Name"])
+        steps = []
+        for step in policy["Steps"]:
+            attrs = {"ScalingAdjustment": step["Adjustment"]}
+            if "LowerBound" in step:
+                attrs["MetricIntervalLowerBound"] = step["LowerBound"]
+            if "UpperBound" in step:
+                attrs["MetricIntervalUpperBound"] = step["UpperBound"]
+            steps.append(StepAdjustments(**attrs))
+        aggregation = policy.get("MetricAggregationType", "Average")
+        if aggregation not in METRIC_AGGREGATION_TYPES:
+            raise ValueError("MetricAggregationType of step scaling policy %s "
+                             "must be one of: %s" %
+                             (policy["Name"],
+                              ", ".join(METRIC_AGGREGATION_TYPES)))
+        t.add_resource(autoscaling.ScalingPolicy(
+            policy_name,
+            AutoScalingGroupName=Ref(asg_name),
+            PolicyType="StepScaling",
+            AdjustmentType=policy.get("AdjustmentType", "ChangeInCapacity"),
+            MetricAggregationType=aggregation,
+            EstimatedInstanceWarmup=policy.get(
+                "EstimatedInstanceWarmup", Ref("EstimatedInstanceWarmup")),
+            StepAdjustments=steps))
+
+        dimensions = policy.get(
+            "Dimensions", {"AutoScalingGroupName": Ref(asg_name)})
+        t.add_resource(Alarm(
+            SCALING_ALARM_NAME % (asg_name, policy["Name"]),
+            AlarmDescription="Triggers the %s scaling policy." % policy_name,
+            Namespace=policy.get("Namespace", "AWS/EC2"),
+            MetricName=policy["MetricName"],
+            Dimensions=[MetricDimension(Name=k, Value=v)
+                        for k, v in dimensions.items()],
+            Statistic=policy.get("Statistic", "Average"),
+            Period=policy.get("Period", 60),
+            EvaluationPeriods=policy.get("EvaluationPeriods", 2),
+            ComparisonOperator=policy["ComparisonOperator"],
+            Threshold=str(policy["Threshold"]),
+            AlarmActions=[Ref(policy_name)]))
+
+    def get_queue_name(self, settings):
+        """Returns the name of the queue to scale on, creating it if need
+        be."""
+        if settings.get("QueueName"):
+            return settings["QueueName"]
         t = self.template
-        t.add_resource(autoscaling.LaunchConfiguration(
-            launch_config,
-            **self.get_launch_configuration_parameters()
-        ))
-        t.add_resource(autoscaling.AutoScalingGroup(
-            name,
-            **self.get_autoscaling_group_parameters(launch_config, elb_name)
-        ))
+        queue = QUEUE_NAME % self.name
+        attrs = {}
+        if "VisibilityTimeout" in settings:
+            attrs["VisibilityTimeout"] = settings["VisibilityTimeout"]
+        t.add_resource(sqs_resources.Queue(queue, **attrs))
+        t.add_output(Output("QueueUrl", Value=Ref(queue)))
+        t.add_output(Output("QueueArn", Value=GetAtt(queue, "Arn")))
+        t.add_output(Output("QueueName", Value=GetAtt(queue, "QueueName")))
+        return GetAtt(queue, "QueueName")
+
+    def get_backlog_target(self, settings):
+        if "TargetBacklogPerInstance" in settings:
+            return float(settings["TargetBacklogPerInstance"])
+        try:
+            latency = float(settings["AcceptableLatency"])
+            processing_time = float(settings["ProcessingTime"])
+        except KeyError:
+            raise ValueError("QueueScaling needs a TargetBacklogPerInstance, "
+                             "or an AcceptableLatency & ProcessingTime.")
+        if latency <= 0 or processing_time <= 0:
+            raise ValueError("QueueScaling AcceptableLatency and "
+                             "ProcessingTime must be positive.")
+        return latency / processing_time
+
+    def create_queue_scaling_policy(self, asg_name):
+        """Tracks the queue's visible messages per InService instance."""
+        settings = self.local_parameters["QueueScaling"]
+        target = self.get_backlog_target(settings)
+        queue_name = self.get_queue_name(settings)
+
+        metrics = [
+            metric_stat_query("backlog", "AWS/SQS",
+                              "ApproximateNumberOfMessagesVisible",
+                              {"QueueName": queue_name}, "Sum"),
+            metric_stat_query("instances", "AWS/AutoScaling",
+                              "GroupInServiceInstances",
+                              {"AutoScalingGroupName": Ref(asg_name)},
+                              "Average"),
+            compat.TargetTrackingMetricDataQuery(
+                Id="backlog_per_instance",
+                Expression="backlog / instances",
+                Label="Backlog per instance",
+                ReturnData=True),
+        ]
+        metric_math = compat.CustomizedMetricSpecification(Metrics=metrics)
+        self.template.add_resource(compat.ScalingPolicy(
+            SCALING_POLICY_NAME % (asg_name, "QueueBacklog"),
+            AutoScalingGroupName=Ref(asg_name),
+            PolicyType="TargetTrackingScaling",
+            EstimatedInstanceWarmup=settings.get(
+                "EstimatedInstanceWarmup", Ref("EstimatedInstanceWarmup")),
+            TargetTrackingConfiguration=compat.TargetTrackingConfiguration(
+                TargetValue=target,
+                DisableScaleIn=settings.get("DisableScaleIn", False),
+                CustomizedMetricSpecification=metric_math)))
+
+    def create_scaling_policies(self):
+        asg_name = ASG_NAME % self.name
+        for policy in self.local_parameters["TargetTrackingPolicies"]:
+            self.create_target_tracking_policy(asg_name, policy)
+        for policy in self.local_parameters["StepScalingPolicies"]:
+            self.create_step_scaling_policy(asg_name, policy)
+        if self.local_parameters["QueueScaling"]:
+            self.create_queue_scaling_policy(asg_name)
+
+    def create_scheduled_actions(self):
+        create_scheduled_actions(self.template, ASG_NAME % self.name,
+                                 self.local_parameters["ScheduledActions"])
+
+    def create_lifecycle_hooks(self):
+        create_lifecycle_hooks(self.template, ASG_NAME % self.name,
+                               self.local_parameters["LifecycleHooks"])
+
+    def create_warm_pool(self):
+        if self.local_parameters["WarmPool"]:
+            create_warm_pool(self.template, ASG_NAME % self.name,
+                             self.local_parameters["WarmPool"],
+                             self.local_parameters["MixedInstancesPolicy"])
 
     def create_template(self):
         self.create_conditions()
         self.create_security_groups()
         self.create_load_balancer()
         self.create_autoscaling_group()
+        self.create_scaling_policies()
+        self.create_scheduled_actions()
+        self.create_lifecycle_hooks()
+        self.create_warm_pool()
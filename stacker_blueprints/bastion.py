@@ -7,15 +7,33 @@
 # the VPC you must first SSH to a bastion host, and then SSH from that host to
 # another inside the VPC.
 
-from troposphere import Ref, ec2, autoscaling, FindInMap
+from troposphere import Ref, ec2, FindInMap
 from troposphere.autoscaling import Tag as ASTag
 
 from stacker.blueprints.base import Blueprint
 
+from .launch_template import create_autoscaling_group
+
 CLUSTER_SG_NAME = "BastionSecurityGroup"
 
 
 class Bastion(Blueprint):
+    LOCAL_PARAMETERS = {
+        # Launch from a mix of instance types and spot instances. See
+        # stacker_blueprints.launch_template.mixed_instances_policy.
+        "MixedInstancesPolicy": {
+            "type": dict,
+            "default": {},
+        },
+        # EBS optimization, detailed monitoring, metadata and placement
+        # settings for the launch template. See
+        # stacker_blueprints.launch_template.launch_template_data.
+        "LaunchTemplateOptions": {
+            "type": dict,
+            "default": {},
+        },
+    }
+
     PARAMETERS = {
         "VpcId": {"type": "AWS::EC2::VPC::Id", "description": "Vpc Id"},
         "DefaultSG": {"type": "AWS::EC2::SecurityGroup::Id",
@@ -73,26 +91,26 @@ class Bastion(Blueprint):
                 GroupId=Ref('DefaultSG')))
 
     def create_autoscaling_group(self):
-        t = self.template
-        t.add_resource(
-            autoscaling.LaunchConfiguration(
-                'BastionLaunchConfig',
+        create_autoscaling_group(
+            self.template,
+            'BastionAutoscalingGroup',
+            'BastionLaunchTemplate',
+            dict(
                 AssociatePublicIpAddress=True,
                 ImageId=FindInMap(
                     'AmiMap', Ref("AWS::Region"), Ref("ImageName")),
                 InstanceType=Ref("InstanceType"),
                 KeyName=Ref("SshKeyName"),
                 UserData=self.generate_user_data(),
-                SecurityGroups=[Ref("DefaultSG"), Ref(CLUSTER_SG_NAME)]))
-        t.add_resource(
-            autoscaling.AutoScalingGroup(
-                'BastionAutoscalingGroup',
+                SecurityGroups=[Ref("DefaultSG"), Ref(CLUSTER_SG_NAME)]),
+            dict(
                 AvailabilityZones=Ref("AvailabilityZones"),
-                LaunchConfigurationName=Ref("BastionLaunchConfig"),
                 MinSize=Ref("MinSize"),
                 MaxSize=Ref("MaxSize"),
                 VPCZoneIdentifier=Ref("PublicSubnets"),
-                Tags=[ASTag('Name', 'bastion', True)]))
+                Tags=[ASTag('Name', 'bastion', True)]),
+            self.local_parameters["MixedInstancesPolicy"],
+            self.local_parameters["LaunchTemplateOptions"])
 
     def generate_user_data(self):
         return ''
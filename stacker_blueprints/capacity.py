@@ -0,0 +1,380 @@
+""" Subnet IP capacity planning for stacker configs.
+
+Reads a stacker config, works out how many addresses each stack can use when
+it is fully scaled out, and compares that against the size of the subnets
+the VPC blueprint builds.
+
+It can be run from the command line:
+
+    python -m stacker_blueprints.capacity -e conf/empire/example.env \\
+        conf/empire/empire.yaml
+
+or as a pre_build hook, which stops the build if a subnet would run out of
+addresses:
+
+    pre_build:
+      - path: stacker_blueprints.capacity.check_subnet_capacity
+        required: true
+        args:
+          config: conf/empire/empire.yaml
+          environment: conf/empire/example.env
+"""
+
+import argparse
+import logging
+import sys
+
+from stacker.config import parse_config
+from stacker.environment import parse_environment
+from stacker.util import load_object_from_string
+
+from .asg import AutoscalingGroup
+from .bastion import Bastion
+from .compat import basestring
+from .elasticache.base import BaseReplicationGroup
+from .empire.controller import EmpireController
+from .empire.daemon import EmpireDaemon
+from .empire.minion import EmpireMinion
+from .postgres import PostgresRDS
+from .rds.base import AuroraCluster
+from .rds.base import ReadReplica
+from .rds.base import ReadReplicaSet
+from .rds.base import BaseRDS
+from .rds.proxy import RDSProxy
+from .vpc import VPC
+
+logger = logging.getLogger(__name__)
+
+# AWS keeps the first four and the last address of every subnet.
+AWS_RESERVED_IPS = 5
+# AWS asks for at least 8 free addresses in each subnet an ELB is in, so it
+# has room to scale.
+ELB_IPS_PER_SUBNET = 8
+# AWS asks for at least 10 free addresses in each subnet an RDS proxy
+# endpoint is in, more in front of instance classes bigger than xlarge.
+RDS_PROXY_IPS_PER_SUBNET = 10
+VPC_SUBNET_OUTPUTS = ("PublicSubnets", "PrivateSubnets")
+EXTRA_PRIVATE_OUTPUT = "PrivateSubnetsGroup%s"
+
+
+def subnet_capacity(cidr):
+    """Returns the number of usable addresses in an IPv4 subnet."""
+    prefix = int(cidr.split("/")[1])
+    return 2 ** (32 - prefix) - AWS_RESERVED_IPS
+
+
+def _int(parameters, name, default):
+    return int(parameters.get(name, default))
+
+
+def _enabled(parameters, name, default="true"):
+    return str(parameters.get(name, default)).lower() == "true"
+
+
+def asg_demand(parameters, ips_per_instance):
+    demand = [("PrivateSubnets",
+               _int(parameters, "MaxSize", 5) * ips_per_instance, 0)]
+    if parameters.get("ELBHostName"):
+        demand.append(("PublicSubnets", 0, ELB_IPS_PER_SUBNET))
+    return demand
+
+
+def bastion_demand(parameters, ips_per_instance):
+    return [("PublicSubnets",
+             _int(parameters, "MaxSize", 5) * ips_per_instance, 0)]
+
+
+def empire_minion_demand(parameters, ips_per_instance):
+    return [("PrivateSubnets",
+             _int(parameters, "MaxHosts", 20) * ips_per_instance, 0)]
+
+
+def empire_controller_demand(parameters, ips_per_instance):
+    return [("PrivateSubnets",
+             _int(parameters, "MaxHosts", 3) * ips_per_instance, 0)]
+
+
+def empire_daemon_demand(parameters, ips_per_instance):
+    return [("PublicSubnets", 0, ELB_IPS_PER_SUBNET)]
+
+
+def rds_demand(parameters, ips_per_instance):
+    # A MultiAZ instance keeps a standby in a second subnet.
+    instances = 2 if _enabled(parameters, "MultiAZ") else 1
+    return [("Subnets", instances * ips_per_instance, 0)]
+
+
+def rds_replica_demand(parameters, ips_per_instance):
+    return [("Subnets", ips_per_instance, 0)]
+
+
+def aurora_demand(parameters, ips_per_instance):
+    # The writer, plus as many readers as the cluster can scale out to.
+    instances = 1 + _int(parameters, "MaxReaders", 5)
+    return [("Subnets", instances * ips_per_instance, 0)]
+
+
+def rds_replica_set_demand(parameters, ips_per_instance):
+    return [("Subnets",
+             _int(parameters, "Replicas", 2) * ips_per_instance, 0)]
+
+
+def rds_proxy_demand(parameters, ips_per_instance):
+    # Proxies in front of a cluster also get a read only endpoint.
+    endpoints = 2 if parameters.get("DBClusterIdentifier") else 1
+    return [("Subnets", 0, endpoints * RDS_PROXY_IPS_PER_SUBNET)]
+
+
+def postgres_demand(parameters, ips_per_instance):
+    return [("PrivateSubnets", 2 * ips_per_instance, 0)]
+
+
+def replication_group_demand(parameters, ips_per_instance):
+    return [("Subnets",
+             _int(parameters, "NumCacheClusters", 2) * ips_per_instance, 0)]
+
+
+# Checked in order, so subclasses need to come before their parents.
+DEMAND_ESTIMATORS = (
+    (AutoscalingGroup, asg_demand),
+    (Bastion, bastion_demand),
+    (EmpireMinion, empire_minion_demand),
+    (EmpireController, empire_controller_demand),
+    (EmpireDaemon, empire_daemon_demand),
+    (AuroraCluster, aurora_demand),
+    (ReadReplicaSet, rds_replica_set_demand),
+    (ReadReplica, rds_replica_demand),
+    (BaseRDS, rds_demand),
+    (RDSProxy, rds_proxy_demand),
+    (PostgresRDS, postgres_demand),
+    (BaseReplicationGroup, replication_group_demand),
+)
+
+
+class SubnetUsage(object):
+    """Tracks the addresses consumed from a single subnet.
+
+    Args:
+        name (str): A name for the subnet, ie: vpc::PrivateSubnets[0]
+        cidr (str): The subnet's CIDR block.
+    """
+
+    def __init__(self, name, cidr):
+        self.name = name
+        self.cidr = cidr
+        self.capacity = subnet_capacity(cidr)
+        self.consumers = []
+
+    @property
+    def demand(self):
+        return sum(ips for _, ips in self.consumers)
+
+    @property
+    def headroom(self):
+        return self.capacity - self.demand
+
+    def add(self, stack_name, ips):
+        if ips:
+            self.consumers.append((stack_name, ips))
+
+
+def _get_parameters(stack_def, cli_parameters):
+    parameters = dict(stack_def.get("parameters") or {})
+    stack_specific = {}
+    for key, value in cli_parameters.items():
+        if "::" in key:
+            stack, key = key.split("::", 1)
+            if stack == stack_def["name"]:
+                stack_specific[key] = value
+        else:
+            parameters[key] = value
+    parameters.update(stack_specific)
+    return parameters
+
+
+def _split(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [v.strip() for v in str(value).split(",") if v.strip()]
+
+
+def _vpc_subnets(stack_name, parameters):
+    """Returns the subnets a VPC stack builds, keyed by output name."""
+    az_count = int(parameters.get("AZCount", 2))
+    subnets = {}
+    for output in VPC_SUBNET_OUTPUTS:
+        cidrs = _split(parameters.get(output, ""))[:az_count]
+        subnets[output] = [
+            SubnetUsage("%s::%s[%s]" % (stack_name, output, i), cidr)
+            for i, cidr in enumerate(cidrs)]
+
+    extra = _split(parameters.get("ExtraPrivateSubnets", ""))
+    groups = int(parameters.get("NatGatewaysPerAZ", 1))
+    for group in range(1, groups):
+        output = EXTRA_PRIVATE_OUTPUT % group
+        cidrs = extra[(group - 1) * az_count:group * az_count]
+        subnets[output] = [
+            SubnetUsage("%s::%s[%s]" % (stack_name, output, i), cidr)
+            for i, cidr in enumerate(cidrs)]
+
+    # A NAT instance in each AZ, or a NAT Gateway for every group.
+    nat_ips = groups if _enabled(parameters, "UseNatGateway", "false") else 1
+    for usage in subnets["PublicSubnets"]:
+        usage.add(stack_name, nat_ips)
+    return subnets
+
+
+def _get_estimator(blueprint_class):
+    for base, estimator in DEMAND_ESTIMATORS:
+        if issubclass(blueprint_class, base):
+            return estimator
+    return None
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def plan(config, parameters=None, tolerate_az_loss=False,
+         ips_per_instance=None):
+    """Works out peak address usage for every subnet built by a config.
+
+    Args:
+        config (dict): A parsed stacker config.
+        parameters (dict, optional): Parameters given on the command line,
+            which override those in the config.
+        tolerate_az_loss (bool, optional): If True, assume one AZ is gone and
+            its capacity has been moved to the remaining AZs.
+        ips_per_instance (dict, optional): Addresses each instance or node
+            of a stack uses, keyed by stack name. Defaults to 1. Set this
+            for stacks that attach extra ENIs, ie: one per task on Empire
+            minions.
+
+    Returns:
+        list: A :class:`SubnetUsage` for every subnet in the config.
+    """
+    parameters = parameters or {}
+    ips_per_instance = ips_per_instance or {}
+    stacks = [s for s in config.get("stacks", []) if s.get("enabled", True)]
+
+    vpcs = {}
+    usage = []
+    for stack_def in stacks:
+        klass = load_object_from_string(stack_def["class_path"])
+        if issubclass(klass, VPC):
+            subnets = _vpc_subnets(
+                stack_def["name"], _get_parameters(stack_def, parameters))
+            vpcs[stack_def["name"]] = subnets
+            for group in subnets.values():
+                usage.extend(group)
+
+    for stack_def in stacks:
+        name = stack_def["name"]
+        klass = load_object_from_string(stack_def["class_path"])
+        estimator = _get_estimator(klass)
+        if not estimator:
+            continue
+        stack_parameters = _get_parameters(stack_def, parameters)
+        demand = estimator(stack_parameters, ips_per_instance.get(name, 1))
+        for parameter, spread, fixed in demand:
+            value = stack_parameters.get(parameter, "")
+            if not isinstance(value, basestring) or "::" not in value:
+                logger.warning("Skipping %s for stack %s: only subnets "
+                               "referenced from a VPC stack output are "
+                               "checked.", parameter, name)
+                continue
+            vpc_name, output = value.split("::", 1)
+            subnets = vpcs.get(vpc_name, {}).get(output)
+            if not subnets:
+                logger.warning("Skipping %s for stack %s: %s is not a VPC "
+                               "subnet output.", parameter, name, value)
+                continue
+            zones = len(subnets)
+            if tolerate_az_loss and zones > 1:
+                zones -= 1
+            per_subnet = _ceil_div(spread, zones) + fixed
+            for subnet in subnets:
+                subnet.add(name, per_subnet)
+
+    return usage
+
+
+def format_report(usage):
+    lines = ["%-40s %-18s %8s %8s %8s" % (
+        "Subnet", "CIDR", "Usable", "Peak", "Headroom")]
+    for subnet in usage:
+        lines.append("%-40s %-18s %8d %8d %8d" % (
+            subnet.name, subnet.cidr, subnet.capacity, subnet.demand,
+            subnet.headroom))
+        for stack_name, ips in subnet.consumers:
+            lines.append("    %-36s %37d" % (stack_name, ips))
+    return "\n".join(lines)
+
+
+def load_config(config_path, environment_path=None):
+    environment = {}
+    if environment_path:
+        with open(environment_path) as fd:
+            environment = parse_environment(fd.read())
+    with open(config_path) as fd:
+        return parse_config(fd.read(), environment=environment)
+
+
+def check_subnet_capacity(region, namespace, mappings, parameters, **kwargs):
+    """Stacker hook that fails if any subnet could run out of addresses.
+
+    Args:
+        config (str): Path to the stacker config to check.
+        environment (str, optional): Path to the environment file used with
+            the config.
+        tolerate_az_loss (bool, optional): See :func:`plan`.
+        ips_per_instance (dict, optional): See :func:`plan`.
+    """
+    config = load_config(kwargs["config"], kwargs.get("environment"))
+    usage = plan(config, parameters,
+                 tolerate_az_loss=kwargs.get("tolerate_az_loss", False),
+                 ips_per_instance=kwargs.get("ips_per_instance"))
+    logger.info("Subnet capacity:\n%s", format_report(usage))
+    exhausted = [s.name for s in usage if s.headroom < 0]
+    if exhausted:
+        logger.error("Not enough addresses at peak in: %s",
+                     ", ".join(exhausted))
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Checks that the subnets in a stacker config have room "
+                    "for every stack to scale out fully.")
+    parser.add_argument("config", help="The stacker config to check.")
+    parser.add_argument("-e", "--environment",
+                        help="The environment file used with the config.")
+    parser.add_argument("-p", "--parameter", dest="parameters",
+                        action="append", default=[],
+                        help="Parameter override in key=value format, as "
+                             "given to stacker.")
+    parser.add_argument("-i", "--ips-per-instance", action="append",
+                        default=[],
+                        help="Addresses used per instance of a stack, in "
+                             "stack=count format. Default: 1")
+    parser.add_argument("--tolerate-az-loss", action="store_true",
+                        help="Assume one AZ is lost and its capacity moves "
+                             "to the others.")
+    args = parser.parse_args(argv)
+
+    parameters = dict(p.split("=", 1) for p in args.parameters)
+    ips_per_instance = dict(
+        (stack, int(count)) for stack, count in
+        (i.split("=", 1) for i in args.ips_per_instance))
+    usage = plan(load_config(args.config, args.environment), parameters,
+                 tolerate_az_loss=args.tolerate_az_loss,
+                 ips_per_instance=ips_per_instance)
+    sys.stdout.write(format_report(usage) + "\n")
+    if any(s.headroom < 0 for s in usage):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,433 @@
+"""CloudFormation types & properties missing from troposphere 1.8.
+
+Each class mirrors its counterpart in newer troposphere releases, so these
+can be dropped in favor of the real thing once we upgrade.
+"""
+
+from troposphere import AWSHelperFn, AWSObject, AWSProperty, autoscaling, ec2
+from troposphere import applicationautoscaling, rds
+from troposphere import elasticloadbalancingv2 as elbv2
+from troposphere.validators import boolean, integer
+
+try:
+    basestring = basestring
+except NameError:  # python 3
+    basestring = str
+
+
+def double(x):
+    try:
+        float(x)
+    except (ValueError, TypeError):
+        raise ValueError("%r is not a valid double" % x)
+    else:
+        return x
+
+
+class Cidr(AWSHelperFn):
+    def __init__(self, ipblock, count, sizemask=None):
+        if sizemask:
+            self.data = {'Fn::Cidr': [ipblock, count, sizemask]}
+        else:
+            self.data = {'Fn::Cidr': [ipblock, count]}
+
+    def JSONrepr(self):
+        return self.data
+
+
+class EgressOnlyInternetGateway(AWSObject):
+    resource_type = "AWS::EC2::EgressOnlyInternetGateway"
+
+    props = {
+        'VpcId': (basestring, True),
+    }
+
+
+class VPCCidrBlock(AWSObject):
+    resource_type = "AWS::EC2::VPCCidrBlock"
+
+    props = {
+        'AmazonProvidedIpv6CidrBlock': (boolean, False),
+        'CidrBlock': (basestring, False),
+        'VpcId': (basestring, True),
+    }
+
+
+class Subnet(ec2.Subnet):
+    props = dict(ec2.Subnet.props, **{
+        'AssignIpv6AddressOnCreation': (boolean, False),
+        'Ipv6CidrBlock': (basestring, False),
+    })
+
+
+class Route(ec2.Route):
+    props = dict(ec2.Route.props, **{
+        'DestinationCidrBlock': (basestring, False),
+        'DestinationIpv6CidrBlock': (basestring, False),
+        'EgressOnlyInternetGatewayId': (basestring, False),
+    })
+
+
+class MetricDimension(AWSProperty):
+    props = {
+        'Name': (basestring, True),
+        'Value': (basestring, True),
+    }
+
+
+class TargetTrackingMetric(AWSProperty):
+    props = {
+        'Dimensions': ([MetricDimension], False),
+        'MetricName': (basestring, False),
+        'Namespace': (basestring, False),
+    }
+
+
+class TargetTrackingMetricStat(AWSProperty):
+    props = {
+        'Metric': (TargetTrackingMetric, True),
+        'Stat': (basestring, True),
+        'Unit': (basestring, False),
+    }
+
+
+class TargetTrackingMetricDataQuery(AWSProperty):
+    props = {
+        'Expression': (basestring, False),
+        'Id': (basestring, True),
+        'Label': (basestring, False),
+        'MetricStat': (TargetTrackingMetricStat, False),
+        'ReturnData': (boolean, False),
+    }
+
+
+class CustomizedMetricSpecification(AWSProperty):
+    props = {
+        'Dimensions': ([MetricDimension], False),
+        'MetricName': (basestring, False),
+        'Metrics': ([TargetTrackingMetricDataQuery], False),
+        'Namespace': (basestring, False),
+        'Statistic': (basestring, False),
+        'Unit': (basestring, False),
+    }
+
+    def validate(self):
+        single = [p for p in ('MetricName', 'Namespace', 'Statistic')
+                  if p in self.properties]
+        if 'Metrics' in self.properties:
+            if single:
+                raise ValueError("CustomizedMetricSpecification takes either "
+                                 "Metrics or a single metric, not both.")
+        elif len(single) != 3:
+            raise ValueError("CustomizedMetricSpecification needs Metrics, "
+                             "or a MetricName, Namespace and Statistic.")
+
+
+class PredefinedMetricSpecification(AWSProperty):
+    props = {
+        'PredefinedMetricType': (basestring, True),
+        'ResourceLabel': (basestring, False),
+    }
+
+
+class TargetTrackingConfiguration(AWSProperty):
+    props = {
+        'CustomizedMetricSpecification':
+            (CustomizedMetricSpecification, False),
+        'DisableScaleIn': (boolean, False),
+        'PredefinedMetricSpecification':
+            (PredefinedMetricSpecification, False),
+        'TargetValue': (double, True),
+    }
+
+
+class ScalingPolicy(autoscaling.ScalingPolicy):
+    props = dict(autoscaling.ScalingPolicy.props, **{
+        'AdjustmentType': (basestring, False),
+        'TargetTrackingConfiguration': (TargetTrackingConfiguration, False),
+    })
+
+
+class MetadataOptions(AWSProperty):
+    props = {
+        'HttpEndpoint': (basestring, False),
+        'HttpPutResponseHopLimit': (integer, False),
+        'HttpTokens': (basestring, False),
+    }
+
+
+# ec2.PlacementGroup, which gained partition placement groups.
+class PlacementGroup(ec2.PlacementGroup):
+    props = dict(ec2.PlacementGroup.props, **{
+        'PartitionCount': (integer, False),
+    })
+
+
+class Placement(AWSProperty):
+    props = {
+        'Affinity': (basestring, False),
+        'AvailabilityZone': (basestring, False),
+        'GroupName': (basestring, False),
+        'HostId': (basestring, False),
+        'Tenancy': (basestring, False),
+    }
+
+
+class HibernationOptions(AWSProperty):
+    props = {
+        'Configured': (boolean, False),
+    }
+
+
+class LaunchTemplateData(AWSProperty):
+    props = {
+        'BlockDeviceMappings': ([ec2.BlockDeviceMapping], False),
+        'EbsOptimized': (boolean, False),
+        'HibernationOptions': (HibernationOptions, False),
+        'IamInstanceProfile': (ec2.IamInstanceProfile, False),
+        'ImageId': (basestring, False),
+        'InstanceType': (basestring, False),
+        'KeyName': (basestring, False),
+        'MetadataOptions': (MetadataOptions, False),
+        'Monitoring': (ec2.Monitoring, False),
+        'NetworkInterfaces': ([ec2.NetworkInterfaces], False),
+        'Placement': (Placement, False),
+        'SecurityGroupIds': (list, False),
+        'UserData': (basestring, False),
+    }
+
+
+class LaunchTemplate(AWSObject):
+    resource_type = "AWS::EC2::LaunchTemplate"
+
+    props = {
+        'LaunchTemplateData': (LaunchTemplateData, False),
+        'LaunchTemplateName': (basestring, False),
+    }
+
+
+class LaunchTemplateSpecification(AWSProperty):
+    props = {
+        'LaunchTemplateId': (basestring, False),
+        'LaunchTemplateName': (basestring, False),
+        'Version': (basestring, True),
+    }
+
+
+class InstancesDistribution(AWSProperty):
+    props = {
+        'OnDemandAllocationStrategy': (basestring, False),
+        'OnDemandBaseCapacity': (integer, False),
+        'OnDemandPercentageAboveBaseCapacity': (integer, False),
+        'SpotAllocationStrategy': (basestring, False),
+        'SpotInstancePools': (integer, False),
+        'SpotMaxPrice': (basestring, False),
+    }
+
+
+class LaunchTemplateOverrides(AWSProperty):
+    props = {
+        'InstanceType': (basestring, False),
+        'WeightedCapacity': (basestring, False),
+    }
+
+
+# autoscaling.LaunchTemplate in newer troposphere releases.
+class MixedInstancesLaunchTemplate(AWSProperty):
+    props = {
+        'LaunchTemplateSpecification': (LaunchTemplateSpecification, True),
+        'Overrides': ([LaunchTemplateOverrides], True),
+    }
+
+
+class MixedInstancesPolicy(AWSProperty):
+    props = {
+        'InstancesDistribution': (InstancesDistribution, False),
+        'LaunchTemplate': (MixedInstancesLaunchTemplate, True),
+    }
+
+
+class AutoScalingGroup(autoscaling.AutoScalingGroup):
+    props = dict(autoscaling.AutoScalingGroup.props, **{
+        'LaunchTemplate': (LaunchTemplateSpecification, False),
+        'MixedInstancesPolicy': (MixedInstancesPolicy, False),
+    })
+
+    def validate(self):
+        launchers = [p for p in ('InstanceId', 'LaunchConfigurationName',
+                                 'LaunchTemplate', 'MixedInstancesPolicy')
+                     if p in self.properties]
+        if len(launchers) != 1:
+            raise ValueError("AutoScalingGroup needs exactly one of "
+                             "InstanceId, LaunchConfigurationName, "
+                             "LaunchTemplate or MixedInstancesPolicy.")
+
+
+# autoscaling.LifecycleHook, which no longer needs a notification target.
+class LifecycleHook(autoscaling.LifecycleHook):
+    props = dict(autoscaling.LifecycleHook.props, **{
+        'NotificationTargetARN': (basestring, False),
+        'RoleARN': (basestring, False),
+    })
+
+
+class InstanceReusePolicy(AWSProperty):
+    props = {
+        'ReuseOnScaleIn': (boolean, False),
+    }
+
+
+class WarmPool(AWSObject):
+    resource_type = "AWS::AutoScaling::WarmPool"
+
+    props = {
+        'AutoScalingGroupName': (basestring, True),
+        'InstanceReusePolicy': (InstanceReusePolicy, False),
+        'MaxGroupPreparedCapacity': (integer, False),
+        'MinSize': (integer, False),
+        'PoolState': (basestring, False),
+    }
+
+
+class SubnetMapping(AWSProperty):
+    props = {
+        'AllocationId': (basestring, False),
+        'SubnetId': (basestring, True),
+    }
+
+
+# elasticloadbalancingv2.LoadBalancer, which gained network load balancers.
+class LoadBalancerV2(elbv2.LoadBalancer):
+    props = dict(elbv2.LoadBalancer.props, **{
+        'IpAddressType': (basestring, False),
+        'SubnetMappings': ([SubnetMapping], False),
+        'Subnets': (list, False),
+        'Type': (basestring, False),
+    })
+
+
+class TargetGroup(elbv2.TargetGroup):
+    props = dict(elbv2.TargetGroup.props, **{
+        # Either a port or "traffic-port"
+        'HealthCheckPort': (basestring, False),
+        'TargetType': (basestring, False),
+    })
+
+
+# rds.DBCluster, which gained cluster identifiers & the aurora-mysql and
+# aurora-postgresql engines.
+class DBCluster(rds.DBCluster):
+    props = dict(rds.DBCluster.props, **{
+        'DBClusterIdentifier': (basestring, False),
+        'Engine': (basestring, True),
+    })
+
+
+# rds.DBInstance, which gained the aurora-mysql and aurora-postgresql engines,
+# Performance Insights, cross-region replicas & backup replication.
+class DBInstance(rds.DBInstance):
+    props = dict(rds.DBInstance.props, **{
+        'AutomaticBackupReplicationKmsKeyId': (basestring, False),
+        'AutomaticBackupReplicationRegion': (basestring, False),
+        'EnablePerformanceInsights': (boolean, False),
+        'Engine': (basestring, False),
+        'PerformanceInsightsKMSKeyId': (basestring, False),
+        'PerformanceInsightsRetentionPeriod': (integer, False),
+        'SourceRegion': (basestring, False),
+    })
+
+    def validate(self):
+        # Replicas inherit StorageEncrypted from their source, but a replica
+        # in another region needs a KmsKeyId from its own region.
+        if 'SourceDBInstanceIdentifier' not in self.properties or \
+                'KmsKeyId' not in self.properties:
+            return rds.DBInstance.validate(self)
+        properties = self.properties
+        self.properties = dict(properties)
+        del self.properties['KmsKeyId']
+        try:
+            return rds.DBInstance.validate(self)
+        finally:
+            self.properties = properties
+
+
+class TargetTrackingScalingPolicyConfiguration(AWSProperty):
+    props = {
+        'CustomizedMetricSpecification':
+            (CustomizedMetricSpecification, False),
+        'DisableScaleIn': (boolean, False),
+        'PredefinedMetricSpecification':
+            (PredefinedMetricSpecification, False),
+        'ScaleInCooldown': (integer, False),
+        'ScaleOutCooldown': (integer, False),
+        'TargetValue': (double, True),
+    }
+
+
+# applicationautoscaling.ScalingPolicy, which gained target tracking.
+class ApplicationScalingPolicy(applicationautoscaling.ScalingPolicy):
+    props = dict(applicationautoscaling.ScalingPolicy.props, **{
+        'TargetTrackingScalingPolicyConfiguration':
+            (TargetTrackingScalingPolicyConfiguration, False),
+    })
+
+
+class AuthFormat(AWSProperty):
+    props = {
+        'AuthScheme': (basestring, False),
+        'Description': (basestring, False),
+        'IAMAuth': (basestring, False),
+        'SecretArn': (basestring, False),
+        'UserName': (basestring, False),
+    }
+
+
+class DBProxy(AWSObject):
+    resource_type = "AWS::RDS::DBProxy"
+
+    props = {
+        'Auth': ([AuthFormat], True),
+        'DBProxyName': (basestring, True),
+        'DebugLogging': (boolean, False),
+        'EngineFamily': (basestring, True),
+        'IdleClientTimeout': (integer, False),
+        'RequireTLS': (boolean, False),
+        'RoleArn': (basestring, True),
+        'VpcSecurityGroupIds': (list, False),
+        'VpcSubnetIds': (list, True),
+    }
+
+
+class DBProxyEndpoint(AWSObject):
+    resource_type = "AWS::RDS::DBProxyEndpoint"
+
+    props = {
+        'DBProxyEndpointName': (basestring, True),
+        'DBProxyName': (basestring, True),
+        'TargetRole': (basestring, False),
+        'VpcSecurityGroupIds': (list, False),
+        'VpcSubnetIds': (list, True),
+    }
+
+
+class ConnectionPoolConfigurationInfoFormat(AWSProperty):
+    props = {
+        'ConnectionBorrowTimeout': (integer, False),
+        'InitQuery': (basestring, False),
+        'MaxConnectionsPercent': (integer, False),
+        'MaxIdleConnectionsPercent': (integer, False),
+        'SessionPinningFilters': ([basestring], False),
+    }
+
+
+class DBProxyTargetGroup(AWSObject):
+    resource_type = "AWS::RDS::DBProxyTargetGroup"
+
+    props = {
+        'ConnectionPoolConfigurationInfo':
+            (ConnectionPoolConfigurationInfoFormat, False),
+        'DBClusterIdentifiers': (list, False),
+        'DBInstanceIdentifiers': (list, False),
+        'DBProxyName': (basestring, True),
+        'TargetGroupName': (basestring, True),
+    }
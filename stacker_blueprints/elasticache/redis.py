@@ -1,4 +1,5 @@
 from . import base
+from .. import engines
 
 
 class RedisReplicationGroup(base.BaseReplicationGroup):
@@ -6,7 +7,7 @@ class RedisReplicationGroup(base.BaseReplicationGroup):
         return "redis"
 
     def get_engine_versions(self):
-        return ["2.6.13", "2.8.19", "2.8.21", "2.8.22", "2.8.23", "2.8.6"]
+        return engines.get_engine(self.engine()).versions
 
     def get_parameter_group_family(self):
-        return ["redis2.6", "redis2.8"]
+        return engines.get_engine(self.engine()).families
@@ -2,14 +2,79 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-from troposphere import Base64, Join
+from troposphere import Base64, Join, Ref
 
 from stacker.blueprints.base import Blueprint
 
+from ..asg import (
+    cfn_signal,
+    create_health_check_conditions,
+    create_lifecycle_hooks,
+    create_warm_pool,
+    creation_policy,
+    health_check_properties,
+    rolling_update_policy,
+    signals_required,
+)
+
 
 class EmpireBase(Blueprint):
+    LOCAL_PARAMETERS = {
+        # Scheduled changes to the size of the autoscaling group. See
+        # stacker_blueprints.asg.create_scheduled_actions.
+        "ScheduledActions": {
+            "type": list,
+            "default": [],
+        },
+        # Launch from a mix of instance types and spot instances. See
+        # stacker_blueprints.launch_template.mixed_instances_policy.
+        "MixedInstancesPolicy": {
+            "type": dict,
+            "default": {},
+        },
+        # EBS optimization, detailed monitoring, metadata and placement
+        # settings for the launch template. See
+        # stacker_blueprints.launch_template.launch_template_data.
+        "LaunchTemplateOptions": {
+            "type": dict,
+            "default": {},
+        },
+        # Replace instances in batches when the launch template changes. See
+        # stacker_blueprints.asg.rolling_update_policy.
+        "RollingUpdate": {
+            "type": dict,
+            "default": {},
+        },
+        # Wait for instances to signal they booted before the group is
+        # created. See stacker_blueprints.asg.creation_policy.
+        "CreationPolicy": {
+            "type": dict,
+            "default": {},
+        },
+        # Shell commands that exit 0 once an instance is ready, needed when
+        # the CreationPolicy or RollingUpdate waits on signals. The image
+        # needs cfn-bootstrap to send them. See
+        # stacker_blueprints.asg.cfn_signal.
+        "SignalCheck": {
+            "type": str,
+            "default": "",
+        },
+        # Hold instances as they launch or terminate. See
+        # stacker_blueprints.asg.create_lifecycle_hooks.
+        "LifecycleHooks": {
+            "type": list,
+            "default": [],
+        },
+        # Keep pre-initialized instances ready to scale out into. See
+        # stacker_blueprints.asg.create_warm_pool.
+        "WarmPool": {
+            "type": dict,
+            "default": {},
+        },
+    }
+
     def create_conditions(self):
-        logger.debug("No conditions to setup for %s", self.name)
+        create_health_check_conditions(self.template)
 
     def create_security_groups(self):
         logger.debug("No security_groups to setup for %s", self.name)
@@ -29,20 +94,63 @@ class EmpireBase(Blueprint):
     def generate_seed_contents(self):
         raise Exception('Empire subclass must define seed contents')
 
-    def generate_user_data(self):
+    def get_health_check_properties(self):
+        """Returns the group's health check, termination & metrics settings.
+
+        The Empire groups aren't behind a load balancer, so only EC2 health
+        checks are used by default.
+        """
+        return health_check_properties()
+
+    def get_update_policies(self):
+        """Returns the UpdatePolicy & CreationPolicy for the group, if any."""
+        rolling_update = self.local_parameters["RollingUpdate"]
+        creation = self.local_parameters["CreationPolicy"]
+        policies = {}
+        if rolling_update:
+            policies["UpdatePolicy"] = rolling_update_policy(rolling_update)
+        if creation:
+            policies["CreationPolicy"] = creation_policy(
+                creation, Ref("MinHosts"))
+        return policies
+
+    def create_lifecycle_resources(self, asg_name):
+        """Adds the group's lifecycle hooks and warm pool, if any."""
+        create_lifecycle_hooks(self.template, asg_name,
+                               self.local_parameters["LifecycleHooks"])
+        if self.local_parameters["WarmPool"]:
+            create_warm_pool(self.template, asg_name,
+                             self.local_parameters["WarmPool"],
+                             self.local_parameters["MixedInstancesPolicy"])
+
+    def generate_user_data(self, signal_resource=None):
         contents = Join("", self.generate_seed_contents())
-        stanza = Base64(Join(
-            "",
-            [
-                "#cloud-config\n",
-                "write_files:\n",
+        lines = [
+            "#cloud-config\n",
+            "write_files:\n",
+            "  - encoding: b64\n",
+            "    content: ", Base64(contents), "\n",
+            "    owner: root:root\n",
+            "    path: /etc/empire/seed\n",
+            "    permissions: 0640\n"
+        ]
+        if signal_resource and signals_required(
+                self.local_parameters["RollingUpdate"],
+                self.local_parameters["CreationPolicy"]):
+            # Written out as a script, so the check doesn't need quoting
+            # for YAML.
+            script = ["#!/bin/bash\n"] + cfn_signal(
+                signal_resource, self.local_parameters["SignalCheck"])
+            lines += [
                 "  - encoding: b64\n",
-                "    content: ", Base64(contents), "\n",
+                "    content: ", Base64(Join("", script)), "\n",
                 "    owner: root:root\n",
-                "    path: /etc/empire/seed\n",
-                "    permissions: 0640\n"
+                "    path: /etc/empire/signal\n",
+                "    permissions: 0750\n",
+                "runcmd:\n",
+                "  - /etc/empire/signal\n",
             ]
-        ))
+        stanza = Base64(Join("", lines))
         return stanza
 
     def create_template(self):
@@ -20,6 +20,8 @@ from awacs.helpers.trust import (
     get_default_assumerole_policy,
 )
 
+from ..asg import create_scheduled_actions, health_check_parameters
+from ..launch_template import create_autoscaling_group
 from .base import EmpireBase
 
 from .policies import ecs_agent_policy
@@ -84,6 +86,7 @@ class EmpireController(EmpireBase):
             "type": "String",
             "description": "Email for authentication with docker registry."},
     }
+    PARAMETERS.update(health_check_parameters())
 
     def create_security_groups(self):
         t = self.template
@@ -153,9 +156,11 @@ class EmpireController(EmpireBase):
 
     def create_autoscaling_group(self):
         t = self.template
-        t.add_resource(
-            autoscaling.LaunchConfiguration(
-                "EmpireControllerLaunchConfig",
+        create_autoscaling_group(
+            t,
+            "EmpireControllerAutoscalingGroup",
+            "EmpireControllerLaunchTemplate",
+            dict(
                 IamInstanceProfile=GetAtt("EmpireControllerProfile", "Arn"),
                 ImageId=FindInMap(
                     "AmiMap",
@@ -164,14 +169,19 @@ class EmpireController(EmpireBase):
                 BlockDeviceMappings=self.build_block_device(),
                 InstanceType=Ref("InstanceType"),
                 KeyName=Ref("SshKeyName"),
-                UserData=self.generate_user_data(),
-                SecurityGroups=[Ref("DefaultSG"), Ref(CLUSTER_SG_NAME)]))
-        t.add_resource(
-            autoscaling.AutoScalingGroup(
-                "EmpireControllerAutoscalingGroup",
+                UserData=self.generate_user_data(
+                    "EmpireControllerAutoscalingGroup"),
+                SecurityGroups=[Ref("DefaultSG"), Ref(CLUSTER_SG_NAME)]),
+            dict(
                 AvailabilityZones=Ref("AvailabilityZones"),
-                LaunchConfigurationName=Ref("EmpireControllerLaunchConfig"),
                 MinSize=Ref("MinHosts"),
                 MaxSize=Ref("MaxHosts"),
                 VPCZoneIdentifier=Ref("PrivateSubnets"),
-                Tags=[ASTag("Name", "empire_controller", True)]))
+                Tags=[ASTag("Name", "empire_controller", True)],
+                **dict(self.get_health_check_properties(),
+                       **self.get_update_policies())),
+            self.local_parameters["MixedInstancesPolicy"],
+            self.local_parameters["LaunchTemplateOptions"])
+        create_scheduled_actions(t, "EmpireControllerAutoscalingGroup",
+                                 self.local_parameters["ScheduledActions"])
+        self.create_lifecycle_resources("EmpireControllerAutoscalingGroup")
@@ -32,6 +32,12 @@ from awacs.helpers.trust import (
 
 from stacker.blueprints.base import Blueprint
 
+from ..load_balancer import (
+    classic_elb_parameters,
+    classic_elb_properties,
+    create_classic_elb_conditions,
+)
+
 from .policies import (
     empire_policy,
     service_role_policy,
@@ -244,6 +250,8 @@ class EmpireDaemon(Blueprint):
             ),
             "default": "50"}
     }
+    # Keep connections open for an hour, for long running `emp run`s.
+    PARAMETERS.update(classic_elb_parameters(idle_timeout="3600"))
 
     def create_template(self):
         self.create_conditions()
@@ -262,6 +270,7 @@ class EmpireDaemon(Blueprint):
         self.template.add_condition(
             "UseIAMCert",
             Not(Equals(Ref("ELBCertType"), "acm")))
+        create_classic_elb_conditions(t)
         t.add_condition(
             "EnableSNSEvents",
             Equals(Ref("EventsBackend"), "sns"))
@@ -371,17 +380,10 @@ class EmpireDaemon(Blueprint):
         t.add_resource(
             elb.LoadBalancer(
                 "LoadBalancer",
-                HealthCheck=elb.HealthCheck(
-                    Target="HTTP:8081/health",
-                    HealthyThreshold=3,
-                    UnhealthyThreshold=3,
-                    Interval=5,
-                    Timeout=3),
-                ConnectionSettings=elb.ConnectionSettings(
-                    IdleTimeout=3600),  # 1 hour
                 Listeners=self.setup_listeners(),
                 SecurityGroups=[Ref(ELB_SG_NAME), ],
-                Subnets=Ref("PublicSubnets")))
+                Subnets=Ref("PublicSubnets"),
+                **classic_elb_properties("HTTP:8081/health")))
 
         # Setup ELB DNS
         t.add_resource(
@@ -10,6 +10,12 @@ from troposphere.iam import Role, InstanceProfile, Policy
 
 from awacs.helpers.trust import get_default_assumerole_policy
 
+from ..asg import (
+    create_health_check_conditions,
+    create_scheduled_actions,
+    health_check_parameters,
+)
+from ..launch_template import create_autoscaling_group
 from .base import EmpireBase
 
 from .policies import ecs_agent_policy, logstream_policy
@@ -92,12 +98,14 @@ class EmpireMinion(EmpireBase):
             ),
             "default": ""},
     }
+    PARAMETERS.update(health_check_parameters())
 
     def create_conditions(self):
         t = self.template
         t.add_condition(
             "EnableStreamingLogs",
             Equals(Ref("DisableStreamingLogs"), ""))
+        create_health_check_conditions(t)
 
     def create_security_groups(self):
         t = self.template
@@ -228,9 +236,11 @@ class EmpireMinion(EmpireBase):
 
     def create_autoscaling_group(self):
         t = self.template
-        t.add_resource(
-            autoscaling.LaunchConfiguration(
-                "EmpireMinionLaunchConfig",
+        create_autoscaling_group(
+            t,
+            "EmpireMinionAutoscalingGroup",
+            "EmpireMinionLaunchTemplate",
+            dict(
                 IamInstanceProfile=GetAtt("EmpireMinionProfile", "Arn"),
                 ImageId=FindInMap(
                     "AmiMap",
@@ -239,14 +249,19 @@ class EmpireMinion(EmpireBase):
                 BlockDeviceMappings=self.build_block_device(),
                 InstanceType=Ref("InstanceType"),
                 KeyName=Ref("SshKeyName"),
-                UserData=self.generate_user_data(),
-                SecurityGroups=[Ref("DefaultSG"), Ref(CLUSTER_SG_NAME)]))
-        t.add_resource(
-            autoscaling.AutoScalingGroup(
-                "EmpireMinionAutoscalingGroup",
+                UserData=self.generate_user_data(
+                    "EmpireMinionAutoscalingGroup"),
+                SecurityGroups=[Ref("DefaultSG"), Ref(CLUSTER_SG_NAME)]),
+            dict(
                 AvailabilityZones=Ref("AvailabilityZones"),
-                LaunchConfigurationName=Ref("EmpireMinionLaunchConfig"),
                 MinSize=Ref("MinHosts"),
                 MaxSize=Ref("MaxHosts"),
                 VPCZoneIdentifier=Ref("PrivateSubnets"),
-                Tags=[ASTag("Name", "empire_minion", True)]))
+                Tags=[ASTag("Name", "empire_minion", True)],
+                **dict(self.get_health_check_properties(),
+                       **self.get_update_policies())),
+            self.local_parameters["MixedInstancesPolicy"],
+            self.local_parameters["LaunchTemplateOptions"])
+        create_scheduled_actions(t, "EmpireMinionAutoscalingGroup",
+                                 self.local_parameters["ScheduledActions"])
+        self.create_lifecycle_resources("EmpireMinionAutoscalingGroup")
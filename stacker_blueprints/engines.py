@@ -0,0 +1,143 @@
+""" Catalog of the RDS & ElastiCache engines, their versions & families.
+
+The catalog lives in engines.json, next to this module, so adding a new
+engine version is a one line change to the data rather than the
+blueprints. Each engine lists its parameter group families, and each
+family the major version (used for option groups) and engine versions in
+it, ie::
+
+    "postgres": {
+        "service": "rds",
+        "kind": "instance",
+        "families": {
+            "postgres15": {"major": "15", "versions": ["15.2", "15.3"]}
+        }
+    }
+
+The file is only read the first time the catalog is used, and indexed by
+engine, family & version then, so looking any of them up is a dict lookup.
+"""
+
+from collections import OrderedDict, namedtuple
+import json
+import os
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "engines.json")
+
+Engine = namedtuple("Engine", [
+    "name", "service", "kind", "versions", "families", "major_versions",
+    "family_majors", "version_families",
+])
+
+_catalog = None
+
+
+def _index_engine(name, data):
+    versions = []
+    major_versions = []
+    family_majors = OrderedDict()
+    version_families = {}
+    for family, family_data in data["families"].items():
+        major = family_data["major"]
+        family_majors[family] = major
+        if major not in major_versions:
+            major_versions.append(major)
+        for version in family_data["versions"]:
+            if version in version_families:
+                raise ValueError("Engine version %s of %s is in both the "
+                                 "%s and %s families." %
+                                 (version, name, version_families[version],
+                                  family))
+            version_families[version] = family
+            versions.append(version)
+    return Engine(name, data["service"], data["kind"], versions,
+                  list(family_majors), major_versions, family_majors,
+                  version_families)
+
+
+def load_catalog(path=CATALOG_FILE):
+    """Reads & indexes a catalog file.
+
+    Returns:
+        :class:`collections.OrderedDict`: :class:`Engine` s, keyed by
+            engine name, in the order the file lists them.
+    """
+    with open(path) as fd:
+        data = json.load(fd, object_pairs_hook=OrderedDict)
+    catalog = OrderedDict()
+    for name, engine_data in data["engines"].items():
+        catalog[name] = _index_engine(name, engine_data)
+    return catalog
+
+
+def get_catalog():
+    """Returns the catalog, loading it the first time it's used."""
+    global _catalog
+    if _catalog is None:
+        _catalog = load_catalog()
+    return _catalog
+
+
+def get_engine(name):
+    """Looks up an engine in the catalog.
+
+    Args:
+        name (str): The engine, ie: postgres
+
+    Returns:
+        :class:`Engine`: The engine's versions & families.
+    """
+    try:
+        return get_catalog()[name]
+    except KeyError:
+        raise ValueError("Unknown engine %s." % name)
+
+
+def get_engine_names(service, kind=None):
+    """Returns the engines of a service, ie: rds, optionally only those of
+    the given kind, ie: instance or cluster."""
+    return [engine.name for engine in get_catalog().values()
+            if engine.service == service and
+            (kind is None or engine.kind == kind)]
+
+
+def get_families(service, kind=None):
+    """Returns the parameter group families of all the engines of a
+    service, optionally only those of the given kind."""
+    families = []
+    for name in get_engine_names(service, kind):
+        families.extend(get_engine(name).families)
+    return families
+
+
+def validate_engine_version(name, version=None, family=None,
+                            major_version=None):
+    """Checks an engine version, parameter group family & major version go
+    together. Any of them that aren't given aren't checked.
+
+    Engines without versions in the catalog only have their family & major
+    version checked.
+    """
+    engine = get_engine(name)
+    if family and family not in engine.family_majors:
+        raise ValueError("%s isn't a parameter group family of %s, use one "
+                         "of: %s" % (family, name, ", ".join(engine.families)))
+    if version and engine.versions:
+        if version not in engine.version_families:
+            raise ValueError("%s isn't a version of %s." % (version, name))
+        version_family = engine.version_families[version]
+        if family and family != version_family:
+            raise ValueError("%s %s needs the %s parameter group family, "
+                             "not %s." % (name, version, version_family,
+                                          family))
+        family = version_family
+    if major_version and major_version not in engine.major_versions:
+        raise ValueError("%s isn't a major version of %s, use one of: %s" %
+                         (major_version, name,
+                          ", ".join(engine.major_versions)))
+    if family and major_version and \
+            engine.family_majors[family] != major_version:
+        raise ValueError("The %s parameter group family is for %s %s, not "
+                         "%s." % (family, name, engine.family_majors[family],
+                                  major_version))
@@ -0,0 +1,290 @@
+""" Helpers for launching autoscaling group instances from launch templates.
+
+Blueprints describe their instances with LaunchConfiguration properties,
+which these helpers turn into a LaunchTemplate, along with a few settings
+launch configurations don't have. Every change to the instances creates a
+new version of the template, which the group then launches from.
+"""
+
+from troposphere import GetAtt, Ref, ec2
+
+from . import compat
+from .util import boolean
+
+TENANCIES = ("default", "dedicated", "host")
+METADATA_HTTP_TOKENS = ("optional", "required")
+METADATA_HTTP_ENDPOINTS = ("enabled", "disabled")
+
+PLACEMENT_STRATEGIES = ("cluster", "spread", "partition")
+MAX_PARTITIONS = 7
+
+# Instance families with enhanced networking, either through the Elastic
+# Network Adapter or the Intel 82599 VF interface.
+ENHANCED_NETWORKING_FAMILIES = (
+    "a1",
+    "c3", "c4", "c5", "c5a", "c5ad", "c5d", "c5n", "c6a", "c6g", "c6gd",
+    "c6gn", "c6i", "c6id", "c6in", "c7g",
+    "d2", "d3", "d3en",
+    "g4ad", "g4dn", "g5",
+    "h1",
+    "i2", "i3", "i3en", "i4i",
+    "inf1",
+    "m4", "m5", "m5a", "m5ad", "m5d", "m5dn", "m5n", "m5zn", "m6a", "m6g",
+    "m6gd", "m6i", "m6id", "m6in", "m7g",
+    "p3", "p3dn", "p4d",
+    "r3", "r4", "r5", "r5a", "r5ad", "r5b", "r5d", "r5dn", "r5n", "r6a",
+    "r6g", "r6gd", "r6i", "r6id", "r6in", "r7g",
+    "t3", "t3a", "t4g",
+    "x1", "x1e", "x2gd", "x2idn", "x2iedn",
+    "z1d",
+)
+
+SPOT_ALLOCATION_STRATEGIES = (
+    "lowest-price",
+    "capacity-optimized",
+    "capacity-optimized-prioritized",
+)
+
+
+def block_device_mapping(mapping):
+    """Converts an autoscaling BlockDeviceMapping to an ec2 one."""
+    attrs = dict(mapping.properties)
+    if "Ebs" in attrs:
+        attrs["Ebs"] = ec2.EBSBlockDevice(**attrs["Ebs"].properties)
+    return ec2.BlockDeviceMapping(**attrs)
+
+
+def metadata_options(options):
+    """Builds instance metadata options, validating them as we go."""
+    options = dict(options)
+    if options.get("HttpTokens", "optional") not in METADATA_HTTP_TOKENS:
+        raise ValueError("HttpTokens must be one of %s." %
+                         ", ".join(METADATA_HTTP_TOKENS))
+    if options.get("HttpEndpoint", "enabled") not in METADATA_HTTP_ENDPOINTS:
+        raise ValueError("HttpEndpoint must be one of %s." %
+                         ", ".join(METADATA_HTTP_ENDPOINTS))
+    hop_limit = int(options.get("HttpPutResponseHopLimit", 1))
+    if not 1 <= hop_limit <= 64:
+        raise ValueError("HttpPutResponseHopLimit must be between 1 and 64.")
+    return compat.MetadataOptions(**options)
+
+
+def supports_enhanced_networking(instance_type):
+    return instance_type.split(".")[0] in ENHANCED_NETWORKING_FAMILIES
+
+
+def enhanced_networking_pattern():
+    """Returns a pattern matching instance types with enhanced networking,
+    for the AllowedPattern of an InstanceType parameter."""
+    return r"^(%s)\.[0-9a-z]+$" % "|".join(ENHANCED_NETWORKING_FAMILIES)
+
+
+def validate_enhanced_networking(instance_types):
+    for instance_type in instance_types:
+        if not supports_enhanced_networking(instance_type):
+            raise ValueError("Instance type %s doesn't support enhanced "
+                             "networking." % instance_type)
+
+
+def requires_enhanced_networking(settings):
+    """Returns True if a placement group's instances need enhanced
+    networking, which defaults to cluster placement groups only."""
+    return boolean(settings.get("RequireEnhancedNetworking",
+                                settings.get("Strategy") == "cluster"))
+
+
+def create_placement_group(template, name, settings):
+    """Creates a PlacementGroup.
+
+    Args:
+        template (:class:`troposphere.Template`): The template to add the
+            placement group to.
+        name (str): The name of the PlacementGroup resource.
+        settings (dict): The Strategy, one of cluster (packed close
+            together for low latency), spread (on distinct hardware) or
+            partition, with PartitionCount (default: 2) partitions.
+
+    Returns:
+        :class:`compat.PlacementGroup`: The placement group.
+    """
+    strategy = settings.get("Strategy")
+    if strategy not in PLACEMENT_STRATEGIES:
+        raise ValueError("Placement group Strategy must be one of %s." %
+                         ", ".join(PLACEMENT_STRATEGIES))
+    attrs = {"Strategy": strategy}
+    if strategy == "partition":
+        partitions = int(settings.get("PartitionCount", 2))
+        if not 1 <= partitions <= MAX_PARTITIONS:
+            raise ValueError("PartitionCount must be between 1 and %s." %
+                             MAX_PARTITIONS)
+        attrs["PartitionCount"] = partitions
+    elif "PartitionCount" in settings:
+        raise ValueError("PartitionCount can only be used with the "
+                         "partition Strategy.")
+    return template.add_resource(compat.PlacementGroup(name, **attrs))
+
+
+def launch_template_data(launch_config, options=None):
+    """Builds LaunchTemplateData from LaunchConfiguration properties.
+
+    Args:
+        launch_config (dict): Properties for an
+            :class:`troposphere.autoscaling.LaunchConfiguration`.
+        options (dict, optional): Settings on top of the launch
+            configuration:
+
+            - EbsOptimized (bool): Launch EBS optimized instances.
+            - Hibernation (bool): Let instances hibernate, ie: in a
+              Hibernated warm pool. The root volume must be encrypted and
+              big enough to hold the instance's memory.
+            - DetailedMonitoring (bool): Send instance metrics every minute,
+              rather than every five.
+            - MetadataOptions (dict): HttpTokens, HttpEndpoint and
+              HttpPutResponseHopLimit for the instance metadata service.
+            - PlacementGroup (str): The placement group to launch into.
+            - Tenancy (str): One of default, dedicated or host.
+
+    Returns:
+        :class:`compat.LaunchTemplateData`: The equivalent launch template
+            data.
+    """
+    attrs = dict(launch_config)
+    options = options or {}
+    security_groups = attrs.pop("SecurityGroups", [])
+    if attrs.get("UserData") == "":
+        del attrs["UserData"]
+    if "IamInstanceProfile" in attrs:
+        attrs["IamInstanceProfile"] = ec2.IamInstanceProfile(
+            Arn=attrs["IamInstanceProfile"])
+    if "BlockDeviceMappings" in attrs:
+        attrs["BlockDeviceMappings"] = [
+            block_device_mapping(m) for m in attrs["BlockDeviceMappings"]]
+    if "DetailedMonitoring" in options:
+        attrs["InstanceMonitoring"] = boolean(options["DetailedMonitoring"])
+    if "InstanceMonitoring" in attrs:
+        attrs["Monitoring"] = ec2.Monitoring(
+            Enabled=attrs.pop("InstanceMonitoring"))
+    if "EbsOptimized" in options:
+        attrs["EbsOptimized"] = boolean(options["EbsOptimized"])
+    if boolean(options.get("Hibernation", False)):
+        attrs["HibernationOptions"] = compat.HibernationOptions(
+            Configured=True)
+    if "MetadataOptions" in options:
+        attrs["MetadataOptions"] = metadata_options(
+            options["MetadataOptions"])
+
+    placement = {}
+    tenancy = options.get("Tenancy", attrs.pop("PlacementTenancy", None))
+    if tenancy:
+        if tenancy not in TENANCIES:
+            raise ValueError("Tenancy must be one of %s." %
+                             ", ".join(TENANCIES))
+        placement["Tenancy"] = tenancy
+    if options.get("PlacementGroup"):
+        placement["GroupName"] = options["PlacementGroup"]
+    if placement:
+        attrs["Placement"] = compat.Placement(**placement)
+
+    if "AssociatePublicIpAddress" in attrs:
+        # Security groups have to go on the interface when one is given.
+        attrs["NetworkInterfaces"] = [ec2.NetworkInterfaces(
+            AssociatePublicIpAddress=attrs.pop("AssociatePublicIpAddress"),
+            DeviceIndex=0,
+            Groups=security_groups)]
+    else:
+        attrs["SecurityGroupIds"] = security_groups
+    return compat.LaunchTemplateData(**attrs)
+
+
+def validate_mixed_instances_policy(policy):
+    instance_types = policy.get("InstanceTypes")
+    if not instance_types:
+        raise ValueError("MixedInstancesPolicy needs a list of "
+                         "InstanceTypes.")
+    strategy = policy.get("SpotAllocationStrategy", "capacity-optimized")
+    if strategy not in SPOT_ALLOCATION_STRATEGIES:
+        raise ValueError("SpotAllocationStrategy must be one of %s." %
+                         ", ".join(SPOT_ALLOCATION_STRATEGIES))
+    percentage = int(policy.get("OnDemandPercentageAboveBaseCapacity", 100))
+    if not 0 <= percentage <= 100:
+        raise ValueError("OnDemandPercentageAboveBaseCapacity must be "
+                         "between 0 and 100.")
+    if "SpotInstancePools" in policy and strategy != "lowest-price":
+        raise ValueError("SpotInstancePools can only be used with the "
+                         "lowest-price SpotAllocationStrategy.")
+
+
+def launch_template_specification(launch_template):
+    """Points at the latest version of a LaunchTemplate resource."""
+    return compat.LaunchTemplateSpecification(
+        LaunchTemplateId=Ref(launch_template),
+        Version=GetAtt(launch_template, "LatestVersionNumber"))
+
+
+def mixed_instances_policy(launch_template, policy):
+    """Builds a MixedInstancesPolicy for an autoscaling group.
+
+    Args:
+        launch_template (str): The name of the LaunchTemplate resource.
+        policy (dict): InstanceTypes, a list of instance types to launch,
+            along with OnDemandBaseCapacity (default: 0),
+            OnDemandPercentageAboveBaseCapacity (default: 100),
+            SpotAllocationStrategy (default: capacity-optimized) and
+            optionally SpotInstancePools & SpotMaxPrice.
+
+    Returns:
+        :class:`compat.MixedInstancesPolicy`: The policy.
+    """
+    validate_mixed_instances_policy(policy)
+    distribution = {
+        "OnDemandBaseCapacity": policy.get("OnDemandBaseCapacity", 0),
+        "OnDemandPercentageAboveBaseCapacity": policy.get(
+            "OnDemandPercentageAboveBaseCapacity", 100),
+        "SpotAllocationStrategy": policy.get(
+            "SpotAllocationStrategy", "capacity-optimized"),
+    }
+    for attr in ("SpotInstancePools", "SpotMaxPrice"):
+        if attr in policy:
+            distribution[attr] = policy[attr]
+    return compat.MixedInstancesPolicy(
+        InstancesDistribution=compat.InstancesDistribution(**distribution),
+        LaunchTemplate=compat.MixedInstancesLaunchTemplate(
+            LaunchTemplateSpecification=launch_template_specification(
+                launch_template),
+            Overrides=[
+                compat.LaunchTemplateOverrides(InstanceType=instance_type)
+                for instance_type in policy["InstanceTypes"]]))
+
+
+def create_autoscaling_group(template, name, launch_template_name,
+                             launch_config, group, mixed_instances=None,
+                             options=None):
+    """Creates an autoscaling group and the LaunchTemplate it launches from.
+
+    Args:
+        template (:class:`troposphere.Template`): The template to add the
+            resources to.
+        name (str): The name of the AutoScalingGroup resource.
+        launch_template_name (str): The name of the LaunchTemplate resource.
+        launch_config (dict): LaunchConfiguration properties describing the
+            instances, see :func:`launch_template_data`.
+        group (dict): AutoScalingGroup properties.
+        mixed_instances (dict, optional): If given, launch a mix of instance
+            types with this :func:`mixed_instances_policy`.
+        options (dict, optional): Extra launch template settings, see
+            :func:`launch_template_data`.
+
+    Returns:
+        :class:`compat.AutoScalingGroup`: The autoscaling group.
+    """
+    template.add_resource(compat.LaunchTemplate(
+        launch_template_name,
+        LaunchTemplateData=launch_template_data(launch_config, options)))
+    group = dict(group)
+    if mixed_instances:
+        group["MixedInstancesPolicy"] = mixed_instances_policy(
+            launch_template_name, mixed_instances)
+    else:
+        group["LaunchTemplate"] = launch_template_specification(
+            launch_template_name)
+    return template.add_resource(compat.AutoScalingGroup(name, **group))
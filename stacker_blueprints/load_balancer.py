@@ -0,0 +1,132 @@
+""" Helpers for tuning the classic ELBs created by the blueprints.
+
+Blueprints add :func:`classic_elb_parameters` to their PARAMETERS, call
+:func:`create_classic_elb_conditions` from create_conditions and pass
+:func:`classic_elb_properties` to their elb.LoadBalancer.
+"""
+
+from troposphere import Equals, If, Not, Ref
+from troposphere import elasticloadbalancing as elb
+
+ACCESS_LOG_INTERVALS = ["5", "60"]
+
+
+def classic_elb_parameters(idle_timeout="60"):
+    """Returns the CloudFormation parameters used to tune a classic ELB.
+
+    They don't apply to application or network load balancers, which are
+    tuned by the blueprints' local parameters instead, so their
+    descriptions say so.
+
+    Args:
+        idle_timeout (str, optional): The default idle timeout, in seconds.
+    """
+    parameters = {
+        "ELBCrossZone": {
+            "type": "String",
+            "description": "Spread requests evenly across the instances in "
+                           "every AZ, rather than evenly across AZs.",
+            "allowed_values": ["true", "false"],
+            "default": "true"},
+        "ELBConnectionDrainingTimeout": {
+            "type": "Number",
+            "description": "Seconds to let in-flight requests finish on an "
+                           "instance being deregistered or terminated. 0 "
+                           "disables connection draining.",
+            "min_value": "0",
+            "max_value": "3600",
+            "default": "300"},
+        "ELBIdleTimeout": {
+            "type": "Number",
+            "description": "Seconds a connection can be idle before the ELB "
+                           "closes it.",
+            "min_value": "1",
+            "max_value": "3600",
+            "default": idle_timeout},
+        "ELBHealthCheckInterval": {
+            "type": "Number",
+            "description": "Seconds between health checks of an instance.",
+            "default": "5"},
+        "ELBHealthCheckTimeout": {
+            "type": "Number",
+            "description": "Seconds without a response before a health "
+                           "check fails. Must be less than "
+                           "ELBHealthCheckInterval.",
+            "default": "3"},
+        "ELBHealthyThreshold": {
+            "type": "Number",
+            "description": "Consecutive passing health checks before an "
+                           "instance is put into service.",
+            "default": "3"},
+        "ELBUnhealthyThreshold": {
+            "type": "Number",
+            "description": "Consecutive failing health checks before an "
+                           "instance is taken out of service.",
+            "default": "3"},
+        "ELBAccessLogBucket": {
+            "type": "String",
+            "description": "S3 bucket to write ELB access logs to. Its policy "
+                           "must let the region's ELB account write to it. "
+                           "If not given, access logs are disabled.",
+            "default": ""},
+        "ELBAccessLogPrefix": {
+            "type": "String",
+            "description": "Prefix for the access logs in "
+                           "ELBAccessLogBucket.",
+            "default": ""},
+        "ELBAccessLogInterval": {
+            "type": "Number",
+            "description": "Minutes between access log files.",
+            "allowed_values": ACCESS_LOG_INTERVALS,
+            "default": "60"},
+    }
+    for parameter in parameters.values():
+        parameter["description"] += " Only applies to a classic ELB."
+    return parameters
+
+
+def create_classic_elb_conditions(template):
+    template.add_condition(
+        "EnableConnectionDraining",
+        Not(Equals(Ref("ELBConnectionDrainingTimeout"), "0")))
+    template.add_condition(
+        "EnableELBAccessLogs",
+        Not(Equals(Ref("ELBAccessLogBucket"), "")))
+
+
+def classic_elb_properties(health_check_target):
+    """Returns the tuned properties of a classic ELB.
+
+    Args:
+        health_check_target (str): The instance target to health check,
+            ie: HTTP:80/
+
+    Returns:
+        dict: Properties for a
+            :class:`troposphere.elasticloadbalancing.LoadBalancer`.
+    """
+    return {
+        "HealthCheck": elb.HealthCheck(
+            Target=health_check_target,
+            HealthyThreshold=Ref("ELBHealthyThreshold"),
+            UnhealthyThreshold=Ref("ELBUnhealthyThreshold"),
+            Interval=Ref("ELBHealthCheckInterval"),
+            Timeout=Ref("ELBHealthCheckTimeout")),
+        "CrossZone": Ref("ELBCrossZone"),
+        "ConnectionSettings": elb.ConnectionSettings(
+            IdleTimeout=Ref("ELBIdleTimeout")),
+        "ConnectionDrainingPolicy": If(
+            "EnableConnectionDraining",
+            elb.ConnectionDrainingPolicy(
+                Enabled=True,
+                Timeout=Ref("ELBConnectionDrainingTimeout")),
+            Ref("AWS::NoValue")),
+        "AccessLoggingPolicy": If(
+            "EnableELBAccessLogs",
+            elb.AccessLoggingPolicy(
+                Enabled=True,
+                EmitInterval=Ref("ELBAccessLogInterval"),
+                S3BucketName=Ref("ELBAccessLogBucket"),
+                S3BucketPrefix=Ref("ELBAccessLogPrefix")),
+            Ref("AWS::NoValue")),
+    }
@@ -0,0 +1,170 @@
+""" CloudWatch alarms for the RDS blueprints.
+
+The thresholds are worked out when the template is rendered, from the
+instance class, storage & IOPS the instance is created with. Any of them
+can be overridden with the blueprints' AlarmThresholds local parameter.
+"""
+
+from troposphere import Join, Ref
+from troposphere.cloudwatch import Alarm, MetricDimension
+
+from .instance_classes import GiB, get_instance_class, is_burstable
+from .storage import effective_storage_type, peak_iops
+
+# Metric: (Statistic, ComparisonOperator)
+ALARMS = (
+    ("CPUUtilization", "Average", "GreaterThanThreshold"),
+    ("FreeableMemory", "Average", "LessThanThreshold"),
+    ("FreeStorageSpace", "Minimum", "LessThanThreshold"),
+    ("ReadLatency", "Average", "GreaterThanThreshold"),
+    ("WriteLatency", "Average", "GreaterThanThreshold"),
+    ("DiskQueueDepth", "Average", "GreaterThanThreshold"),
+    ("BurstBalance", "Minimum", "LessThanThreshold"),
+    ("DatabaseConnections", "Maximum", "GreaterThanThreshold"),
+    ("ReplicaLag", "Maximum", "GreaterThanThreshold"),
+)
+ALARM_METRICS = [metric for metric, _, _ in ALARMS]
+
+# Burstable instances can only sustain their baseline CPU, so alarm well
+# before they start eating into their credits.
+CPU_THRESHOLD = 80
+BURSTABLE_CPU_THRESHOLD = 50
+# Fraction of the instance's memory or storage left before alarming.
+FREE_MEMORY_FRACTION = 0.1
+FREE_STORAGE_FRACTION = 0.1
+# Percent of the gp2 burst bucket left before alarming.
+BURST_BALANCE_THRESHOLD = 20
+# Fraction of max_connections in use before alarming.
+CONNECTIONS_FRACTION = 0.8
+# Seconds a replica can fall behind its master.
+REPLICA_LAG_THRESHOLD = 60
+
+# Seconds of read & write latency to alarm on, by storage type.
+LATENCY_THRESHOLDS = {
+    "standard": 0.05,
+    "gp2": 0.02,
+    "io1": 0.01,
+}
+
+# Bytes of DBInstanceClassMemory per connection in each engine's default
+# max_connections formula.
+MAX_CONNECTIONS_DIVISORS = {
+    "MySQL": 12582880,
+    "aurora-mysql": 12582880,
+    "postgres": 9531392,
+    "aurora-postgresql": 9531392,
+}
+MAX_CONNECTIONS = {
+    "postgres": 5000,
+    "aurora-postgresql": 5000,
+    "aurora-mysql": 16000,
+}
+
+
+def default_max_connections(engine, memory):
+    """Returns the engine's default max_connections on an instance with the
+    given bytes of memory, or None if it isn't known."""
+    divisor = MAX_CONNECTIONS_DIVISORS.get(engine)
+    if not divisor:
+        return None
+    connections = memory // divisor
+    if engine in MAX_CONNECTIONS:
+        connections = min(connections, MAX_CONNECTIONS[engine])
+    return connections
+
+
+def instance_thresholds(engine, instance_type, max_connections=None):
+    """Returns the thresholds of the alarms that depend on the instance
+    class.
+
+    Args:
+        engine (str): The RDS engine, if known.
+        instance_type (str): The DB instance class, ie: db.r5.large
+        max_connections (int, optional): The instance's max_connections, if
+            it isn't the engine's default.
+
+    Returns:
+        dict: Thresholds, keyed by metric.
+    """
+    thresholds = {"CPUUtilization": CPU_THRESHOLD}
+    if is_burstable(instance_type):
+        thresholds["CPUUtilization"] = BURSTABLE_CPU_THRESHOLD
+    instance_class = get_instance_class(instance_type)
+    if instance_class:
+        thresholds["FreeableMemory"] = int(
+            instance_class.memory * FREE_MEMORY_FRACTION)
+        if not max_connections:
+            max_connections = default_max_connections(engine,
+                                                      instance_class.memory)
+    if max_connections:
+        thresholds["DatabaseConnections"] = int(
+            int(max_connections) * CONNECTIONS_FRACTION)
+    return thresholds
+
+
+def storage_thresholds(storage_type, allocated_storage, iops):
+    """Returns the thresholds of the alarms on an instance's storage.
+
+    Args:
+        storage_type (str): The instance's StorageType parameter.
+        allocated_storage (int): GB of storage.
+        iops (int): Provisioned IOPS, or 0.
+
+    Returns:
+        dict: Thresholds, keyed by metric.
+    """
+    storage_type = effective_storage_type(storage_type, iops)
+    latency = LATENCY_THRESHOLDS.get(storage_type,
+                                     LATENCY_THRESHOLDS["standard"])
+    thresholds = {
+        "FreeStorageSpace": int(
+            int(allocated_storage) * GiB * FREE_STORAGE_FRACTION),
+        "ReadLatency": latency,
+        "WriteLatency": latency,
+        # The queue builds up past what the storage can do at the latency
+        # we're alarming on (Little's law).
+        "DiskQueueDepth": max(
+            1, int(peak_iops(storage_type, allocated_storage, iops) *
+                   latency)),
+    }
+    if storage_type == "gp2":
+        thresholds["BurstBalance"] = BURST_BALANCE_THRESHOLD
+    return thresholds
+
+
+def validate_thresholds(thresholds):
+    for metric in thresholds:
+        if metric not in ALARM_METRICS:
+            raise ValueError("AlarmThresholds can only override %s." %
+                             ", ".join(ALARM_METRICS))
+
+
+def create_alarms(template, instance, thresholds, topic):
+    """Creates the alarms on an RDS instance.
+
+    Args:
+        template (:class:`troposphere.Template`): The template to add the
+            alarms to.
+        instance (str): The name of the DBInstance resource.
+        thresholds (dict): Thresholds, keyed by metric. Metrics without one
+            aren't alarmed on.
+        topic: The ARN of the SNS topic to notify.
+    """
+    for metric, statistic, comparison in ALARMS:
+        if metric not in thresholds:
+            continue
+        template.add_resource(Alarm(
+            "%s%sAlarm" % (instance, metric),
+            AlarmDescription=Join("", [metric, " on ", Ref(instance)]),
+            Namespace="AWS/RDS",
+            MetricName=metric,
+            Dimensions=[MetricDimension(
+                Name="DBInstanceIdentifier",
+                Value=Ref(instance))],
+            Statistic=statistic,
+            Period=300,
+            EvaluationPeriods=2,
+            Threshold=str(thresholds[metric]),
+            ComparisonOperator=comparison,
+            AlarmActions=[topic],
+            OKActions=[topic]))
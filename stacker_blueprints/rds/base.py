@@ -1,21 +1,83 @@
+from awacs.aws import Policy
+from awacs.helpers.trust import make_simple_assume_statement
 from troposphere import (
-    Ref, ec2, Output, GetAtt, Not, Equals, Condition, And, Join, If, Tags
+    Ref, ec2, iam, Output, GetAtt, Not, Equals, Condition, And, Join, If,
+    Tags, Select, GetAZs,
 )
+from troposphere.applicationautoscaling import ScalableTarget
 from troposphere.rds import (
-    DBInstance, DBSubnetGroup, DBParameterGroup, OptionGroup,
+    DBSubnetGroup, DBParameterGroup, OptionGroup, DBClusterParameterGroup,
 )
 from troposphere.route53 import RecordSetType
+from troposphere.sns import Topic
 
 from stacker.blueprints.base import Blueprint
 
-RDS_ENGINES = ["MySQL", "oracle-se1", "oracle-se", "oracle-ee", "sqlserver-ee",
-               "sqlserver-se", "sqlserver-ex", "sqlserver-web", "postgres"]
+from .. import compat, engines
+from ..compat import basestring
+from ..util import boolean
+from . import alarms, storage
+
+MONITORING_INTERVALS = ["0", "1", "5", "10", "15", "30", "60"]
+READER_SCALING_METRICS = ["RDSReaderAverageCPUUtilization",
+                          "RDSReaderAverageDatabaseConnections"]
 
 # Resource name constants
 SUBNET_GROUP = "RDSSubnetGroup"
 SECURITY_GROUP = "RDSSecurityGroup"
 DBINSTANCE = "RDSDBInstance"
 DNS_RECORD = "DBInstanceDnsRecord"
+MONITORING_ROLE = "RDSMonitoringRole"
+ALARM_TOPIC = "RDSAlarmTopic"
+REPLICA = "RDSDBReplica%s"
+REPLICA_DNS_RECORD = "DBReplica%sDnsRecord"
+DBCLUSTER = "RDSDBCluster"
+CLUSTER_PARAMETER_GROUP = "ClusterParameterGroup"
+WRITER = "RDSDBWriter"
+READER = "RDSDBReader%s"
+READER_DNS_RECORD = "DBReaderDnsRecord"
+READER_SCALABLE_TARGET = "ReaderScalableTarget"
+READER_SCALING_POLICY = "ReaderScalingPolicy"
+
+
+def monitoring_parameters():
+    """Returns the parameters for Enhanced Monitoring & Performance Insights
+    of the RDS instances."""
+    return {
+        "MonitoringInterval": {
+            "type": "Number",
+            "description": "Seconds between Enhanced Monitoring OS metrics "
+                           "being collected from the instances. 0 disables "
+                           "Enhanced Monitoring.",
+            "allowed_values": MONITORING_INTERVALS,
+            "default": "0"},
+        "MonitoringRoleArn": {
+            "type": "String",
+            "description": "ARN of the role that lets RDS send Enhanced "
+                           "Monitoring metrics to CloudWatch Logs. If not "
+                           "given, one is created when Enhanced Monitoring "
+                           "is enabled.",
+            "default": ""},
+        "EnablePerformanceInsights": {
+            "type": "String",
+            "description": "Set to 'true' to collect the instances' query "
+                           "load in Performance Insights.",
+            "default": "false",
+            "allowed_values": ["true", "false"]},
+        "PerformanceInsightsRetentionPeriod": {
+            "type": "Number",
+            "description": "Days to keep Performance Insights data. 7 is "
+                           "free, otherwise a multiple of 31 up to 731.",
+            "min_value": "7",
+            "max_value": "731",
+            "default": "7"},
+        "PerformanceInsightsKmsKeyId": {
+            "type": "String",
+            "description": "ARN of the KMS key to encrypt Performance "
+                           "Insights data with. If not given, the RDS "
+                           "default key is used.",
+            "default": ""},
+    }
 
 
 class BaseRDS(Blueprint):
@@ -32,11 +94,40 @@ class BaseRDS(Blueprint):
             "type": dict,
             "default": {},
         },
+        # Set to create CloudWatch alarms on the instances.
+        "Alarms": {
+            "type": boolean,
+            "default": False,
+        },
+        # Overrides the alarms' thresholds, which are otherwise worked out
+        # from the InstanceType, AllocatedStorage & IOPS. Keyed by metric,
+        # ie: {"CPUUtilization": 90}
+        "AlarmThresholds": {
+            "type": dict,
+            "default": {},
+        },
+        # The workload the storage is sized for: SustainedIOPS, along with
+        # optionally Throughput (MiB/s), MinStorage (GB) & Profile, a list
+        # of (seconds, IOPS) phases gp2 storage has to get through without
+        # running out of burst credits. The recommended storage becomes the
+        # default StorageType, AllocatedStorage & IOPS, and whatever they
+        # are set to is checked against the Profile.
+        "StorageSizing": {
+            "type": dict,
+            "default": {},
+        },
     }
 
+    # The kind of RDS engine in the engine catalog the blueprint is for.
+    ENGINE_KIND = "instance"
+
     def engine(self):
         return None
 
+    def get_engines(self):
+        """Returns the engines the blueprint can be used with."""
+        return engines.get_engine_names("rds", self.ENGINE_KIND)
+
     def extra_parameters(self, parameters):
         """Modify parameter list for subclasses.
 
@@ -53,51 +144,52 @@ class BaseRDS(Blueprint):
     def get_engine_versions(self):
         """Used by engine specific subclasses - returns valid engine versions.
 
-        Should only be overridden if the class variable ENGINE is defined on
-        the class.
+        These come from the engine catalog, see
+        :mod:`stacker_blueprints.engines`.
 
         Return:
             list: A list of valid engine versions for the given engine.
         """
-        return []
+        if not self.engine():
+            return []
+        return engines.get_engine(self.engine()).versions
 
     def get_engine_major_versions(self):
         """Used by engine specific subclasses. Returns major engine versions.
 
-        By default will attempt to figure out the right thing to return by
-        returning a list of the first two parts of each version returned by
-        get_engine_versions.
+        These are the major versions of the engine's parameter group
+        families in the engine catalog, which are indexed when it's loaded.
 
         Return:
             list: A list of valid engine versions for the given engine.
         """
-        versions = self.get_engine_versions()
-        major_versions = []
-        for v in versions:
-            parts = v.split('.')
-            major_versions.append(".".join(parts[:2]))
-        return major_versions
+        if not self.engine():
+            return []
+        return engines.get_engine(self.engine()).major_versions
+
+    def get_parameter_presets(self):
+        """Used by engine specific subclasses. Returns DB parameters sized
+        for the instance class.
+
+        Parameters given in DatabaseParameters override these.
+
+        Return:
+            dict: DB parameters for the ParameterGroup.
+        """
+        return {}
 
     def get_db_families(self):
         """Returns available db families.
 
-        Should be overridden by engine specific subclasses to be more
-        specific.
+        Engine specific subclasses only get their engine's families, the
+        rest get those of every engine the blueprint can be used with.
 
         Return:
             list: A list of valid db families for a given db engine.
         """
-        return [
-            "mysql5.1", "mysql5.5", "mysql5.6", "mysql5.7",
-            "oracle-ee-11.2", "oracle-ee-12.1",
-            "oracle-se-11.2", "oracle-se-12.1",
-            "oracle-se1-11.2", "oracle-se1-12.1",
-            "postgres9.3", "postgres9.4", "postgres9.5",
-            "sqlserver-ee-10.50", "sqlserver-ee-11.00",
-            "sqlserver-ex-10.50", "sqlserver-ex-11.00",
-            "sqlserver-se-10.50", "sqlserver-se-11.00",
-            "sqlserver-web-10.50", "sqlserver-web-11.00"
-        ]
+        if self.engine():
+            return engines.get_engine(self.engine()).families
+        return engines.get_families("rds", self.ENGINE_KIND)
 
     def _get_parameters(self):
         parameters = {
@@ -131,21 +223,21 @@ class BaseRDS(Blueprint):
                                "standard unless IOPS is set, then it "
                                "defaults to io1",
                 "default": "default",
-                "allowed_values": ["default", "standard", "gp2", "io1"]
+                "allowed_values": storage.STORAGE_TYPES
             },
             "AllocatedStorage": {
                 "type": "Number",
                 "description": "Space, in GB, to allocate to RDS instance. If "
                                "IOPS is set below, this must be a minimum of "
-                               "100 and must be at least 1/10th the IOPs "
-                               "setting.",
+                               "100 and must be at least 1/50th the IOPs "
+                               "setting. gp2 storage needs at least 20.",
                 "default": "10"},
             "IOPS": {
                 "type": "Number",
                 "description": "If set, uses provisioned IOPS for the "
                                "database. Note: This must be no more than "
-                               "10x of AllocatedStorage. Minimum: 1000",
-                "max_value": "10000",
+                               "50x of AllocatedStorage. Minimum: 1000",
+                "max_value": str(storage.IO1_MAX_IOPS),
                 "default": "0"},
             "InternalZoneId": {
                 "type": "String",
@@ -187,9 +279,8 @@ class BaseRDS(Blueprint):
             },
             "EngineMajorVersion": {
                 "type": "String",
-                "description": "Major Version for the engine. Basically the "
-                               "first two parts of the EngineVersion you "
-                               "choose."
+                "description": "Major Version for the engine, ie: 5.7 for "
+                               "MySQL 5.7.44, or 15 for postgres 15.5."
             },
             "StorageEncrypted": {
                 "type": "String",
@@ -205,8 +296,17 @@ class BaseRDS(Blueprint):
                 "default": "",
             },
         }
+        parameters.update(monitoring_parameters())
+        if self.local_parameters["Alarms"]:
+            parameters["AlarmTopic"] = {
+                "type": "String",
+                "description": "ARN of the SNS topic to notify when an "
+                               "alarm changes state. If not given, one is "
+                               "created.",
+                "default": ""}
 
         parameters = self.extra_parameters(parameters)
+        parameters = self.apply_storage_sizing(parameters)
 
         engine_versions = self.get_engine_versions()
         if engine_versions:
@@ -221,16 +321,51 @@ class BaseRDS(Blueprint):
             parameters['Engine'] = {
                 "type": "String",
                 "description": "Database engine for the RDS Instance.",
-                "allowed_values": RDS_ENGINES
+                "allowed_values": self.get_engines()
             }
         else:
-            if self.engine() not in RDS_ENGINES:
+            if self.engine() not in self.get_engines():
                 raise ValueError("ENGINE must be one of: %s" %
-                                 ", ".join(RDS_ENGINES))
+                                 ", ".join(self.get_engines()))
 
         return parameters
 
-    def create_conditions(self):
+    def apply_storage_sizing(self, parameters):
+        """Defaults the storage parameters to the storage recommended for
+        the StorageSizing workload."""
+        sizing = self.local_parameters["StorageSizing"]
+        if not sizing:
+            return parameters
+        if "SustainedIOPS" not in sizing:
+            raise ValueError("StorageSizing needs the SustainedIOPS of the "
+                             "workload.")
+        recommended = storage.recommend_storage(
+            sizing["SustainedIOPS"],
+            throughput=sizing.get("Throughput", 0),
+            profile=sizing.get("Profile"),
+            min_storage=sizing.get("MinStorage", 0))
+        for name, value in recommended.items():
+            parameters[name]["default"] = str(value)
+        return parameters
+
+    def validate_engine_version(self):
+        engine = self.engine() or self.get_parameter_value("Engine")
+        if not engine:
+            return
+        engines.validate_engine_version(
+            engine,
+            version=self.get_parameter_value("EngineVersion"),
+            family=self.get_parameter_value("DBFamily"),
+            major_version=self.get_parameter_value("EngineMajorVersion"))
+
+    def validate_storage(self):
+        storage.validate_storage(
+            self.get_parameter_value("StorageType"),
+            self.get_parameter_value("AllocatedStorage"),
+            self.get_parameter_value("IOPS"),
+            self.local_parameters["StorageSizing"].get("Profile"))
+
+    def create_dns_conditions(self):
         t = self.template
         t.add_condition(
             "HasInternalZone",
@@ -246,6 +381,35 @@ class BaseRDS(Blueprint):
             And(Condition("HasInternalZone"),
                 Condition("HasInternalZoneName"),
                 Condition("HasInternalHostname")))
+
+    def create_monitoring_conditions(self):
+        t = self.template
+        t.add_condition(
+            "EnableEnhancedMonitoring",
+            Not(Equals(Ref("MonitoringInterval"), "0")))
+        t.add_condition(
+            "CreateMonitoringRole",
+            And(Condition("EnableEnhancedMonitoring"),
+                Equals(Ref("MonitoringRoleArn"), "")))
+        t.add_condition(
+            "EnablePerformanceInsights",
+            Equals(Ref("EnablePerformanceInsights"), "true"))
+        t.add_condition(
+            "HasPerformanceInsightsKmsKeyId",
+            And(Condition("EnablePerformanceInsights"),
+                Not(Equals(Ref("PerformanceInsightsKmsKeyId"), ""))))
+
+    def create_alarm_conditions(self):
+        if self.local_parameters["Alarms"]:
+            self.template.add_condition(
+                "CreateAlarmTopic",
+                Equals(Ref("AlarmTopic"), ""))
+
+    def create_conditions(self):
+        t = self.template
+        self.create_dns_conditions()
+        self.create_monitoring_conditions()
+        self.create_alarm_conditions()
         t.add_condition(
             "HasProvisionedIOPS",
             Not(Equals(Ref("IOPS"), "0")))
@@ -255,7 +419,7 @@ class BaseRDS(Blueprint):
         t.add_condition(
             "HasDBSnapshotIdentifier",
             Not(Equals(Ref("DBSnapshotIdentifier"), "")))
-        t.add_contion(
+        t.add_condition(
             "CreateSecurityGroup",
             Equals(Ref("ExistingSecurityGroup"), "")
         )
@@ -283,13 +447,50 @@ class BaseRDS(Blueprint):
         )
         t.add_output(Output("SecurityGroup", Value=self.security_group))
 
+    def create_monitoring_role(self):
+        t = self.template
+        t.add_resource(
+            iam.Role(
+                MONITORING_ROLE,
+                Condition="CreateMonitoringRole",
+                AssumeRolePolicyDocument=Policy(
+                    Statement=[make_simple_assume_statement(
+                        "monitoring.rds.amazonaws.com")]),
+                Path="/",
+                ManagedPolicyArns=[
+                    "arn:aws:iam::aws:policy/service-role/"
+                    "AmazonRDSEnhancedMonitoringRole"]))
+
+    def get_monitoring_attrs(self):
+        """Returns the Enhanced Monitoring & Performance Insights attributes
+        of the instances."""
+        role_arn = If("CreateMonitoringRole",
+                      GetAtt(MONITORING_ROLE, "Arn"),
+                      Ref("MonitoringRoleArn"))
+        return {
+            "MonitoringInterval": Ref("MonitoringInterval"),
+            "MonitoringRoleArn": If("EnableEnhancedMonitoring",
+                                    role_arn,
+                                    Ref("AWS::NoValue")),
+            "EnablePerformanceInsights": Ref("EnablePerformanceInsights"),
+            "PerformanceInsightsRetentionPeriod": If(
+                "EnablePerformanceInsights",
+                Ref("PerformanceInsightsRetentionPeriod"),
+                Ref("AWS::NoValue")),
+            "PerformanceInsightsKMSKeyId": If(
+                "HasPerformanceInsightsKmsKeyId",
+                Ref("PerformanceInsightsKmsKeyId"),
+                Ref("AWS::NoValue")),
+        }
+
     def get_db_endpoint(self):
         endpoint = GetAtt(DBINSTANCE, "Endpoint.Address")
         return endpoint
 
     def create_parameter_group(self):
         t = self.template
-        params = self.local_parameters["DatabaseParameters"]
+        params = self.get_parameter_presets()
+        params.update(self.local_parameters["DatabaseParameters"])
         t.add_resource(
             DBParameterGroup(
                 "ParameterGroup",
@@ -315,18 +516,21 @@ class BaseRDS(Blueprint):
             )
         )
 
+    def get_storage_attrs(self):
+        return {
+            "StorageType": If("HasStorageType",
+                              Ref("StorageType"),
+                              Ref("AWS::NoValue")),
+            "Iops": If("HasProvisionedIOPS",
+                       Ref("IOPS"),
+                       Ref("AWS::NoValue")),
+        }
+
     def create_rds(self):
         t = self.template
-        t.add_resource(
-            DBInstance(
-                DBINSTANCE,
-                StorageType=If("HasStorageType",
-                               Ref("StorageType"),
-                               Ref("AWS::NoValue")),
-                Iops=If("HasProvisionedIOPS",
-                        Ref("IOPS"),
-                        Ref("AWS::NoValue")),
-                **self.get_common_attrs()))
+        attrs = dict(self.get_storage_attrs(), **self.get_common_attrs())
+        attrs.update(self.get_monitoring_attrs())
+        t.add_resource(compat.DBInstance(DBINSTANCE, **attrs))
 
     def create_dns_records(self):
         t = self.template
@@ -356,13 +560,67 @@ class BaseRDS(Blueprint):
                 Condition="CreateInternalHostname",
                 Value=Ref(DNS_RECORD)))
 
+    def get_parameter_value(self, name):
+        """Returns the value a stack parameter is rendered with.
+
+        Stack outputs aren't known until their stack is built, so for them,
+        and parameters that aren't given, this is the parameter's default.
+        """
+        value = self.context.parameters.get(name)
+        if value is None or (isinstance(value, basestring) and
+                             "::" in value):
+            return self._get_parameters()[name].get("default")
+        return value
+
+    def get_max_connections(self):
+        """Returns max_connections from DatabaseParameters, if it's set to a
+        number rather than a formula."""
+        value = self.local_parameters["DatabaseParameters"].get(
+            "max_connections")
+        if value is not None and str(value).isdigit():
+            return int(value)
+        return None
+
+    def get_alarm_thresholds(self):
+        engine = self.engine() or self.get_parameter_value("Engine")
+        thresholds = alarms.instance_thresholds(
+            engine, self.get_parameter_value("InstanceType"),
+            self.get_max_connections())
+        thresholds.update(alarms.storage_thresholds(
+            self.get_parameter_value("StorageType"),
+            self.get_parameter_value("AllocatedStorage"),
+            self.get_parameter_value("IOPS")))
+        return thresholds
+
+    def get_alarm_instances(self):
+        return [DBINSTANCE]
+
+    def create_alarms(self):
+        if not self.local_parameters["Alarms"]:
+            return
+        t = self.template
+        overrides = self.local_parameters["AlarmThresholds"]
+        alarms.validate_thresholds(overrides)
+        thresholds = self.get_alarm_thresholds()
+        thresholds.update(overrides)
+
+        t.add_resource(Topic(ALARM_TOPIC, Condition="CreateAlarmTopic"))
+        topic = If("CreateAlarmTopic", Ref(ALARM_TOPIC), Ref("AlarmTopic"))
+        t.add_output(Output("AlarmTopic", Value=topic))
+        for instance in self.get_alarm_instances():
+            alarms.create_alarms(t, instance, thresholds, topic)
+
     def create_template(self):
+        self.validate_engine_version()
+        self.validate_storage()
         self.create_conditions()
         self.create_parameter_group()
         self.create_option_group()
         self.create_subnet_group()
         self.create_security_group()
+        self.create_monitoring_role()
         self.create_rds()
+        self.create_alarms()
         self.create_dns_records()
         self.create_db_outputs()
 
@@ -412,11 +670,53 @@ class MasterInstance(BaseRDS):
                                "be used to encrypt the storage.",
                 "default": "",
             },
+            "BackupReplicationRegion": {
+                "type": "String",
+                "description": "Region to copy the automated backups to, so "
+                               "the database can be restored there if this "
+                               "region goes down. Requires a "
+                               "BackupRetentionPeriod of at least 1.",
+                "default": "",
+            },
+            "BackupReplicationKmsKeyId": {
+                "type": "String",
+                "description": "ARN of the KMS key in BackupReplicationRegion "
+                               "to encrypt the copied backups with. "
+                               "Required when StorageEncrypted is true.",
+                "default": "",
+            },
         }
         parameters.update(master_parameters)
 
         return parameters
 
+    def validate_backup_replication(self):
+        region = self.get_parameter_value("BackupReplicationRegion")
+        retention = self.get_parameter_value("BackupRetentionPeriod")
+        if not region:
+            return
+        if not int(retention):
+            raise ValueError("BackupReplicationRegion needs a "
+                             "BackupRetentionPeriod of at least 1 day.")
+        # Checked as given, since a key from a stack output reads as empty.
+        kms_key = self.context.parameters.get("BackupReplicationKmsKeyId")
+        encrypted = self.get_parameter_value("StorageEncrypted")
+        if encrypted == "true" and not kms_key:
+            raise ValueError("Replicating the backups of encrypted storage "
+                             "needs a BackupReplicationKmsKeyId in "
+                             "BackupReplicationRegion.")
+
+    def create_conditions(self):
+        BaseRDS.create_conditions(self)
+        t = self.template
+        t.add_condition(
+            "ReplicateBackups",
+            Not(Equals(Ref("BackupReplicationRegion"), "")))
+        t.add_condition(
+            "HasBackupReplicationKmsKeyId",
+            And(Condition("ReplicateBackups"),
+                Not(Equals(Ref("BackupReplicationKmsKeyId"), ""))))
+
     def get_common_attrs(self):
         return {
             "AllocatedStorage": Ref("AllocatedStorage"),
@@ -433,6 +733,14 @@ class MasterInstance(BaseRDS):
             ),
             "DBParameterGroupName": Ref("ParameterGroup"),
             "DBSubnetGroupName": Ref(SUBNET_GROUP),
+            "AutomaticBackupReplicationRegion": If(
+                "ReplicateBackups",
+                Ref("BackupReplicationRegion"),
+                Ref("AWS::NoValue")),
+            "AutomaticBackupReplicationKmsKeyId": If(
+                "HasBackupReplicationKmsKeyId",
+                Ref("BackupReplicationKmsKeyId"),
+                Ref("AWS::NoValue")),
             "Engine": self.engine() or Ref("Engine"),
             "EngineVersion": Ref("EngineVersion"),
             # NoValue for now
@@ -448,19 +756,91 @@ class MasterInstance(BaseRDS):
             "Tags": Tags(Name=self.name),
         }
 
+    def create_template(self):
+        self.validate_backup_replication()
+        BaseRDS.create_template(self)
+
 
 class ReadReplica(BaseRDS):
-    """Blueprint for a Read replica RDS Database Instance. """
+    """Blueprint for a Read replica RDS Database Instance.
+
+    The master can be in another region, so reads from there stay local,
+    in which case give the master's ARN as MasterDatabaseId and its region
+    as SourceRegion. The replica is then put in this region's Subnets, and
+    if the master is encrypted, KmsKeyId needs to be a key in this region.
+    Masters in the same region are given by ID.
+    """
     def extra_parameters(self, parameters):
         parameters['MasterDatabaseId'] = {
             "type": "String",
             "description": "ID of the master database to create a read "
-                           "replica of."}
+                           "replica of, or its ARN if it's in another "
+                           "region."}
+        parameters['SourceRegion'] = {
+            "type": "String",
+            "description": "Region of the master database, if it's in "
+                           "another region.",
+            "default": ""}
+        parameters['KmsKeyId'] = {
+            "type": "String",
+            "description": "ARN of the KMS key to encrypt a replica of an "
+                           "encrypted master in another region with. Must "
+                           "be in this region.",
+            "default": ""}
         return parameters
 
+    def validate_source(self):
+        source = self.get_parameter_value("MasterDatabaseId")
+        region = self.get_parameter_value("SourceRegion")
+        if not source:
+            return
+        # arn:aws:rds:<region>:<account>:db:<instance>
+        parts = source.split(":")
+        is_arn = parts[0] == "arn"
+        if not region:
+            # The stack's region isn't known until it's built, so an ARN
+            # can't be told apart from one in another region, which would
+            # be replicated without SourceRegion & the subnet group.
+            if is_arn:
+                raise ValueError("MasterDatabaseId is an ARN: give its "
+                                 "region as SourceRegion if it's in another "
+                                 "region, or its ID if it's in this one.")
+            return
+        if not is_arn or len(parts) != 7 or parts[5] != "db":
+            raise ValueError("MasterDatabaseId must be the ARN of the master "
+                             "database when SourceRegion is given.")
+        if parts[3] != region:
+            raise ValueError("MasterDatabaseId is in %s, not SourceRegion "
+                             "%s." % (parts[3], region))
+
+    def create_conditions(self):
+        BaseRDS.create_conditions(self)
+        t = self.template
+        t.add_condition(
+            "IsCrossRegionReplica",
+            Not(Equals(Ref("SourceRegion"), "")))
+        t.add_condition(
+            "HasKmsKeyId",
+            And(Condition("IsCrossRegionReplica"),
+                Not(Equals(Ref("KmsKeyId"), ""))))
+
     def get_common_attrs(self):
         return {
             "SourceDBInstanceIdentifier": Ref("MasterDatabaseId"),
+            "SourceRegion": If(
+                "IsCrossRegionReplica",
+                Ref("SourceRegion"),
+                Ref("AWS::NoValue")),
+            "KmsKeyId": If(
+                "HasKmsKeyId",
+                Ref("KmsKeyId"),
+                Ref("AWS::NoValue")),
+            # Replicas in the master's region share its subnet group, but
+            # ones in another region need one in their own.
+            "DBSubnetGroupName": If(
+                "IsCrossRegionReplica",
+                Ref(SUBNET_GROUP),
+                Ref("AWS::NoValue")),
             "AllocatedStorage": Ref("AllocatedStorage"),
             "AllowMajorVersionUpgrade": Ref("AllowMajorVersionUpgrade"),
             "AutoMinorVersionUpgrade": Ref("AutoMinorVersionUpgrade"),
@@ -473,3 +853,433 @@ class ReadReplica(BaseRDS):
             "PreferredMaintenanceWindow": Ref("PreferredMaintenanceWindow"),
             "VPCSecurityGroups": [self.security_group, ],
         }
+
+    def get_alarm_thresholds(self):
+        thresholds = BaseRDS.get_alarm_thresholds(self)
+        thresholds["ReplicaLag"] = alarms.REPLICA_LAG_THRESHOLD
+        return thresholds
+
+    def create_template(self):
+        self.validate_source()
+        BaseRDS.create_template(self)
+
+
+class ReadReplicaSet(ReadReplica):
+    """Blueprint for a set of read replicas behind a single hostname.
+
+    The replicas are spread round robin over the first AZCount availability
+    zones, like the subnets created by :class:`stacker_blueprints.vpc.VPC`.
+    Each gets an equally weighted CNAME under InternalHostname, so clients
+    connecting to it have their reads spread over the replicas.
+    """
+
+    LOCAL_PARAMETERS = dict(ReadReplica.LOCAL_PARAMETERS, **{
+        # The number of read replicas to create.
+        "Replicas": {
+            "type": int,
+            "default": 2,
+        },
+        # The number of availability zones to spread the replicas over.
+        "AZCount": {
+            "type": int,
+            "default": 2,
+        },
+    })
+
+    def extra_parameters(self, parameters):
+        parameters = ReadReplica.extra_parameters(self, parameters)
+        parameters["DBInstanceIdentifier"]["description"] = (
+            "Prefix for the names of the database instances in RDS, which "
+            "are suffixed with the replica's number.")
+        # Leave room for the suffix.
+        parameters["DBInstanceIdentifier"]["max_length"] = "60"
+        return parameters
+
+    def get_replicas(self):
+        replicas = self.local_parameters["Replicas"]
+        if replicas < 1:
+            raise ValueError("Replicas must be at least 1.")
+        return [REPLICA % i for i in range(replicas)]
+
+    def get_db_endpoint(self):
+        return [GetAtt(replica, "Endpoint.Address")
+                for replica in self.get_replicas()]
+
+    def get_alarm_instances(self):
+        return self.get_replicas()
+
+    def create_rds(self):
+        t = self.template
+        az_count = self.local_parameters["AZCount"]
+        if az_count < 1:
+            raise ValueError("AZCount must be at least 1.")
+        for i, replica in enumerate(self.get_replicas()):
+            attrs = dict(self.get_storage_attrs(), **self.get_common_attrs())
+            attrs.update(self.get_monitoring_attrs())
+            attrs["AvailabilityZone"] = Select(i % az_count, GetAZs(""))
+            attrs["DBInstanceIdentifier"] = Join(
+                "-", [Ref("DBInstanceIdentifier"), str(i)])
+            t.add_resource(compat.DBInstance(replica, **attrs))
+
+    def create_dns_records(self):
+        t = self.template
+        for i, replica in enumerate(self.get_replicas()):
+            t.add_resource(
+                RecordSetType(
+                    REPLICA_DNS_RECORD % i,
+                    HostedZoneId=Ref("InternalZoneId"),
+                    Comment="RDS DB replica weighted CNAME Record",
+                    Name=Join(".", [Ref("InternalHostname"),
+                              Ref("InternalZoneName")]),
+                    Type="CNAME",
+                    # Keep the TTL short, so clients move between replicas.
+                    TTL="30",
+                    SetIdentifier=replica,
+                    Weight=1,
+                    ResourceRecords=[GetAtt(replica, "Endpoint.Address")],
+                    Condition="CreateInternalHostname"))
+
+    def create_db_outputs(self):
+        t = self.template
+        for i, replica in enumerate(self.get_replicas()):
+            t.add_output(
+                Output("DBAddress%s" % i,
+                       Value=GetAtt(replica, "Endpoint.Address")))
+            t.add_output(Output("DBInstance%s" % i, Value=Ref(replica)))
+        t.add_output(
+            Output(
+                "DBCname",
+                Condition="CreateInternalHostname",
+                Value=Ref(REPLICA_DNS_RECORD % 0)))
+
+
+class AuroraCluster(BaseRDS):
+    """Blueprint for an Aurora DB cluster, with a writer & a fleet of readers.
+
+    The readers are scaled by Application Auto Scaling between the number
+    given in the Readers local parameter and MaxReaders, tracking either
+    their average CPU or connections. Use an engine specific blueprint like
+    :class:`stacker_blueprints.rds.postgres.AuroraCluster`.
+
+    Readers added by auto scaling aren't managed by CloudFormation, and the
+    cluster can't be deleted while they're still in it. Before deleting the
+    stack, update it with MaxReaders set to Readers, and wait for auto
+    scaling to remove the readers it added.
+    """
+
+    LOCAL_PARAMETERS = {
+        # Parameters for the instances' DB parameter group.
+        "DatabaseParameters": {
+            "type": dict,
+            "default": {},
+        },
+        # Parameters for the DB cluster parameter group.
+        "ClusterParameters": {
+            "type": dict,
+            "default": {},
+        },
+        # The number of readers to create along with the cluster, which is
+        # also the fewest the readers are scaled in to.
+        "Readers": {
+            "type": int,
+            "default": 1,
+        },
+        # Set to create CloudWatch alarms on the instances.
+        "Alarms": {
+            "type": boolean,
+            "default": False,
+        },
+        # Overrides the alarms' thresholds, which are otherwise worked out
+        # from the InstanceType & any max_connections in DatabaseParameters.
+        # Aurora's storage grows by itself, so there are no storage alarms.
+        # Keyed by metric, ie: {"CPUUtilization": 90}
+        "AlarmThresholds": {
+            "type": dict,
+            "default": {},
+        },
+    }
+
+    ENGINE_KIND = "cluster"
+
+    def get_engine_major_versions(self):
+        # Clusters have no option group to need the major version for.
+        return []
+
+    def validate_engine_version(self):
+        engine = self.engine() or self.get_parameter_value("Engine")
+        if not engine:
+            return
+        engines.validate_engine_version(
+            engine,
+            version=self.get_parameter_value("EngineVersion"),
+            family=self.get_parameter_value("DBFamily"))
+
+    # Aurora's storage grows as needed & is shared by the cluster.
+    def apply_storage_sizing(self, parameters):
+        return parameters
+
+    def validate_storage(self):
+        pass
+
+    def extra_parameters(self, parameters):
+        for name in ("AllowMajorVersionUpgrade", "StorageType",
+                     "AllocatedStorage", "IOPS", "DBInstanceIdentifier",
+                     "EngineMajorVersion"):
+            del parameters[name]
+        readers = self.local_parameters["Readers"]
+        parameters["InstanceType"]["default"] = "db.r5.large"
+        parameters["InstanceType"]["description"] = (
+            "AWS RDS Instance Type for the writer and readers")
+        cluster_parameters = {
+            "DBClusterIdentifier": {
+                "type": "String",
+                "description": "Name of the database cluster in RDS.",
+                "min_length": "1",
+                "max_length": "63",
+                "allowed_pattern": "[a-zA-Z][a-zA-Z0-9-]*",
+                "default": self.name},
+            "BackupRetentionPeriod": {
+                "type": "Number",
+                "description": "Number of days to retain database backups.",
+                "min_value": "1",
+                "default": "7",
+                "max_value": "35",
+                "constraint_description": "Must be between 1-35.",
+            },
+            "MasterUser": {
+                "type": "String",
+                "description": "Name of the master user in the db.",
+                "default": "dbuser"},
+            "MasterUserPassword": {
+                "type": "String",
+                "no_echo": True,
+                "description": "Master user password."},
+            "PreferredBackupWindow": {
+                "type": "String",
+                "description": "A (minimum 30 minute) window in HH:MM-HH:MM "
+                               "format in UTC for backups. Default: 4am-5am "
+                               "PST",
+                "default": "12:00-13:00"},
+            "DatabaseName": {
+                "type": "String",
+                "description": "Initial db to create in database."},
+            "KmsKeyId": {
+                "type": "String",
+                "description": "Requires that StorageEncrypted is true. "
+                               "Should be an ARN to the KMS key that should "
+                               "be used to encrypt the storage.",
+                "default": ""},
+            "InternalReaderHostname": {
+                "type": "String",
+                "default": "",
+                "description": "Internal domain name for the reader "
+                               "endpoint, if you have one."},
+            "MaxReaders": {
+                "type": "Number",
+                "description": "The most readers to scale out to. Set it "
+                               "to the number of readers the cluster is "
+                               "created with to remove those added by auto "
+                               "scaling, ie: before deleting the stack.",
+                "min_value": str(readers),
+                "max_value": "15",
+                "default": str(max(readers, 5))},
+            "ReaderScalingMetric": {
+                "type": "String",
+                "description": "The readers' average metric to scale on.",
+                "allowed_values": READER_SCALING_METRICS,
+                "default": "RDSReaderAverageCPUUtilization"},
+            "ReaderScalingTarget": {
+                "type": "Number",
+                "description": "Value of ReaderScalingMetric to keep the "
+                               "readers at, ie: 70 (%) for CPU.",
+                "default": "70"},
+            "ReaderScaleInCooldown": {
+                "type": "Number",
+                "description": "Seconds after removing a reader before "
+                               "another can be removed.",
+                "default": "300"},
+            "ReaderScaleOutCooldown": {
+                "type": "Number",
+                "description": "Seconds after adding a reader before another "
+                               "can be added.",
+                "default": "300"},
+        }
+        parameters.update(cluster_parameters)
+        return parameters
+
+    def create_conditions(self):
+        t = self.template
+        self.create_dns_conditions()
+        self.create_monitoring_conditions()
+        self.create_alarm_conditions()
+        t.add_condition(
+            "HasInternalReaderHostname",
+            Not(Equals(Ref("InternalReaderHostname"), "")))
+        t.add_condition(
+            "CreateInternalReaderHostname",
+            And(Condition("HasInternalZone"),
+                Condition("HasInternalZoneName"),
+                Condition("HasInternalReaderHostname")))
+        t.add_condition(
+            "HasDBSnapshotIdentifier",
+            Not(Equals(Ref("DBSnapshotIdentifier"), "")))
+        t.add_condition(
+            "HasKmsKeyId",
+            Not(Equals(Ref("KmsKeyId"), "")))
+        t.add_condition(
+            "CreateSecurityGroup",
+            Equals(Ref("ExistingSecurityGroup"), ""))
+
+    def create_parameter_group(self):
+        t = self.template
+        t.add_resource(
+            DBClusterParameterGroup(
+                CLUSTER_PARAMETER_GROUP,
+                Description=self.name,
+                Family=Ref("DBFamily"),
+                Parameters=self.local_parameters["ClusterParameters"]))
+        BaseRDS.create_parameter_group(self)
+
+    def create_option_group(self):
+        pass
+
+    def get_db_endpoint(self):
+        return GetAtt(DBCLUSTER, "Endpoint.Address")
+
+    def get_alarm_thresholds(self):
+        return alarms.instance_thresholds(
+            self.engine() or self.get_parameter_value("Engine"),
+            self.get_parameter_value("InstanceType"),
+            self.get_max_connections())
+
+    def get_alarm_instances(self):
+        readers = self.local_parameters["Readers"]
+        return [WRITER] + [READER % i for i in range(readers)]
+
+    def get_reader_endpoint(self):
+        return GetAtt(DBCLUSTER, "ReadEndpoint.Address")
+
+    def get_cluster_attrs(self):
+        # Credentials & the initial db come from the snapshot when restoring
+        # one.
+        from_snapshot = Ref("AWS::NoValue")
+        return {
+            "BackupRetentionPeriod": Ref("BackupRetentionPeriod"),
+            "DatabaseName": If("HasDBSnapshotIdentifier", from_snapshot,
+                               Ref("DatabaseName")),
+            "DBClusterIdentifier": Ref("DBClusterIdentifier"),
+            "DBClusterParameterGroupName": Ref(CLUSTER_PARAMETER_GROUP),
+            "DBSubnetGroupName": Ref(SUBNET_GROUP),
+            "Engine": self.engine() or Ref("Engine"),
+            "EngineVersion": Ref("EngineVersion"),
+            "KmsKeyId": If("HasKmsKeyId", Ref("KmsKeyId"),
+                           Ref("AWS::NoValue")),
+            "MasterUsername": If("HasDBSnapshotIdentifier", from_snapshot,
+                                 Ref("MasterUser")),
+            "MasterUserPassword": If("HasDBSnapshotIdentifier",
+                                     from_snapshot,
+                                     Ref("MasterUserPassword")),
+            "PreferredBackupWindow": Ref("PreferredBackupWindow"),
+            "PreferredMaintenanceWindow": Ref("PreferredMaintenanceWindow"),
+            "SnapshotIdentifier": If("HasDBSnapshotIdentifier",
+                                     Ref("DBSnapshotIdentifier"),
+                                     Ref("AWS::NoValue")),
+            "StorageEncrypted": Ref("StorageEncrypted"),
+            "VpcSecurityGroupIds": [self.security_group, ],
+            "Tags": Tags(Name=self.name),
+        }
+
+    def get_common_attrs(self):
+        """Returns the attributes shared by the writer and readers."""
+        return {
+            "AutoMinorVersionUpgrade": Ref("AutoMinorVersionUpgrade"),
+            "DBClusterIdentifier": Ref(DBCLUSTER),
+            "DBInstanceClass": Ref("InstanceType"),
+            "DBParameterGroupName": Ref("ParameterGroup"),
+            "DBSubnetGroupName": Ref(SUBNET_GROUP),
+            "Engine": self.engine() or Ref("Engine"),
+            "PubliclyAccessible": False,
+            "Tags": Tags(Name=self.name),
+        }
+
+    def create_rds(self):
+        t = self.template
+        readers = self.local_parameters["Readers"]
+        if not 0 <= readers <= 15:
+            raise ValueError("Readers must be between 0 and 15.")
+        if int(self.get_parameter_value("MaxReaders")) < readers:
+            raise ValueError("MaxReaders must be at least Readers (%s)." %
+                             readers)
+        t.add_resource(compat.DBCluster(DBCLUSTER, **self.get_cluster_attrs()))
+        instances = [WRITER] + [READER % i for i in range(readers)]
+        attrs = dict(self.get_common_attrs(), **self.get_monitoring_attrs())
+        for instance in instances:
+            t.add_resource(compat.DBInstance(instance, **attrs))
+        self.create_reader_scaling(readers, instances)
+
+    def create_reader_scaling(self, readers, instances):
+        t = self.template
+        role_arn = Join("", [
+            "arn:aws:iam::", Ref("AWS::AccountId"),
+            ":role/aws-service-role/rds.application-autoscaling."
+            "amazonaws.com/AWSServiceRoleForApplicationAutoScaling_RDSCluster"
+        ])
+        t.add_resource(
+            ScalableTarget(
+                READER_SCALABLE_TARGET,
+                MinCapacity=readers,
+                MaxCapacity=Ref("MaxReaders"),
+                ResourceId=Join(":", ["cluster", Ref(DBCLUSTER)]),
+                RoleARN=role_arn,
+                ScalableDimension="rds:cluster:ReadReplicaCount",
+                ServiceNamespace="rds",
+                # Auto scaling can only start once the instances are up.
+                DependsOn=instances))
+        t.add_resource(
+            compat.ApplicationScalingPolicy(
+                READER_SCALING_POLICY,
+                PolicyName=Join("-", [Ref("DBClusterIdentifier"), "readers"]),
+                PolicyType="TargetTrackingScaling",
+                ScalingTargetId=Ref(READER_SCALABLE_TARGET),
+                TargetTrackingScalingPolicyConfiguration=compat.
+                TargetTrackingScalingPolicyConfiguration(
+                    PredefinedMetricSpecification=compat.
+                    PredefinedMetricSpecification(
+                        PredefinedMetricType=Ref("ReaderScalingMetric")),
+                    TargetValue=Ref("ReaderScalingTarget"),
+                    ScaleInCooldown=Ref("ReaderScaleInCooldown"),
+                    ScaleOutCooldown=Ref("ReaderScaleOutCooldown"))))
+
+    def create_dns_records(self):
+        BaseRDS.create_dns_records(self)
+        t = self.template
+        t.add_resource(
+            RecordSetType(
+                READER_DNS_RECORD,
+                HostedZoneId=Ref("InternalZoneId"),
+                Comment="RDS DB reader CNAME Record",
+                Name=Join(".", [Ref("InternalReaderHostname"),
+                          Ref("InternalZoneName")]),
+                Type="CNAME",
+                TTL="120",
+                ResourceRecords=[self.get_reader_endpoint()],
+                Condition="CreateInternalReaderHostname"))
+
+    def create_db_outputs(self):
+        t = self.template
+        t.add_output(Output("DBAddress", Value=self.get_db_endpoint()))
+        t.add_output(
+            Output("DBReaderAddress", Value=self.get_reader_endpoint()))
+        t.add_output(
+            Output("DBPort", Value=GetAtt(DBCLUSTER, "Endpoint.Port")))
+        t.add_output(Output("DBCluster", Value=Ref(DBCLUSTER)))
+        t.add_output(
+            Output(
+                "DBCname",
+                Condition="CreateInternalHostname",
+                Value=Ref(DNS_RECORD)))
+        t.add_output(
+            Output(
+                "DBReaderCname",
+                Condition="CreateInternalReaderHostname",
+                Value=Ref(READER_DNS_RECORD)))
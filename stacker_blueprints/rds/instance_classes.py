@@ -0,0 +1,114 @@
+""" Memory & vCPUs of the RDS DB instance classes.
+
+Used to size things that depend on the instance class, like alarm
+thresholds, when the template is rendered.
+"""
+
+from collections import namedtuple
+
+GiB = 1024 ** 3
+
+InstanceClass = namedtuple("InstanceClass", ["memory", "vcpus"])
+
+# Sizes of the current generation families, as multiples of their large
+# instances.
+SIZES = (
+    ("large", 1),
+    ("xlarge", 2),
+    ("2xlarge", 4),
+    ("4xlarge", 8),
+    ("8xlarge", 16),
+    ("12xlarge", 24),
+    ("16xlarge", 32),
+    ("24xlarge", 48),
+    ("32xlarge", 64),
+)
+
+# Family: (GiB of memory of its large instances, largest size)
+FAMILIES = {
+    "m5": (8, "24xlarge"),
+    "m6g": (8, "16xlarge"),
+    "m6i": (8, "32xlarge"),
+    "r5": (16, "24xlarge"),
+    "r6g": (16, "16xlarge"),
+    "r6i": (16, "32xlarge"),
+}
+
+# Classes that don't fit the pattern above, in GiB of memory & vCPUs.
+IRREGULAR_CLASSES = {
+    "db.t2.micro": (1, 1),
+    "db.t2.small": (2, 1),
+    "db.t2.medium": (4, 2),
+    "db.t2.large": (8, 2),
+    "db.t2.xlarge": (16, 4),
+    "db.t2.2xlarge": (32, 8),
+    "db.t3.micro": (1, 2),
+    "db.t3.small": (2, 2),
+    "db.t3.medium": (4, 2),
+    "db.t3.large": (8, 2),
+    "db.t3.xlarge": (16, 4),
+    "db.t3.2xlarge": (32, 8),
+    "db.t4g.micro": (1, 2),
+    "db.t4g.small": (2, 2),
+    "db.t4g.medium": (4, 2),
+    "db.t4g.large": (8, 2),
+    "db.t4g.xlarge": (16, 4),
+    "db.t4g.2xlarge": (32, 8),
+    "db.m3.medium": (3.75, 1),
+    "db.m3.large": (7.5, 2),
+    "db.m3.xlarge": (15, 4),
+    "db.m3.2xlarge": (30, 8),
+    "db.m4.large": (8, 2),
+    "db.m4.xlarge": (16, 4),
+    "db.m4.2xlarge": (32, 8),
+    "db.m4.4xlarge": (64, 16),
+    "db.m4.10xlarge": (160, 40),
+    "db.m4.16xlarge": (256, 64),
+    "db.r3.large": (15.25, 2),
+    "db.r3.xlarge": (30.5, 4),
+    "db.r3.2xlarge": (61, 8),
+    "db.r3.4xlarge": (122, 16),
+    "db.r3.8xlarge": (244, 32),
+    "db.r4.large": (15.25, 2),
+    "db.r4.xlarge": (30.5, 4),
+    "db.r4.2xlarge": (61, 8),
+    "db.r4.4xlarge": (122, 16),
+    "db.r4.8xlarge": (244, 32),
+    "db.r4.16xlarge": (488, 64),
+}
+
+
+def _build_instance_classes():
+    classes = {}
+    for name, (memory, vcpus) in IRREGULAR_CLASSES.items():
+        classes[name] = InstanceClass(int(memory * GiB), vcpus)
+    for family, (memory, largest) in FAMILIES.items():
+        for size, multiple in SIZES:
+            classes["db.%s.%s" % (family, size)] = InstanceClass(
+                memory * multiple * GiB, 2 * multiple)
+            if size == largest:
+                break
+    return classes
+
+
+INSTANCE_CLASSES = _build_instance_classes()
+
+
+def get_instance_class(name):
+    """Looks up a DB instance class.
+
+    Args:
+        name (str): The DB instance class, ie: db.r5.large
+
+    Returns:
+        :class:`InstanceClass`: The bytes of memory & vCPUs of the instance
+            class, or None if it isn't known.
+    """
+    return INSTANCE_CLASSES.get(name)
+
+
+def is_burstable(name):
+    """Returns True for the burstable (db.t*) instance classes, which can
+    only sustain a fraction of their CPU."""
+    parts = name.split(".")
+    return len(parts) == 3 and parts[1].startswith("t")
@@ -1,26 +1,42 @@
-from .base import MasterInstance, ReadReplica
+from .base import (
+    AuroraCluster, MasterInstance, ReadReplica, ReadReplicaSet,
+)
+from .instance_classes import GiB, get_instance_class
+
+# Three quarters of the instance's memory for the buffer pool.
+INNODB_BUFFER_POOL_SIZE = "{DBInstanceClassMemory*3/4}"
+MAX_CONNECTIONS = "{DBInstanceClassMemory/12582880}"
+MAX_BUFFER_POOL_INSTANCES = 64
+MAX_IO_THREADS = 64
 
 
 class MySQLMixin(object):
     def engine(self):
         return "MySQL"
 
-    def get_engine_versions(self):
-        return [
-            '5.1.73a', '5.1.73b',
-            '5.5.40', '5.5.40a', '5.5.40b', '5.5.41', '5.5.42', '5.5.46',
-            '5.6.19a', '5.6.19b', '5.6.21', '5.6.21b', '5.6.22', '5.6.23',
-            '5.6.27', '5.6.29',
-            '5.7.10', '5.7.11'
-        ]
-
-    def get_db_families(self):
-        return [
-            "mysql5.1",
-            "mysql5.5",
-            "mysql5.6",
-            "mysql5.7",
-        ]
+    def get_parameter_presets(self):
+        presets = {
+            "innodb_buffer_pool_size": INNODB_BUFFER_POOL_SIZE,
+            "max_connections": MAX_CONNECTIONS,
+        }
+        instance_class = get_instance_class(
+            self.get_parameter_value("InstanceType"))
+        if instance_class:
+            # Split the buffer pool into instances of at least 1GB, to cut
+            # contention on its mutexes.
+            pool_instances = instance_class.memory * 3 // 4 // GiB
+            presets["innodb_buffer_pool_instances"] = str(
+                min(max(pool_instances, 1), MAX_BUFFER_POOL_INSTANCES))
+            io_threads = str(min(max(instance_class.vcpus, 4),
+                                 MAX_IO_THREADS))
+            presets["innodb_read_io_threads"] = io_threads
+            presets["innodb_write_io_threads"] = io_threads
+        return presets
+
+
+class AuroraMySQLMixin(object):
+    def engine(self):
+        return "aurora-mysql"
 
 
 class MasterInstance(MySQLMixin, MasterInstance):
@@ -29,3 +45,11 @@ class MasterInstance(MySQLMixin, MasterInstance):
 
 class ReadReplica(MySQLMixin, ReadReplica):
     pass
+
+
+class ReadReplicaSet(MySQLMixin, ReadReplicaSet):
+    pass
+
+
+class AuroraCluster(AuroraMySQLMixin, AuroraCluster):
+    pass
@@ -1,24 +1,60 @@
-from .base import MasterInstance, ReadReplica
+from .base import (
+    AuroraCluster, MasterInstance, ReadReplica, ReadReplicaSet,
+)
+from .instance_classes import get_instance_class
+
+# In 8kB pages: a quarter of the instance's memory for shared buffers, with
+# the planner counting on three quarters being available for caching.
+SHARED_BUFFERS = "{DBInstanceClassMemory/32768}"
+EFFECTIVE_CACHE_SIZE = "{DBInstanceClassMemory*3/32768}"
+MEMORY_PER_CONNECTION = 9531392
+MAX_MAX_CONNECTIONS = 5000
+MAX_CONNECTIONS = "LEAST({DBInstanceClassMemory/%d},%d)" % (
+    MEMORY_PER_CONNECTION, MAX_MAX_CONNECTIONS)
+# In kB. The memory left after shared buffers & the autovacuum workers'
+# maintenance_work_mem is split between max_connections, leaving each of
+# them room for this many sorts or hashes at once. Below 4MB, postgres'
+# default, queries spill to disk too often, so small instances get that
+# and rely on not all their connections sorting at once.
+SORTS_PER_CONNECTION = 2
+MIN_WORK_MEM = 4096
+MAX_WORK_MEM = 1048576
+MAX_MAINTENANCE_WORK_MEM = 2097152
 
 
 class PostgresMixin(object):
     def engine(self):
         return "postgres"
 
-    def get_engine_versions(self):
-        return [
-            '9.3.1', '9.3.2', '9.3.3', '9.3.5', '9.3.6', '9.3.9', '9.3.10',
-            '9.3.12',
-            '9.4.1', '9.4.4', '9.4.5', '9.4.7',
-            '9.5.2',
-        ]
+    def get_parameter_presets(self):
+        presets = {
+            "shared_buffers": SHARED_BUFFERS,
+            "effective_cache_size": EFFECTIVE_CACHE_SIZE,
+            "max_connections": MAX_CONNECTIONS,
+        }
+        instance_class = get_instance_class(
+            self.get_parameter_value("InstanceType"))
+        if instance_class:
+            memory_kb = instance_class.memory // 1024
+            connections = min(
+                instance_class.memory // MEMORY_PER_CONNECTION,
+                MAX_MAX_CONNECTIONS)
+            maintenance_work_mem = min(memory_kb // 16,
+                                       MAX_MAINTENANCE_WORK_MEM)
+            autovacuum_workers = max(3, instance_class.vcpus // 2)
+            free_kb = (memory_kb - memory_kb // 4 -
+                       maintenance_work_mem * autovacuum_workers)
+            work_mem = free_kb // (connections * SORTS_PER_CONNECTION)
+            presets["work_mem"] = str(
+                min(max(work_mem, MIN_WORK_MEM), MAX_WORK_MEM))
+            presets["maintenance_work_mem"] = str(maintenance_work_mem)
+            presets["autovacuum_max_workers"] = str(autovacuum_workers)
+        return presets
+
 
-    def get_db_families(self):
-        return [
-            "postgres9.3",
-            "postgres9.4",
-            "postgres9.5",
-        ]
+class AuroraPostgresMixin(object):
+    def engine(self):
+        return "aurora-postgresql"
 
 
 class MasterInstance(PostgresMixin, MasterInstance):
@@ -27,3 +63,11 @@ class MasterInstance(PostgresMixin, MasterInstance):
 
 class ReadReplica(PostgresMixin, ReadReplica):
     pass
+
+
+class ReadReplicaSet(PostgresMixin, ReadReplicaSet):
+    pass
+
+
+class AuroraCluster(AuroraPostgresMixin, AuroraCluster):
+    pass
@@ -0,0 +1,341 @@
+from awacs.aws import Action, Allow, Policy, Statement
+from awacs.helpers.trust import make_simple_assume_statement
+import awacs.kms
+from troposphere import (
+    And, Condition, Equals, GetAtt, If, Join, Not, Output, Ref, ec2, iam,
+)
+from troposphere.route53 import RecordSetType
+
+from stacker.blueprints.base import Blueprint
+
+from .. import compat
+
+ENGINE_PORTS = {
+    "MYSQL": 3306,
+    "POSTGRESQL": 5432,
+}
+
+# Resource name constants
+PROXY = "DBProxy"
+PROXY_ROLE = "DBProxyRole"
+PROXY_SECURITY_GROUP = "DBProxySecurityGroup"
+PROXY_TARGET_GROUP = "DBProxyTargetGroup"
+READER_ENDPOINT = "DBProxyReaderEndpoint"
+DB_INGRESS = "DBProxyToDBIngress"
+DNS_RECORD = "DBProxyDnsRecord"
+READER_DNS_RECORD = "DBProxyReaderDnsRecord"
+
+
+class RDSProxy(Blueprint):
+    """Blueprint for an RDS Proxy pooling connections to a database.
+
+    Apps connect to the proxy rather than the database, which keeps a pool
+    of connections open to it, so bursts of new clients don't exhaust the
+    database's max_connections. Put it in front of either a DB instance,
+    ie: the DBInstance output of
+    :class:`stacker_blueprints.rds.base.MasterInstance`, or an Aurora
+    cluster, which also gets a read only endpoint spreading connections
+    over its readers.
+
+    RDS Proxy can't target the replicas of a DB instance, so the instances
+    of a :class:`stacker_blueprints.rds.base.ReadReplicaSet` can't be put
+    behind it. Reads from a replica set are spread with its weighted
+    DBCname instead. Use an Aurora cluster for pooled connections to
+    readers.
+    """
+
+    PARAMETERS = {
+        "VpcId": {
+            "type": "AWS::EC2::VPC::Id",
+            "description": "Vpc Id"},
+        "Subnets": {
+            "type": "List<AWS::EC2::Subnet::Id>",
+            "description": "Subnets to deploy the proxy in, in at least two "
+                           "availability zones."},
+        "DBProxyName": {
+            "type": "String",
+            "description": "Name of the proxy in RDS.",
+            "min_length": "1",
+            "max_length": "63",
+            "allowed_pattern": "[a-zA-Z][a-zA-Z0-9-]*"},
+        "EngineFamily": {
+            "type": "String",
+            "description": "The kind of database the proxy connects to.",
+            "allowed_values": sorted(ENGINE_PORTS)},
+        "DBInstanceIdentifier": {
+            "type": "String",
+            "description": "The DB instance to proxy connections to. Give "
+                           "either this or DBClusterIdentifier.",
+            "default": ""},
+        "DBClusterIdentifier": {
+            "type": "String",
+            "description": "The Aurora DB cluster to proxy connections to. "
+                           "Give either this or DBInstanceIdentifier.",
+            "default": ""},
+        "DBSecurityGroup": {
+            "type": "AWS::EC2::SecurityGroup::Id",
+            "description": "The SecurityGroup of the database, which is "
+                           "opened up to the proxy."},
+        "SecretArn": {
+            "type": "String",
+            "description": "ARN of the Secrets Manager secret holding the "
+                           "username & password the proxy connects to the "
+                           "database with."},
+        "SecretKmsKeyArn": {
+            "type": "String",
+            "description": "ARN of the KMS key SecretArn is encrypted with, "
+                           "if it isn't the AWS managed key.",
+            "default": ""},
+        "IAMAuth": {
+            "type": "String",
+            "description": "Set to REQUIRED to make clients authenticate "
+                           "with IAM rather than the database password.",
+            "allowed_values": ["DISABLED", "REQUIRED"],
+            "default": "DISABLED"},
+        "RequireTLS": {
+            "type": "String",
+            "description": "Set to 'false' to allow clients to connect "
+                           "without TLS.",
+            "allowed_values": ["true", "false"],
+            "default": "true"},
+        "IdleClientTimeout": {
+            "type": "Number",
+            "description": "Seconds a client connection can be idle before "
+                           "the proxy closes it.",
+            "min_value": "1",
+            "max_value": "28800",
+            "default": "1800"},
+        "MaxConnectionsPercent": {
+            "type": "Number",
+            "description": "Percent of the database's max_connections the "
+                           "proxy can open.",
+            "min_value": "1",
+            "max_value": "100",
+            "default": "90"},
+        "MaxIdleConnectionsPercent": {
+            "type": "Number",
+            "description": "Percent of the database's max_connections the "
+                           "proxy keeps open while idle. Must not be more "
+                           "than MaxConnectionsPercent.",
+            "min_value": "0",
+            "max_value": "100",
+            "default": "50"},
+        "ConnectionBorrowTimeout": {
+            "type": "Number",
+            "description": "Seconds a client waits for a connection from "
+                           "the pool before timing out.",
+            "min_value": "0",
+            "max_value": "3600",
+            "default": "120"},
+        "InternalZoneId": {
+            "type": "String",
+            "default": "",
+            "description": "Internal zone Id, if you have one."},
+        "InternalZoneName": {
+            "type": "String",
+            "default": "",
+            "description": "Internal zone name, if you have one."},
+        "InternalHostname": {
+            "type": "String",
+            "default": "",
+            "description": "Internal domain name for the proxy, if you have "
+                           "one."},
+        "InternalReaderHostname": {
+            "type": "String",
+            "default": "",
+            "description": "Internal domain name for the proxy's read only "
+                           "endpoint, if you have one. Only used with "
+                           "DBClusterIdentifier."},
+    }
+
+    def validate_target(self):
+        parameters = self.context.parameters
+        instance = parameters.get("DBInstanceIdentifier")
+        cluster = parameters.get("DBClusterIdentifier")
+        if instance and cluster:
+            raise ValueError("Give either DBInstanceIdentifier or "
+                             "DBClusterIdentifier, not both.")
+        if not instance and not cluster:
+            raise ValueError("Give the DBInstanceIdentifier or "
+                             "DBClusterIdentifier to proxy connections to.")
+
+    def create_conditions(self):
+        t = self.template
+        t.add_condition(
+            "HasDBCluster",
+            Not(Equals(Ref("DBClusterIdentifier"), "")))
+        t.add_condition(
+            "HasDBInstance",
+            Not(Equals(Ref("DBInstanceIdentifier"), "")))
+        t.add_condition(
+            "HasSecretKmsKey",
+            Not(Equals(Ref("SecretKmsKeyArn"), "")))
+        t.add_condition(
+            "IsPostgres",
+            Equals(Ref("EngineFamily"), "POSTGRESQL"))
+        t.add_condition(
+            "HasInternalZone",
+            And(Not(Equals(Ref("InternalZoneId"), "")),
+                Not(Equals(Ref("InternalZoneName"), ""))))
+        t.add_condition(
+            "CreateInternalHostname",
+            And(Condition("HasInternalZone"),
+                Not(Equals(Ref("InternalHostname"), ""))))
+        t.add_condition(
+            "CreateInternalReaderHostname",
+            And(Condition("HasInternalZone"),
+                Condition("HasDBCluster"),
+                Not(Equals(Ref("InternalReaderHostname"), ""))))
+
+    def get_port(self):
+        return If("IsPostgres", ENGINE_PORTS["POSTGRESQL"],
+                  ENGINE_PORTS["MYSQL"])
+
+    def create_security_group(self):
+        t = self.template
+        t.add_resource(
+            ec2.SecurityGroup(
+                PROXY_SECURITY_GROUP,
+                GroupDescription="%s RDS proxy security group" % self.name,
+                VpcId=Ref("VpcId")))
+        t.add_output(
+            Output("SecurityGroup", Value=Ref(PROXY_SECURITY_GROUP)))
+        # Let the proxy connect to the database
+        t.add_resource(
+            ec2.SecurityGroupIngress(
+                DB_INGRESS,
+                IpProtocol="tcp",
+                FromPort=self.get_port(),
+                ToPort=self.get_port(),
+                SourceSecurityGroupId=Ref(PROXY_SECURITY_GROUP),
+                GroupId=Ref("DBSecurityGroup")))
+
+    def generate_policy_document(self):
+        statements = [
+            Statement(
+                Effect=Allow,
+                Action=[Action("secretsmanager", "GetSecretValue")],
+                Resource=[Ref("SecretArn")]),
+        ]
+        kms_statement = Statement(
+            Effect=Allow,
+            Action=[awacs.kms.Decrypt],
+            Resource=[Ref("SecretKmsKeyArn")])
+        return If(
+            "HasSecretKmsKey",
+            Policy(Statement=statements + [kms_statement]),
+            Policy(Statement=statements))
+
+    def create_role(self):
+        t = self.template
+        t.add_resource(
+            iam.Role(
+                PROXY_ROLE,
+                AssumeRolePolicyDocument=Policy(
+                    Statement=[make_simple_assume_statement(
+                        "rds.amazonaws.com")]),
+                Path="/",
+                Policies=[
+                    iam.Policy(
+                        PolicyName="read-db-secret",
+                        PolicyDocument=self.generate_policy_document())]))
+
+    def create_proxy(self):
+        t = self.template
+        t.add_resource(
+            compat.DBProxy(
+                PROXY,
+                Auth=[compat.AuthFormat(
+                    AuthScheme="SECRETS",
+                    IAMAuth=Ref("IAMAuth"),
+                    SecretArn=Ref("SecretArn"))],
+                DBProxyName=Ref("DBProxyName"),
+                EngineFamily=Ref("EngineFamily"),
+                IdleClientTimeout=Ref("IdleClientTimeout"),
+                RequireTLS=Ref("RequireTLS"),
+                RoleArn=GetAtt(PROXY_ROLE, "Arn"),
+                VpcSecurityGroupIds=[Ref(PROXY_SECURITY_GROUP)],
+                VpcSubnetIds=Ref("Subnets")))
+        t.add_resource(
+            compat.DBProxyTargetGroup(
+                PROXY_TARGET_GROUP,
+                DBProxyName=Ref(PROXY),
+                TargetGroupName="default",
+                DBInstanceIdentifiers=If(
+                    "HasDBInstance",
+                    [Ref("DBInstanceIdentifier")],
+                    Ref("AWS::NoValue")),
+                DBClusterIdentifiers=If(
+                    "HasDBCluster",
+                    [Ref("DBClusterIdentifier")],
+                    Ref("AWS::NoValue")),
+                ConnectionPoolConfigurationInfo=compat.
+                ConnectionPoolConfigurationInfoFormat(
+                    ConnectionBorrowTimeout=Ref("ConnectionBorrowTimeout"),
+                    MaxConnectionsPercent=Ref("MaxConnectionsPercent"),
+                    MaxIdleConnectionsPercent=Ref(
+                        "MaxIdleConnectionsPercent"))))
+        # Spreads connections over an Aurora cluster's readers
+        t.add_resource(
+            compat.DBProxyEndpoint(
+                READER_ENDPOINT,
+                Condition="HasDBCluster",
+                DBProxyEndpointName=Join("-", [Ref("DBProxyName"), "reader"]),
+                DBProxyName=Ref(PROXY),
+                TargetRole="READ_ONLY",
+                VpcSecurityGroupIds=[Ref(PROXY_SECURITY_GROUP)],
+                VpcSubnetIds=Ref("Subnets")))
+
+    def create_dns_records(self):
+        t = self.template
+        t.add_resource(
+            RecordSetType(
+                DNS_RECORD,
+                HostedZoneId=Ref("InternalZoneId"),
+                Comment="RDS proxy CNAME Record",
+                Name=Join(".", [Ref("InternalHostname"),
+                          Ref("InternalZoneName")]),
+                Type="CNAME",
+                TTL="120",
+                ResourceRecords=[GetAtt(PROXY, "Endpoint")],
+                Condition="CreateInternalHostname"))
+        t.add_resource(
+            RecordSetType(
+                READER_DNS_RECORD,
+                HostedZoneId=Ref("InternalZoneId"),
+                Comment="RDS proxy reader CNAME Record",
+                Name=Join(".", [Ref("InternalReaderHostname"),
+                          Ref("InternalZoneName")]),
+                Type="CNAME",
+                TTL="120",
+                ResourceRecords=[GetAtt(READER_ENDPOINT, "Endpoint")],
+                Condition="CreateInternalReaderHostname"))
+
+    def create_outputs(self):
+        t = self.template
+        t.add_output(Output("DBProxy", Value=Ref(PROXY)))
+        t.add_output(Output("DBAddress", Value=GetAtt(PROXY, "Endpoint")))
+        t.add_output(
+            Output(
+                "DBReaderAddress",
+                Condition="HasDBCluster",
+                Value=GetAtt(READER_ENDPOINT, "Endpoint")))
+        t.add_output(
+            Output(
+                "DBCname",
+                Condition="CreateInternalHostname",
+                Value=Ref(DNS_RECORD)))
+        t.add_output(
+            Output(
+                "DBReaderCname",
+                Condition="CreateInternalReaderHostname",
+                Value=Ref(READER_DNS_RECORD)))
+
+    def create_template(self):
+        self.validate_target()
+        self.create_conditions()
+        self.create_security_group()
+        self.create_role()
+        self.create_proxy()
+        self.create_dns_records()
+        self.create_outputs()
@@ -0,0 +1,268 @@
+""" Sizing & validation of RDS storage.
+
+gp2 storage gets a baseline of 3 IOPS per GB, and can burst above that to
+3000 IOPS until its bucket of I/O credits runs dry, after which it drops
+back to the baseline. :func:`simulate_gp2` models the bucket over a
+workload profile, so storage can be sized to never run out of credits
+rather than finding out in production.
+
+A profile is a list of (seconds, IOPS) phases, treated as repeating, ie:
+an hour long 2500 IOPS batch job followed by 23 quiet hours at 500 IOPS is
+``[(3600, 2500), (82800, 500)]``.
+"""
+
+from collections import namedtuple
+import math
+
+STORAGE_TYPES = ["default", "standard", "gp2", "io1"]
+
+# GB of storage each storage type can have.
+MIN_STORAGE = {
+    "standard": 5,
+    "gp2": 20,
+    "io1": 100,
+}
+MAX_STORAGE = 65536
+
+# Magnetic storage doesn't do much more than this.
+STANDARD_IOPS = 100
+
+GP2_IOPS_PER_GB = 3
+GP2_MIN_IOPS = 100
+GP2_MAX_IOPS = 16000
+GP2_BURST_IOPS = 3000
+# I/O credits in a full bucket, which new volumes start with.
+GP2_BURST_BUCKET = 5400000
+# MiB/s, with volumes under GP2_FULL_THROUGHPUT_STORAGE GB getting the
+# smaller throughput.
+GP2_SMALL_THROUGHPUT = 128
+GP2_MAX_THROUGHPUT = 250
+GP2_FULL_THROUGHPUT_STORAGE = 334
+
+IO1_MIN_IOPS = 1000
+IO1_MAX_IOPS = 80000
+IO1_MIN_IOPS_PER_GB = 0.5
+IO1_MAX_IOPS_PER_GB = 50
+IO1_MAX_THROUGHPUT = 1000
+
+GP2Simulation = namedtuple("GP2Simulation", ["min_balance", "depleted_at"])
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def effective_storage_type(storage_type, iops):
+    """Returns the storage type RDS uses when StorageType is "default"."""
+    if storage_type != "default":
+        return storage_type
+    return "io1" if int(iops) else "standard"
+
+
+def gp2_baseline_iops(allocated_storage):
+    """Returns the IOPS a gp2 volume can sustain."""
+    return min(max(GP2_MIN_IOPS, GP2_IOPS_PER_GB * int(allocated_storage)),
+               GP2_MAX_IOPS)
+
+
+def gp2_throughput(allocated_storage):
+    """Returns the MiB/s a gp2 volume can sustain."""
+    if int(allocated_storage) >= GP2_FULL_THROUGHPUT_STORAGE:
+        return GP2_MAX_THROUGHPUT
+    return GP2_SMALL_THROUGHPUT
+
+
+def peak_iops(storage_type, allocated_storage, iops):
+    """Returns the most IOPS an instance's storage can do."""
+    if storage_type == "io1":
+        return int(iops)
+    if storage_type == "gp2":
+        return max(gp2_baseline_iops(allocated_storage), GP2_BURST_IOPS)
+    return STANDARD_IOPS
+
+
+def validate_profile(profile):
+    if not profile:
+        raise ValueError("A storage profile needs at least one phase.")
+    for phase in profile:
+        if len(phase) != 2 or int(phase[0]) <= 0 or int(phase[1]) < 0:
+            raise ValueError("Storage profile phases must be (seconds, "
+                             "IOPS) pairs, got %r." % (phase,))
+
+
+def _gp2_pass(allocated_storage, profile, balance):
+    """Runs a gp2 volume's credit bucket through one pass of a profile.
+
+    Returns:
+        tuple: The credits left at the end of the pass, the fewest credits
+            left during it, and the seconds into the pass the bucket ran dry
+            at, or None if it didn't.
+    """
+    baseline = gp2_baseline_iops(allocated_storage)
+    burst = max(baseline, GP2_BURST_IOPS)
+    min_balance = balance
+    elapsed = 0
+    for seconds, iops in profile:
+        seconds, iops = int(seconds), int(iops)
+        if iops > burst:
+            # Even a full bucket can't keep up.
+            return 0, 0, elapsed
+        drain = iops - baseline
+        if drain > 0 and balance < drain * seconds:
+            return 0, 0, elapsed + balance // drain
+        balance = min(balance - drain * seconds, GP2_BURST_BUCKET)
+        min_balance = min(min_balance, balance)
+        elapsed += seconds
+    return balance, min_balance, None
+
+
+def simulate_gp2(allocated_storage, profile):
+    """Models a gp2 volume's I/O credit bucket over a workload profile.
+
+    The volume starts with a full bucket. Since the profile repeats, one
+    that uses more credits than it earns runs the bucket dry eventually,
+    even if a single pass doesn't.
+
+    Args:
+        allocated_storage (int): GB of storage.
+        profile (list): (seconds, IOPS) phases.
+
+    Returns:
+        :class:`GP2Simulation`: The fewest credits left in the bucket, and
+            roughly how many seconds into the repeating profile the bucket
+            runs dry, or None if it never does.
+    """
+    validate_profile(profile)
+    duration = sum(int(seconds) for seconds, _ in profile)
+    first, first_min, depleted_at = _gp2_pass(
+        allocated_storage, profile, GP2_BURST_BUCKET)
+    if depleted_at is not None:
+        return GP2Simulation(0, depleted_at)
+    second, second_min, depleted_at = _gp2_pass(
+        allocated_storage, profile, first)
+    if depleted_at is not None:
+        return GP2Simulation(0, duration + depleted_at)
+    if second >= first:
+        return GP2Simulation(min(first_min, second_min), None)
+    # Starting the second pass with fewer credits meant the bucket never
+    # filled up, so every later pass loses the same number of credits.
+    passes = second_min // (first - second)
+    return GP2Simulation(0, (2 + passes) * duration)
+
+
+def gp2_storage_for_profile(allocated_storage, profile):
+    """Returns the GB of gp2 storage, at least allocated_storage, that
+    gets through the profile without running out of credits, or None if no
+    gp2 volume can."""
+    validate_profile(profile)
+    peak = max(int(iops) for _, iops in profile)
+    if peak > GP2_MAX_IOPS:
+        return None
+    low = int(allocated_storage)
+    # A volume whose baseline covers the peak never touches its credits.
+    high = max(low, _ceil_div(peak, GP2_IOPS_PER_GB))
+    while low < high:
+        middle = (low + high) // 2
+        if simulate_gp2(middle, profile).depleted_at is None:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def recommend_storage(sustained_iops, throughput=0, profile=None,
+                      min_storage=0):
+    """Recommends storage for a workload.
+
+    gp2 is recommended when its baseline can sustain the workload, and
+    when given, get through the profile without running out of credits.
+    Otherwise provisioned IOPS (io1) storage is recommended.
+
+    Args:
+        sustained_iops (int): IOPS the storage needs to sustain.
+        throughput (int, optional): MiB/s the storage needs to sustain.
+        profile (list, optional): (seconds, IOPS) phases of the workload.
+        min_storage (int, optional): The fewest GB of storage to allocate,
+            ie: for the data.
+
+    Returns:
+        dict: The StorageType, AllocatedStorage & IOPS parameters.
+    """
+    sustained_iops, throughput = int(sustained_iops), int(throughput)
+    min_storage = int(min_storage)
+    peak = sustained_iops
+    if profile:
+        validate_profile(profile)
+        peak = max([peak] + [int(iops) for _, iops in profile])
+
+    if sustained_iops <= GP2_MAX_IOPS and throughput <= GP2_MAX_THROUGHPUT:
+        size = max(MIN_STORAGE["gp2"], min_storage,
+                   _ceil_div(sustained_iops, GP2_IOPS_PER_GB))
+        if throughput > GP2_SMALL_THROUGHPUT:
+            size = max(size, GP2_FULL_THROUGHPUT_STORAGE)
+        if profile:
+            size = gp2_storage_for_profile(size, profile)
+        if size is not None and size <= MAX_STORAGE:
+            return {"StorageType": "gp2", "AllocatedStorage": size,
+                    "IOPS": 0}
+
+    iops = max(IO1_MIN_IOPS, peak)
+    if iops > IO1_MAX_IOPS or throughput > IO1_MAX_THROUGHPUT:
+        raise ValueError("No RDS storage can do %s IOPS at %s MiB/s." %
+                         (iops, throughput))
+    size = max(MIN_STORAGE["io1"], min_storage,
+               _ceil_div(iops, IO1_MAX_IOPS_PER_GB))
+    if size > MAX_STORAGE:
+        raise ValueError("RDS storage can't be bigger than %s GB." %
+                         MAX_STORAGE)
+    # Big volumes need a minimum of IOPS for their size.
+    iops = max(iops, int(math.ceil(size * IO1_MIN_IOPS_PER_GB)))
+    if iops > IO1_MAX_IOPS:
+        raise ValueError("%s GB of io1 storage needs at least %s IOPS, more "
+                         "than the %s RDS allows." %
+                         (size, iops, IO1_MAX_IOPS))
+    return {"StorageType": "io1", "AllocatedStorage": size, "IOPS": iops}
+
+
+def validate_storage(storage_type, allocated_storage, iops, profile=None):
+    """Checks a combination of the StorageType, AllocatedStorage & IOPS
+    parameters is one RDS accepts.
+
+    Args:
+        storage_type (str): One of STORAGE_TYPES.
+        allocated_storage (int): GB of storage.
+        iops (int): Provisioned IOPS, or 0.
+        profile (list, optional): (seconds, IOPS) phases of the workload,
+            which gp2 storage needs to get through without running out of
+            credits.
+    """
+    if storage_type not in STORAGE_TYPES:
+        raise ValueError("StorageType must be one of %s." %
+                         ", ".join(STORAGE_TYPES))
+    allocated_storage, iops = int(allocated_storage), int(iops)
+    storage_type = effective_storage_type(storage_type, iops)
+    if iops and storage_type != "io1":
+        raise ValueError("IOPS can only be provisioned on io1 storage.")
+    if not MIN_STORAGE[storage_type] <= allocated_storage <= MAX_STORAGE:
+        raise ValueError("AllocatedStorage for %s storage must be between "
+                         "%s and %s GB." % (storage_type,
+                                            MIN_STORAGE[storage_type],
+                                            MAX_STORAGE))
+    if storage_type == "io1":
+        if not IO1_MIN_IOPS <= iops <= IO1_MAX_IOPS:
+            raise ValueError("IOPS must be between %s and %s." %
+                             (IO1_MIN_IOPS, IO1_MAX_IOPS))
+        if not (IO1_MIN_IOPS_PER_GB * allocated_storage <= iops <=
+                IO1_MAX_IOPS_PER_GB * allocated_storage):
+            raise ValueError("IOPS must be between %s and %s times "
+                             "AllocatedStorage." % (IO1_MIN_IOPS_PER_GB,
+                                                    IO1_MAX_IOPS_PER_GB))
+    if profile and storage_type == "gp2":
+        depleted_at = simulate_gp2(allocated_storage, profile).depleted_at
+        if depleted_at is not None:
+            needed = gp2_storage_for_profile(allocated_storage, profile)
+            raise ValueError(
+                "%s GB of gp2 storage runs out of burst credits %s seconds "
+                "into the storage profile, use %s." %
+                (allocated_storage, depleted_at,
+                 "at least %s GB" % needed if needed else "io1 storage"))
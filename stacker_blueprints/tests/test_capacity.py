@@ -0,0 +1,123 @@
+import unittest
+
+from stacker_blueprints import capacity
+from stacker_blueprints.rds.mysql import AuroraCluster, ReadReplicaSet
+from stacker_blueprints.rds.postgres import MasterInstance
+from stacker_blueprints.rds.proxy import RDSProxy
+
+
+class TestDemand(unittest.TestCase):
+    def test_subnet_capacity(self):
+        self.assertEqual(capacity.subnet_capacity("10.0.0.0/24"), 251)
+
+    def test_asg_demand(self):
+        self.assertEqual(
+            capacity.asg_demand({"MaxSize": "4"}, 2),
+            [("PrivateSubnets", 8, 0)])
+        self.assertEqual(
+            capacity.asg_demand({"ELBHostName": "app"}, 1),
+            [("PrivateSubnets", 5, 0),
+             ("PublicSubnets", 0, capacity.ELB_IPS_PER_SUBNET)])
+
+    def test_rds_demand(self):
+        self.assertEqual(capacity.rds_demand({}, 1), [("Subnets", 2, 0)])
+        self.assertEqual(capacity.rds_demand({"MultiAZ": "false"}, 1),
+                         [("Subnets", 1, 0)])
+
+    def test_aurora_demand(self):
+        self.assertEqual(capacity.aurora_demand({"MaxReaders": "3"}, 1),
+                         [("Subnets", 4, 0)])
+
+    def test_rds_replica_set_demand(self):
+        self.assertEqual(
+            capacity.rds_replica_set_demand({"Replicas": "3"}, 2),
+            [("Subnets", 6, 0)])
+
+    def test_rds_proxy_demand(self):
+        self.assertEqual(
+            capacity.rds_proxy_demand({"DBInstanceIdentifier": "db"}, 1),
+            [("Subnets", 0, capacity.RDS_PROXY_IPS_PER_SUBNET)])
+        self.assertEqual(
+            capacity.rds_proxy_demand({"DBClusterIdentifier": "db"}, 1),
+            [("Subnets", 0, 2 * capacity.RDS_PROXY_IPS_PER_SUBNET)])
+
+    def test_replication_group_demand(self):
+        self.assertEqual(
+            capacity.replication_group_demand({"NumCacheClusters": "3"}, 1),
+            [("Subnets", 3, 0)])
+
+    def test_get_estimator(self):
+        self.assertEqual(capacity._get_estimator(AuroraCluster),
+                         capacity.aurora_demand)
+        self.assertEqual(capacity._get_estimator(ReadReplicaSet),
+                         capacity.rds_replica_set_demand)
+        self.assertEqual(capacity._get_estimator(MasterInstance),
+                         capacity.rds_demand)
+        self.assertEqual(capacity._get_estimator(RDSProxy),
+                         capacity.rds_proxy_demand)
+        self.assertIsNone(capacity._get_estimator(object))
+
+
+class TestVPCSubnets(unittest.TestCase):
+    parameters = {
+        "PublicSubnets": "10.0.0.0/24,10.0.1.0/24",
+        "PrivateSubnets": "10.0.2.0/24,10.0.3.0/24",
+        "ExtraPrivateSubnets": "10.0.4.0/24,10.0.5.0/24",
+        "NatGatewaysPerAZ": "2",
+    }
+
+    def public_demand(self, parameters):
+        subnets = capacity._vpc_subnets("vpc", parameters)
+        return [s.demand for s in subnets["PublicSubnets"]]
+
+    def test_nat_instances(self):
+        self.assertEqual(self.public_demand(self.parameters), [1, 1])
+
+    def test_nat_gateways(self):
+        parameters = dict(self.parameters, UseNatGateway="true")
+        self.assertEqual(self.public_demand(parameters), [2, 2])
+
+    def test_extra_private_subnets(self):
+        subnets = capacity._vpc_subnets("vpc", self.parameters)
+        self.assertEqual(
+            [s.cidr for s in subnets["PrivateSubnetsGroup1"]],
+            ["10.0.4.0/24", "10.0.5.0/24"])
+
+
+class TestPlan(unittest.TestCase):
+    def test_plan(self):
+        config = {"stacks": [
+            {"name": "vpc",
+             "class_path": "stacker_blueprints.vpc.VPC",
+             "parameters": {
+                 "PublicSubnets": "10.0.0.0/28,10.0.0.16/28",
+                 "PrivateSubnets": "10.0.1.0/28,10.0.1.16/28"}},
+            {"name": "db",
+             "class_path": "stacker_blueprints.rds.mysql.ReadReplicaSet",
+             "parameters": {"Subnets": "vpc::PrivateSubnets",
+                            "Replicas": "3"}},
+            {"name": "proxy",
+             "class_path": "stacker_blueprints.rds.proxy.RDSProxy",
+             "parameters": {"Subnets": "vpc::PrivateSubnets"}},
+        ]}
+        usage = dict((s.name, s) for s in capacity.plan(config))
+        private = usage["vpc::PrivateSubnets[0]"]
+        self.assertEqual(private.consumers, [("db", 2), ("proxy", 10)])
+        self.assertEqual(private.headroom, 11 - 12)
+        self.assertEqual(usage["vpc::PublicSubnets[1]"].demand, 1)
+
+    def test_plan_tolerating_az_loss(self):
+        config = {"stacks": [
+            {"name": "vpc",
+             "class_path": "stacker_blueprints.vpc.VPC",
+             "parameters": {
+                 "PublicSubnets": "10.0.0.0/24,10.0.1.0/24",
+                 "PrivateSubnets": "10.0.2.0/24,10.0.3.0/24"}},
+            {"name": "db",
+             "class_path": "stacker_blueprints.rds.mysql.ReadReplicaSet",
+             "parameters": {"Subnets": "vpc::PrivateSubnets",
+                            "Replicas": "3"}},
+        ]}
+        usage = dict((s.name, s) for s in capacity.plan(
+            config, tolerate_az_loss=True))
+        self.assertEqual(usage["vpc::PrivateSubnets[0]"].demand, 3)
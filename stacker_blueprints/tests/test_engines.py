@@ -0,0 +1,182 @@
+from collections import OrderedDict
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from stacker_blueprints import engines
+
+# The versions & families the blueprints listed before the catalog.
+BASELINE_VERSIONS = {
+    "MySQL": [
+        "5.1.73a", "5.1.73b",
+        "5.5.40", "5.5.40a", "5.5.40b", "5.5.41", "5.5.42", "5.5.46",
+        "5.6.19a", "5.6.19b", "5.6.21", "5.6.21b", "5.6.22", "5.6.23",
+        "5.6.27", "5.6.29",
+        "5.7.10", "5.7.11",
+    ],
+    "postgres": [
+        "9.3.1", "9.3.2", "9.3.3", "9.3.5", "9.3.6", "9.3.9", "9.3.10",
+        "9.3.12",
+        "9.4.1", "9.4.4", "9.4.5", "9.4.7",
+        "9.5.2",
+    ],
+    "aurora-mysql": [
+        "5.7.mysql_aurora.2.07.9", "5.7.mysql_aurora.2.10.3",
+        "5.7.mysql_aurora.2.11.2",
+        "8.0.mysql_aurora.3.02.2", "8.0.mysql_aurora.3.03.1",
+        "8.0.mysql_aurora.3.04.0",
+    ],
+    "aurora-postgresql": [
+        "11.18", "11.19", "12.13", "12.14", "13.9", "13.10", "14.6", "14.7",
+        "15.2",
+    ],
+    "redis": ["2.6.13", "2.8.19", "2.8.21", "2.8.22", "2.8.23", "2.8.6"],
+}
+BASELINE_FAMILIES = {
+    "MySQL": ["mysql5.1", "mysql5.5", "mysql5.6", "mysql5.7"],
+    "postgres": ["postgres9.3", "postgres9.4", "postgres9.5"],
+    "oracle-ee": ["oracle-ee-11.2", "oracle-ee-12.1"],
+    "oracle-se": ["oracle-se-11.2", "oracle-se-12.1"],
+    "oracle-se1": ["oracle-se1-11.2", "oracle-se1-12.1"],
+    "sqlserver-ee": ["sqlserver-ee-10.50", "sqlserver-ee-11.00"],
+    "sqlserver-ex": ["sqlserver-ex-10.50", "sqlserver-ex-11.00"],
+    "sqlserver-se": ["sqlserver-se-10.50", "sqlserver-se-11.00"],
+    "sqlserver-web": ["sqlserver-web-10.50", "sqlserver-web-11.00"],
+    "aurora-mysql": ["aurora-mysql5.7", "aurora-mysql8.0"],
+    "aurora-postgresql": [
+        "aurora-postgresql11", "aurora-postgresql12", "aurora-postgresql13",
+        "aurora-postgresql14", "aurora-postgresql15",
+    ],
+    "redis": ["redis2.6", "redis2.8"],
+}
+BASELINE_RDS_ENGINES = [
+    "MySQL", "oracle-se1", "oracle-se", "oracle-ee", "sqlserver-ee",
+    "sqlserver-se", "sqlserver-ex", "sqlserver-web", "postgres",
+]
+
+
+def family(major, versions):
+    return {"major": major, "versions": versions}
+
+
+class TestLoadCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write_catalog(self, families):
+        path = os.path.join(self.tmp, "engines.json")
+        with open(path, "w") as fd:
+            json.dump({"version": 1, "engines": {"postgres": {
+                "service": "rds", "kind": "instance",
+                "families": families}}}, fd)
+        return path
+
+    def test_index(self):
+        path = self.write_catalog(OrderedDict([
+            ("postgres9.6", family("9.6", ["9.6.22", "9.6.24"])),
+            ("postgres10", family("10", ["10.17"])),
+        ]))
+        engine = engines.load_catalog(path)["postgres"]
+        self.assertEqual(engine.service, "rds")
+        self.assertEqual(engine.kind, "instance")
+        self.assertEqual(engine.families, ["postgres9.6", "postgres10"])
+        self.assertEqual(engine.versions, ["9.6.22", "9.6.24", "10.17"])
+        self.assertEqual(engine.major_versions, ["9.6", "10"])
+        self.assertEqual(engine.version_families["10.17"], "postgres10")
+        self.assertEqual(engine.family_majors["postgres9.6"], "9.6")
+
+    def test_duplicate_version(self):
+        path = self.write_catalog(OrderedDict([
+            ("postgres9.6", family("9.6", ["9.6.22"])),
+            ("postgres10", family("10", ["9.6.22"])),
+        ]))
+        self.assertRaises(ValueError, engines.load_catalog, path)
+
+    def test_loaded_once(self):
+        self.assertIs(engines.get_catalog(), engines.get_catalog())
+
+
+class TestCatalog(unittest.TestCase):
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, engines.get_engine, "mongodb")
+
+    def test_engine_names(self):
+        self.assertEqual(engines.get_engine_names("rds", "instance"),
+                         BASELINE_RDS_ENGINES)
+        self.assertEqual(engines.get_engine_names("rds", "cluster"),
+                         ["aurora-mysql", "aurora-postgresql"])
+        self.assertEqual(engines.get_engine_names("elasticache"), ["redis"])
+
+    def test_baseline_versions(self):
+        for name, versions in BASELINE_VERSIONS.items():
+            engine = engines.get_engine(name)
+            for version in versions:
+                self.assertIn(version, engine.versions)
+                engines.validate_engine_version(name, version=version)
+
+    def test_baseline_families(self):
+        for name, families in BASELINE_FAMILIES.items():
+            engine = engines.get_engine(name)
+            for f in families:
+                self.assertIn(f, engine.families)
+                engines.validate_engine_version(name, family=f)
+
+    def test_rds_families(self):
+        families = engines.get_families("rds", "instance")
+        for name in BASELINE_RDS_ENGINES:
+            for f in BASELINE_FAMILIES[name]:
+                self.assertIn(f, families)
+        self.assertNotIn("aurora-mysql5.7", families)
+
+    def test_major_versions(self):
+        self.assertEqual(
+            engines.get_engine("MySQL").major_versions,
+            ["5.1", "5.5", "5.6", "5.7", "8.0"])
+        self.assertIn("15", engines.get_engine("postgres").major_versions)
+
+
+class TestValidateEngineVersion(unittest.TestCase):
+    def test_valid(self):
+        engines.validate_engine_version(
+            "postgres", version="9.5.2", family="postgres9.5",
+            major_version="9.5")
+        engines.validate_engine_version(
+            "postgres", version="15.5", family="postgres15",
+            major_version="15")
+        engines.validate_engine_version(
+            "MySQL", version="5.7.11", major_version="5.7")
+
+    def test_unknown_version(self):
+        self.assertRaises(ValueError, engines.validate_engine_version,
+                          "postgres", version="9.5.99")
+
+    def test_unknown_family(self):
+        self.assertRaises(ValueError, engines.validate_engine_version,
+                          "postgres", family="mysql5.7")
+
+    def test_version_family_mismatch(self):
+        self.assertRaises(ValueError, engines.validate_engine_version,
+                          "postgres", version="15.5", family="postgres14")
+
+    def test_version_major_mismatch(self):
+        self.assertRaises(ValueError, engines.validate_engine_version,
+                          "MySQL", version="5.7.11", major_version="5.6")
+        # The first two parts of postgres 10+ versions aren't the major.
+        self.assertRaises(ValueError, engines.validate_engine_version,
+                          "postgres", version="15.5", major_version="15.5")
+
+    def test_family_major_mismatch(self):
+        self.assertRaises(ValueError, engines.validate_engine_version,
+                          "sqlserver-ee", family="sqlserver-ee-11.00",
+                          major_version="10.50")
+
+    def test_engines_without_versions(self):
+        # Only families & majors are known for these.
+        engines.validate_engine_version(
+            "oracle-ee", version="12.1.0.2.v1", family="oracle-ee-12.1",
+            major_version="12.1")
@@ -0,0 +1,88 @@
+import unittest
+
+from stacker_blueprints.rds import instance_classes, mysql, postgres
+from stacker_blueprints.rds.instance_classes import GiB
+
+
+class TestInstanceClasses(unittest.TestCase):
+    def test_family_sizes(self):
+        self.assertEqual(instance_classes.get_instance_class("db.r5.large"),
+                         (16 * GiB, 2))
+        self.assertEqual(
+            instance_classes.get_instance_class("db.m5.24xlarge"),
+            (384 * GiB, 96))
+
+    def test_family_largest_size(self):
+        self.assertIsNotNone(
+            instance_classes.get_instance_class("db.r6g.16xlarge"))
+        self.assertIsNone(
+            instance_classes.get_instance_class("db.r6g.24xlarge"))
+
+    def test_irregular(self):
+        self.assertEqual(
+            instance_classes.get_instance_class("db.m3.medium"),
+            (int(3.75 * GiB), 1))
+
+    def test_unknown(self):
+        self.assertIsNone(instance_classes.get_instance_class("db.x9.large"))
+
+    def test_is_burstable(self):
+        self.assertTrue(instance_classes.is_burstable("db.t3.micro"))
+        self.assertFalse(instance_classes.is_burstable("db.r5.large"))
+
+
+def presets(mixin, instance_type):
+    class Blueprint(mixin):
+        def get_parameter_value(self, name):
+            return {"InstanceType": instance_type}[name]
+    return Blueprint().get_parameter_presets()
+
+
+class TestPostgresPresets(unittest.TestCase):
+    def test_small_instance(self):
+        result = presets(postgres.PostgresMixin, "db.r5.large")
+        self.assertEqual(result["work_mem"], "4096")
+        self.assertEqual(result["maintenance_work_mem"], "1048576")
+        self.assertEqual(result["autovacuum_max_workers"], "3")
+
+    def test_large_instance(self):
+        result = presets(postgres.PostgresMixin, "db.r5.24xlarge")
+        # (768GiB - 192GiB - 48 * 2GiB) / (5000 connections * 2)
+        self.assertEqual(result["work_mem"], "50331")
+        self.assertEqual(result["maintenance_work_mem"], "2097152")
+        self.assertEqual(result["autovacuum_max_workers"], "48")
+
+    def test_work_mem_fits_in_memory(self):
+        for name, instance_class in \
+                instance_classes.INSTANCE_CLASSES.items():
+            result = presets(postgres.PostgresMixin, name)
+            work_mem = int(result["work_mem"])
+            if work_mem == postgres.MIN_WORK_MEM:
+                continue
+            connections = min(
+                instance_class.memory // postgres.MEMORY_PER_CONNECTION,
+                postgres.MAX_MAX_CONNECTIONS)
+            used = (instance_class.memory // 4 +
+                    int(result["maintenance_work_mem"]) * 1024 *
+                    int(result["autovacuum_max_workers"]) +
+                    work_mem * 1024 * connections *
+                    postgres.SORTS_PER_CONNECTION)
+            self.assertLessEqual(used, instance_class.memory, name)
+
+    def test_unknown_instance_class(self):
+        result = presets(postgres.PostgresMixin, "db.x9.large")
+        self.assertNotIn("work_mem", result)
+        self.assertEqual(result["max_connections"],
+                         "LEAST({DBInstanceClassMemory/9531392},5000)")
+
+
+class TestMySQLPresets(unittest.TestCase):
+    def test_small_instance(self):
+        result = presets(mysql.MySQLMixin, "db.t3.micro")
+        self.assertEqual(result["innodb_buffer_pool_instances"], "1")
+        self.assertEqual(result["innodb_read_io_threads"], "4")
+
+    def test_large_instance(self):
+        result = presets(mysql.MySQLMixin, "db.r5.24xlarge")
+        self.assertEqual(result["innodb_buffer_pool_instances"], "64")
+        self.assertEqual(result["innodb_write_io_threads"], "64")
@@ -0,0 +1,162 @@
+import unittest
+
+from stacker_blueprints.rds import storage
+
+# An hour long batch job bursting above a 100GB volume's 300 IOPS baseline,
+# followed by 23 quiet hours.
+BATCH_PROFILE = [(3600, 2500), (82800, 500)]
+
+
+class TestSimulateGP2(unittest.TestCase):
+    def test_baseline_covers_profile(self):
+        result = storage.simulate_gp2(1000, BATCH_PROFILE)
+        self.assertEqual(result.min_balance, storage.GP2_BURST_BUCKET)
+        self.assertIsNone(result.depleted_at)
+
+    def test_depleted_in_first_pass(self):
+        result = storage.simulate_gp2(100, BATCH_PROFILE)
+        self.assertEqual(result.min_balance, 0)
+        # 5400000 credits drained at 2500 - 300 IOPS.
+        self.assertEqual(result.depleted_at, 2454)
+
+    def test_over_burst(self):
+        result = storage.simulate_gp2(100, [(60, 4000)])
+        self.assertEqual(result.depleted_at, 0)
+
+    def test_depleted_in_second_pass(self):
+        # Drains 5040000 credits, then earns back 1800000.
+        result = storage.simulate_gp2(200, [(3600, 2000), (3600, 100)])
+        self.assertEqual(result.depleted_at, 7200 + 2160000 // 1400)
+
+    def test_depleted_over_many_passes(self):
+        # Loses 700000 credits every pass without the bucket filling up.
+        result = storage.simulate_gp2(100, [(1000, 1300), (1000, 0)])
+        self.assertEqual(result.min_balance, 0)
+        self.assertTrue(14000 <= result.depleted_at <= 14500)
+
+    def test_refills(self):
+        result = storage.simulate_gp2(100, [(1000, 1300), (4000, 0)])
+        self.assertEqual(result.min_balance,
+                         storage.GP2_BURST_BUCKET - 1000000)
+        self.assertIsNone(result.depleted_at)
+
+    def test_invalid_profile(self):
+        self.assertRaises(ValueError, storage.simulate_gp2, 100, [])
+        self.assertRaises(ValueError, storage.simulate_gp2, 100, [(0, 100)])
+        self.assertRaises(ValueError, storage.simulate_gp2, 100,
+                          [(60, -1)])
+
+
+class TestGP2StorageForProfile(unittest.TestCase):
+    def test_smallest_volume(self):
+        size = storage.gp2_storage_for_profile(100, BATCH_PROFILE)
+        self.assertEqual(size, 334)
+        self.assertIsNone(storage.simulate_gp2(size, BATCH_PROFILE)
+                          .depleted_at)
+        self.assertIsNotNone(storage.simulate_gp2(size - 1, BATCH_PROFILE)
+                             .depleted_at)
+
+    def test_at_least_allocated_storage(self):
+        self.assertEqual(
+            storage.gp2_storage_for_profile(500, BATCH_PROFILE), 500)
+
+    def test_over_gp2_max(self):
+        self.assertIsNone(
+            storage.gp2_storage_for_profile(100, [(60, 20000)]))
+
+
+class TestRecommendStorage(unittest.TestCase):
+    def assertValid(self, recommended, profile=None):
+        storage.validate_storage(recommended["StorageType"],
+                                 recommended["AllocatedStorage"],
+                                 recommended["IOPS"], profile)
+
+    def test_gp2(self):
+        recommended = storage.recommend_storage(900)
+        self.assertEqual(recommended, {"StorageType": "gp2",
+                                       "AllocatedStorage": 300, "IOPS": 0})
+        self.assertValid(recommended)
+
+    def test_gp2_minimum_size(self):
+        self.assertEqual(storage.recommend_storage(10)["AllocatedStorage"],
+                         storage.MIN_STORAGE["gp2"])
+
+    def test_gp2_throughput(self):
+        recommended = storage.recommend_storage(100, throughput=200)
+        self.assertEqual(recommended["AllocatedStorage"],
+                         storage.GP2_FULL_THROUGHPUT_STORAGE)
+
+    def test_gp2_profile(self):
+        recommended = storage.recommend_storage(500, profile=BATCH_PROFILE)
+        self.assertEqual(recommended["AllocatedStorage"], 334)
+        self.assertValid(recommended, BATCH_PROFILE)
+
+    def test_io1(self):
+        recommended = storage.recommend_storage(20000)
+        self.assertEqual(recommended, {"StorageType": "io1",
+                                       "AllocatedStorage": 400,
+                                       "IOPS": 20000})
+        self.assertValid(recommended)
+
+    def test_io1_for_throughput(self):
+        recommended = storage.recommend_storage(1000, throughput=500)
+        self.assertEqual(recommended["StorageType"], "io1")
+        self.assertValid(recommended)
+
+    def test_io1_minimum_iops_per_gb(self):
+        recommended = storage.recommend_storage(20000, min_storage=50000)
+        self.assertEqual(recommended, {"StorageType": "io1",
+                                       "AllocatedStorage": 50000,
+                                       "IOPS": 25000})
+        self.assertValid(recommended)
+
+    def test_too_big(self):
+        self.assertRaises(ValueError, storage.recommend_storage, 20000,
+                          min_storage=storage.MAX_STORAGE + 1)
+        self.assertRaises(ValueError, storage.recommend_storage,
+                          storage.IO1_MAX_IOPS + 1)
+
+    def test_round_trip(self):
+        for iops in (100, 3000, 16000, 16001, 40000, storage.IO1_MAX_IOPS):
+            for min_storage in (0, 1000, 10000, 60000):
+                for profile in (None, BATCH_PROFILE):
+                    try:
+                        recommended = storage.recommend_storage(
+                            iops, profile=profile, min_storage=min_storage)
+                    except ValueError:
+                        continue
+                    self.assertValid(recommended, profile)
+
+
+class TestValidateStorage(unittest.TestCase):
+    def test_valid(self):
+        storage.validate_storage("gp2", 100, 0)
+        storage.validate_storage("default", 100, 1000)
+        storage.validate_storage("standard", 5, 0)
+
+    def test_unknown_type(self):
+        self.assertRaises(ValueError, storage.validate_storage, "gp3", 100,
+                          0)
+
+    def test_iops_without_io1(self):
+        self.assertRaises(ValueError, storage.validate_storage, "gp2", 100,
+                          1000)
+
+    def test_size_limits(self):
+        self.assertRaises(ValueError, storage.validate_storage, "gp2", 10, 0)
+        self.assertRaises(ValueError, storage.validate_storage, "io1", 50,
+                          1000)
+        self.assertRaises(ValueError, storage.validate_storage, "gp2",
+                          storage.MAX_STORAGE + 1, 0)
+
+    def test_iops_ratio(self):
+        self.assertRaises(ValueError, storage.validate_storage, "io1", 100,
+                          6000)
+        self.assertRaises(ValueError, storage.validate_storage, "io1", 4000,
+                          1000)
+
+    def test_profile(self):
+        storage.validate_storage("gp2", 334, 0, BATCH_PROFILE)
+        with self.assertRaises(ValueError) as cm:
+            storage.validate_storage("gp2", 100, 0, BATCH_PROFILE)
+        self.assertIn("at least 334 GB", str(cm.exception))
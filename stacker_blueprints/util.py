@@ -0,0 +1,17 @@
+def boolean(value):
+    """Converts a local parameter to a bool.
+
+    Local parameters set in the config file come through as bools, but ones
+    given on the command line are always strings.
+
+    Args:
+        value (bool or str): The parameter value.
+
+    Returns:
+        bool: The parsed value.
+    """
+    if value in [True, 1, "1", "true", "True"]:
+        return True
+    if value in [False, 0, "0", "false", "False"]:
+        return False
+    raise ValueError("%r is not a valid boolean" % (value,))
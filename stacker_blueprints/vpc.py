@@ -3,23 +3,81 @@
 This includes the VPC, it's subnets, availability zones, etc.
 """
 
+from awacs.aws import Allow, Policy, Statement
+from awacs.helpers.trust import make_simple_assume_statement
+import awacs.logs
 from troposphere import (
     Ref, Output, Join, FindInMap, Select, GetAZs, Not, Equals, Tags, Or,
-    Condition, GetAtt, If
+    And, Condition, GetAtt, If
 )
-from troposphere import ec2
+from troposphere import ec2, firehose, iam, logs, s3
+from troposphere.cloudwatch import Alarm, MetricDimension
 from troposphere.route53 import HostedZone, HostedZoneVPCs
 
 from stacker.blueprints.base import Blueprint
 
+from . import compat
+from .firehose import (
+    FirehoseAction,
+    logs_write_policy,
+    s3_arn,
+    s3_write_policy,
+)
+from .util import boolean
+
 NAT_INSTANCE_NAME = 'NatInstance%s'
 NAT_GATEWAY_NAME = 'NatGateway%s'
+NAT_GROUP_SUFFIX = '%sGroup%s'
 GATEWAY = 'InternetGateway'
+EGRESS_ONLY_GATEWAY = 'EgressOnlyInternetGateway'
+IPV6_CIDR_BLOCK = 'Ipv6CidrBlock'
+# Each subnet type (public, private, extra private groups) gets a slot of
+# /64s in the VPC's /56, indexed by AZ, so blocks don't move as AZs or
+# subnet groups are added.
+IPV6_SUBNET_COUNT = 256
+IPV6_SLOT_SIZE = 16
 GW_ATTACH = 'GatewayAttach'
 VPC_NAME = "VPC"
 VPC_ID = Ref(VPC_NAME)
 DEFAULT_SG = "DefaultSG"
 NAT_SG = "NATSG"
+FLOW_LOGS_BUCKET = "FlowLogsBucket"
+FLOW_LOGS_GROUP = "FlowLogsGroup"
+FLOW_LOGS_ROLE = "FlowLogsRole"
+FLOW_LOGS_STREAM = "FlowLogsDeliveryStream"
+FLOW_LOGS_STREAM_ROLE = "FlowLogsDeliveryStreamRole"
+FLOW_LOGS_SUBSCRIPTION_ROLE = "FlowLogsSubscriptionRole"
+
+
+def flow_logs_policy():
+    statements = [
+        Statement(
+            Effect=Allow,
+            Action=[
+                awacs.logs.CreateLogGroup,
+                awacs.logs.CreateLogStream,
+                awacs.logs.DescribeLogGroups,
+                awacs.logs.DescribeLogStreams,
+                awacs.logs.PutLogEvents,
+            ],
+            Resource=['*'],
+        ),
+    ]
+    return Policy(Statement=statements)
+
+
+def flow_logs_subscription_policy(stream_arn):
+    statements = [
+        Statement(
+            Effect=Allow,
+            Action=[
+                FirehoseAction("PutRecord"),
+                FirehoseAction("PutRecordBatch"),
+            ],
+            Resource=[stream_arn],
+        ),
+    ]
+    return Policy(Statement=statements)
 
 
 class VPC(Blueprint):
@@ -27,7 +85,22 @@ class VPC(Blueprint):
         "AZCount":  {
             "type": int,
             "default": 2,
-        }
+        },
+        # Number of NAT Gateways to create in each AZ. Every gateway past the
+        # first gets its own private subnet group (see ExtraPrivateSubnets)
+        # with a route table pointing at it, spreading egress across them.
+        "NatGatewaysPerAZ": {
+            "type": int,
+            "default": 1,
+        },
+        # Adds an Amazon provided IPv6 block to the VPC and a /64 from it to
+        # every subnet. Public subnets route IPv6 through the Internet
+        # Gateway, private subnets through an Egress Only Internet Gateway,
+        # so IPv6 egress skips the NAT entirely.
+        "EnableIpv6": {
+            "type": boolean,
+            "default": False,
+        },
     }
 
     PARAMETERS = {
@@ -70,6 +143,66 @@ class VPC(Blueprint):
             "description": "If set to true, will configure a NAT Gateway"
                            "instead of NAT instances.",
             "default": "false"},
+        "ExtraPrivateSubnets": {
+            "type": "CommaDelimitedList",
+            "description": "Comma separated list of subnets to use for the "
+                           "additional private subnet groups created when "
+                           "NatGatewaysPerAZ is greater than 1, listed one "
+                           "group at a time. NOTE: Must have AZCount * "
+                           "(NatGatewaysPerAZ - 1) subnets",
+            "default": ""},
+        "NatGatewayAlarmTopic": {
+            "type": "String",
+            "description": "ARN of an SNS topic to notify when a NAT "
+                           "Gateway alarm changes state.",
+            "default": ""},
+        "NatGatewayPacketsDropThreshold": {
+            "type": "Number",
+            "description": "Number of packets dropped by a NAT Gateway in "
+                           "5 minutes before alarming.",
+            "default": "100"},
+        "NatGatewayBytesOutThreshold": {
+            "type": "Number",
+            "description": "Bytes sent to destinations by a NAT Gateway in "
+                           "1 minute before alarming. Default: ~80% of "
+                           "5Gbps",
+            "default": "30000000000"},
+        "FlowLogsBucketName": {
+            "type": "String",
+            "description": "Name of the S3 bucket to create for VPC flow "
+                           "logs. If not given, flow logs are disabled.",
+            "default": ""},
+        "FlowLogsLevel": {
+            "type": "String",
+            "allowed_values": ["VPC", "Subnet"],
+            "description": "Whether to capture flow logs once for the whole "
+                           "VPC, or separately for each subnet.",
+            "default": "VPC"},
+        "FlowLogsTrafficType": {
+            "type": "String",
+            "allowed_values": ["ALL", "ACCEPT", "REJECT"],
+            "description": "The type of traffic to capture in flow logs.",
+            "default": "ALL"},
+        "FlowLogsBufferInterval": {
+            "type": "Number",
+            "description": "Seconds the flow logs delivery stream aggregates "
+                           "records for before writing an object to S3.",
+            "min_value": "60",
+            "max_value": "900",
+            "default": "300"},
+        "FlowLogsBufferSize": {
+            "type": "Number",
+            "description": "MBs the flow logs delivery stream aggregates "
+                           "before writing an object to S3.",
+            "min_value": "1",
+            "max_value": "128",
+            "default": "5"},
+        "FlowLogsPrefix": {
+            "type": "String",
+            "description": "Prefix for flow log objects in S3. The region, "
+                           "VPC id and a YYYY/MM/DD/HH partition are "
+                           "appended to it.",
+            "default": "flowlogs/"},
     }
 
     def create_conditions(self):
@@ -94,6 +227,20 @@ class VPC(Blueprint):
         self.template.add_condition(
             "UseNatInstances",
             Not(Condition("UseNatGateway")))
+        self.template.add_condition(
+            "HasNatGatewayAlarmTopic",
+            Not(Equals(Ref("NatGatewayAlarmTopic"), "")))
+        self.template.add_condition(
+            "EnableFlowLogs",
+            Not(Equals(Ref("FlowLogsBucketName"), "")))
+        self.template.add_condition(
+            "EnableVPCFlowLogs",
+            And(Condition("EnableFlowLogs"),
+                Equals(Ref("FlowLogsLevel"), "VPC")))
+        self.template.add_condition(
+            "EnableSubnetFlowLogs",
+            And(Condition("EnableFlowLogs"),
+                Equals(Ref("FlowLogsLevel"), "Subnet")))
 
     def create_vpc(self):
         t = self.template
@@ -104,6 +251,16 @@ class VPC(Blueprint):
 
         # Just about everything needs this, so storing it on the object
         t.add_output(Output("VpcId", Value=VPC_ID))
+        t.add_output(Output("CidrBlock", Value=Ref("CidrBlock")))
+
+        if self.local_parameters["EnableIpv6"]:
+            t.add_resource(compat.VPCCidrBlock(
+                IPV6_CIDR_BLOCK,
+                AmazonProvidedIpv6CidrBlock=True,
+                VpcId=VPC_ID))
+            t.add_output(Output(
+                "Ipv6CidrBlock",
+                Value=Select(0, GetAtt(VPC_NAME, "Ipv6CidrBlocks"))))
 
     def create_internal_zone(self):
         t = self.template
@@ -173,6 +330,45 @@ class VPC(Blueprint):
             GW_ATTACH,
             VpcId=VPC_ID,
             InternetGatewayId=Ref(GATEWAY)))
+        if self.local_parameters["EnableIpv6"]:
+            t.add_resource(compat.EgressOnlyInternetGateway(
+                EGRESS_ONLY_GATEWAY,
+                VpcId=VPC_ID))
+
+    def create_subnet(self, subnet_name, az, cidr_block, net_type,
+                      ipv6_index):
+        t = self.template
+        attrs = {}
+        depends_on = GW_ATTACH
+        if self.local_parameters["EnableIpv6"]:
+            ipv6_block = Select(0, GetAtt(VPC_NAME, "Ipv6CidrBlocks"))
+            attrs["Ipv6CidrBlock"] = Select(
+                ipv6_index, compat.Cidr(ipv6_block, IPV6_SUBNET_COUNT, "64"))
+            attrs["AssignIpv6AddressOnCreation"] = True
+            depends_on = [GW_ATTACH, IPV6_CIDR_BLOCK]
+        t.add_resource(compat.Subnet(
+            subnet_name,
+            AvailabilityZone=az,
+            VpcId=VPC_ID,
+            DependsOn=depends_on,
+            CidrBlock=cidr_block,
+            Tags=Tags(type=net_type),
+            **attrs))
+        self.subnet_names.append(subnet_name)
+
+    def create_ipv6_route(self, route_name, route_table_name, net_type):
+        if not self.local_parameters["EnableIpv6"]:
+            return
+        if net_type == 'public':
+            target = {"GatewayId": Ref(GATEWAY)}
+        else:
+            target = {"EgressOnlyInternetGatewayId": Ref(EGRESS_ONLY_GATEWAY)}
+        self.template.add_resource(compat.Route(
+            route_name,
+            RouteTableId=Ref(route_table_name),
+            DestinationIpv6CidrBlock="::/0",
+            DependsOn=IPV6_CIDR_BLOCK,
+            **target))
 
     def create_network(self):
         t = self.template
@@ -182,7 +378,21 @@ class VPC(Blueprint):
                                       VpcId=vpc_id))
 
         self.create_nat_security_groups()
+        nat_gateways_per_az = self.local_parameters["NatGatewaysPerAZ"]
+        if nat_gateways_per_az < 1:
+            raise ValueError("NatGatewaysPerAZ must be at least 1.")
+        if self.local_parameters["EnableIpv6"]:
+            slots = IPV6_SUBNET_COUNT // IPV6_SLOT_SIZE
+            if self.local_parameters["AZCount"] > IPV6_SLOT_SIZE or \
+                    nat_gateways_per_az + 1 > slots:
+                raise ValueError(
+                    "EnableIpv6 supports at most %s AZs and %s "
+                    "NatGatewaysPerAZ." % (IPV6_SLOT_SIZE, slots - 1))
+        self.subnet_names = []
+        self.route_tables = {'public': [], 'private': []}
         subnets = {'public': [], 'private': []}
+        extra_subnets = dict(
+            (group, []) for group in range(1, nat_gateways_per_az))
         net_types = subnets.keys()
         zones = []
         for i in range(self.local_parameters["AZCount"]):
@@ -193,15 +403,14 @@ class VPC(Blueprint):
                 name_prefix = net_type.capitalize()
                 subnet_name = "%sSubnet%s" % (name_prefix, name_suffix)
                 subnets[net_type].append(subnet_name)
-                t.add_resource(ec2.Subnet(
-                    subnet_name,
-                    AvailabilityZone=az,
-                    VpcId=vpc_id,
-                    DependsOn=GW_ATTACH,
-                    CidrBlock=Select(i, Ref("%sSubnets" % name_prefix)),
-                    Tags=Tags(type=net_type)))
+                ipv6_slot = 0 if net_type == 'public' else 1
+                self.create_subnet(
+                    subnet_name, az,
+                    Select(i, Ref("%sSubnets" % name_prefix)),
+                    net_type, ipv6_slot * IPV6_SLOT_SIZE + i)
                 route_table_name = "%sRouteTable%s" % (name_prefix,
                                                        name_suffix)
+                self.route_tables[net_type].append(route_table_name)
                 t.add_resource(ec2.RouteTable(
                     route_table_name,
                     VpcId=vpc_id,
@@ -212,6 +421,9 @@ class VPC(Blueprint):
                     RouteTableId=Ref(route_table_name)))
 
                 route_name = '%sRoute%s' % (name_prefix, name_suffix)
+                self.create_ipv6_route(
+                    '%sIpv6Route%s' % (name_prefix, name_suffix),
+                    route_table_name, net_type)
                 if net_type == 'public':
                     # the public subnets are where the NAT instances live,
                     # so their default route needs to go to the AWS
@@ -225,24 +437,28 @@ class VPC(Blueprint):
                 else:
                     # Private subnets are where actual instances will live
                     # so their gateway needs to be through the nat instances
-                    t.add_resource(ec2.Route(
-                        route_name,
-                        RouteTableId=Ref(route_table_name),
-                        DestinationCidrBlock='0.0.0.0/0',
-                        InstanceId=If(
-                            "UseNatInstances",
-                            Ref(NAT_INSTANCE_NAME % name_suffix),
-                            Ref("AWS::NoValue")),
-                        NatGatewayId=If(
-                            "UseNatGateway",
-                            Ref(NAT_GATEWAY_NAME % name_suffix),
-                            Ref("AWS::NoValue"))))
+                    self.create_private_route(route_name, route_table_name,
+                                              name_suffix, name_suffix)
+
+            for group in range(1, nat_gateways_per_az):
+                public_subnet = subnets['public'][i]
+                extra_subnets[group].append(
+                    self.create_extra_private_subnet(i, az, group,
+                                                     public_subnet))
 
         for net_type in net_types:
             t.add_output(Output(
                 "%sSubnets" % net_type.capitalize(),
                 Value=Join(",",
                            [Ref(sn) for sn in subnets[net_type]])))
+            t.add_output(Output(
+                "%sRouteTables" % net_type.capitalize(),
+                Value=Join(",",
+                           [Ref(rt) for rt in self.route_tables[net_type]])))
+        for group in range(1, nat_gateways_per_az):
+            t.add_output(Output(
+                "PrivateSubnetsGroup%s" % group,
+                Value=Join(",", [Ref(sn) for sn in extra_subnets[group]])))
         self.template.add_output(Output(
             "AvailabilityZones",
             Value=Join(",", zones)))
@@ -292,9 +508,239 @@ class VPC(Blueprint):
             AllocationId=GetAtt(eip, 'AllocationId'),
             SubnetId=Ref(subnet_name),
         ))
+        self.create_nat_gateway_alarms(suffix)
 
         return nat_instance
 
+    def create_private_route(self, route_name, route_table_name,
+                             instance_suffix, gateway_suffix):
+        self.template.add_resource(ec2.Route(
+            route_name,
+            RouteTableId=Ref(route_table_name),
+            DestinationCidrBlock='0.0.0.0/0',
+            InstanceId=If(
+                "UseNatInstances",
+                Ref(NAT_INSTANCE_NAME % instance_suffix),
+                Ref("AWS::NoValue")),
+            NatGatewayId=If(
+                "UseNatGateway",
+                Ref(NAT_GATEWAY_NAME % gateway_suffix),
+                Ref("AWS::NoValue"))))
+
+    def create_extra_private_subnet(self, zone_id, az, group, public_subnet):
+        """Creates a private subnet behind an additional NAT Gateway.
+
+        The subnet gets its own route table, so its egress goes through a
+        separate NAT Gateway in the same AZ. When NAT instances are in use
+        it falls back to the AZ's NAT instance.
+
+        Returns:
+            str: The name of the subnet resource.
+        """
+        t = self.template
+        az_count = self.local_parameters["AZCount"]
+        suffix = NAT_GROUP_SUFFIX % (zone_id, group)
+        subnet_name = "PrivateSubnet%s" % suffix
+        route_table_name = "PrivateRouteTable%s" % suffix
+        subnet_index = (group - 1) * az_count + zone_id
+        self.create_subnet(
+            subnet_name, az,
+            Select(subnet_index, Ref("ExtraPrivateSubnets")),
+            'private', (group + 1) * IPV6_SLOT_SIZE + zone_id)
+        self.route_tables['private'].append(route_table_name)
+        t.add_resource(ec2.RouteTable(
+            route_table_name,
+            VpcId=VPC_ID,
+            Tags=[ec2.Tag('type', 'private')]))
+        t.add_resource(ec2.SubnetRouteTableAssociation(
+            "PrivateRouteTableAssociation%s" % suffix,
+            SubnetId=Ref(subnet_name),
+            RouteTableId=Ref(route_table_name)))
+
+        eip = t.add_resource(ec2.EIP(
+            'NATExternalIp%s' % suffix,
+            Condition="UseNatGateway",
+            Domain='vpc',
+            DependsOn=GW_ATTACH))
+        t.add_resource(ec2.NatGateway(
+            NAT_GATEWAY_NAME % suffix,
+            Condition="UseNatGateway",
+            AllocationId=GetAtt(eip, 'AllocationId'),
+            SubnetId=Ref(public_subnet),
+        ))
+        self.create_nat_gateway_alarms(suffix)
+        self.create_private_route("PrivateRoute%s" % suffix,
+                                  route_table_name, zone_id, suffix)
+        self.create_ipv6_route("PrivateIpv6Route%s" % suffix,
+                               route_table_name, 'private')
+        return subnet_name
+
+    def create_nat_gateway_alarms(self, suffix):
+        """Alarms on a NAT Gateway running out of ports or bandwidth."""
+        t = self.template
+        gateway = NAT_GATEWAY_NAME % suffix
+        topic = If("HasNatGatewayAlarmTopic",
+                   [Ref("NatGatewayAlarmTopic")],
+                   Ref("AWS::NoValue"))
+        alarms = (
+            ("ErrorPortAllocation", "Sum", 300, "0"),
+            ("PacketsDropCount", "Sum", 300,
+             Ref("NatGatewayPacketsDropThreshold")),
+            ("BytesOutToDestination", "Sum", 60,
+             Ref("NatGatewayBytesOutThreshold")),
+        )
+        for metric, statistic, period, threshold in alarms:
+            t.add_resource(Alarm(
+                "%s%sAlarm" % (gateway, metric),
+                Condition="UseNatGateway",
+                AlarmDescription=Join(
+                    "", [metric, " high on ", Ref(gateway)]),
+                Namespace="AWS/NATGateway",
+                MetricName=metric,
+                Dimensions=[MetricDimension(
+                    Name="NatGatewayId",
+                    Value=Ref(gateway))],
+                Statistic=statistic,
+                Period=period,
+                EvaluationPeriods=1,
+                Threshold=threshold,
+                ComparisonOperator="GreaterThanThreshold",
+                AlarmActions=topic,
+                OKActions=topic))
+
+    def create_flow_logs_delivery_stream(self):
+        """Creates the S3 bucket & Firehose stream flow logs end up in."""
+        t = self.template
+        t.add_resource(
+            s3.Bucket(
+                FLOW_LOGS_BUCKET,
+                BucketName=Ref("FlowLogsBucketName"),
+                Condition="EnableFlowLogs"))
+        t.add_output(
+            Output(
+                "FlowLogsBucket",
+                Value=Ref(FLOW_LOGS_BUCKET),
+                Condition="EnableFlowLogs"))
+
+        assume_role = Policy(
+            Statement=[
+                make_simple_assume_statement("firehose.amazonaws.com")])
+        t.add_resource(
+            iam.Role(
+                FLOW_LOGS_STREAM_ROLE,
+                AssumeRolePolicyDocument=assume_role,
+                Path="/",
+                Policies=[
+                    iam.Policy(
+                        PolicyName="s3-write",
+                        PolicyDocument=s3_write_policy(
+                            Ref(FLOW_LOGS_BUCKET))),
+                    iam.Policy(
+                        PolicyName="logs-write",
+                        PolicyDocument=logs_write_policy())],
+                Condition="EnableFlowLogs"))
+
+        prefix = Join("", [Ref("FlowLogsPrefix"), Ref("AWS::Region"), "/",
+                           VPC_ID, "/"])
+        t.add_resource(
+            firehose.DeliveryStream(
+                FLOW_LOGS_STREAM,
+                S3DestinationConfiguration=firehose.S3DestinationConfiguration(
+                    BucketARN=s3_arn(Ref(FLOW_LOGS_BUCKET)),
+                    BufferingHints=firehose.BufferingHints(
+                        IntervalInSeconds=Ref("FlowLogsBufferInterval"),
+                        SizeInMBs=Ref("FlowLogsBufferSize")),
+                    # CloudWatch Logs already gzips what it sends to the
+                    # stream, so don't gzip it again.
+                    CompressionFormat="UNCOMPRESSED",
+                    Prefix=prefix,
+                    RoleARN=GetAtt(FLOW_LOGS_STREAM_ROLE, "Arn")),
+                Condition="EnableFlowLogs"))
+
+    def create_flow_logs(self):
+        """Ships VPC flow logs to S3.
+
+        Flow logs are written to a CloudWatch Logs group, which is subscribed
+        to a Firehose delivery stream that batches them into S3.
+
+        Each S3 object is a series of gzipped CloudWatch Logs subscription
+        payloads, which zcat and most tools reading gzip decompress as one
+        stream. Each payload is a JSON envelope, ie::
+
+            {"messageType": "DATA_MESSAGE", "logGroup": "...",
+             "logStream": "eni-...", "logEvents": [
+                {"id": "...", "timestamp": 1500000000000,
+                 "message": "2 123456789012 eni-... 10.0.0.1 ..."}]}
+
+        with one space separated flow log record in each event's message.
+        Payloads with a messageType of CONTROL_MESSAGE have no records.
+        """
+        t = self.template
+        self.create_flow_logs_delivery_stream()
+
+        # Records only pass through CloudWatch Logs on their way to S3.
+        t.add_resource(
+            logs.LogGroup(
+                FLOW_LOGS_GROUP,
+                RetentionInDays=1,
+                Condition="EnableFlowLogs"))
+        t.add_resource(
+            iam.Role(
+                FLOW_LOGS_ROLE,
+                AssumeRolePolicyDocument=Policy(
+                    Statement=[make_simple_assume_statement(
+                        "vpc-flow-logs.amazonaws.com")]),
+                Path="/",
+                Policies=[
+                    iam.Policy(
+                        PolicyName="flow-logs",
+                        PolicyDocument=flow_logs_policy())],
+                Condition="EnableFlowLogs"))
+
+        logs_service = Join(".", ["logs", Ref("AWS::Region"),
+                                  "amazonaws.com"])
+        t.add_resource(
+            iam.Role(
+                FLOW_LOGS_SUBSCRIPTION_ROLE,
+                AssumeRolePolicyDocument=Policy(
+                    Statement=[make_simple_assume_statement(logs_service)]),
+                Path="/",
+                Policies=[
+                    iam.Policy(
+                        PolicyName="firehose-write",
+                        PolicyDocument=flow_logs_subscription_policy(
+                            GetAtt(FLOW_LOGS_STREAM, "Arn")))],
+                Condition="EnableFlowLogs"))
+        t.add_resource(
+            logs.SubscriptionFilter(
+                "FlowLogsSubscription",
+                DestinationArn=GetAtt(FLOW_LOGS_STREAM, "Arn"),
+                FilterPattern="",
+                LogGroupName=Ref(FLOW_LOGS_GROUP),
+                RoleArn=GetAtt(FLOW_LOGS_SUBSCRIPTION_ROLE, "Arn"),
+                Condition="EnableFlowLogs"))
+
+        flow_log_attrs = {
+            "DeliverLogsPermissionArn": GetAtt(FLOW_LOGS_ROLE, "Arn"),
+            "LogGroupName": Ref(FLOW_LOGS_GROUP),
+            "TrafficType": Ref("FlowLogsTrafficType"),
+        }
+        t.add_resource(
+            ec2.FlowLog(
+                "VPCFlowLog",
+                ResourceId=VPC_ID,
+                ResourceType="VPC",
+                Condition="EnableVPCFlowLogs",
+                **flow_log_attrs))
+        for subnet_name in self.subnet_names:
+            t.add_resource(
+                ec2.FlowLog(
+                    "%sFlowLog" % subnet_name,
+                    ResourceId=Ref(subnet_name),
+                    ResourceType="Subnet",
+                    Condition="EnableSubnetFlowLogs",
+                    **flow_log_attrs))
+
     def create_template(self):
         self.create_conditions()
         self.create_vpc()
@@ -302,3 +748,4 @@ class VPC(Blueprint):
         self.create_default_security_group()
         self.create_dhcp_options()
         self.create_network()
+        self.create_flow_logs()
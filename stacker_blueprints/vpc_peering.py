@@ -0,0 +1,130 @@
+# VPC Peering Stack
+#
+# Peers VPCs built by the VPC blueprint with each other, and routes the
+# traffic between them over the peering connections instead of out through
+# the NAT hosts and the public internet.
+#
+# Each VPC is given a name in the VPCs local parameter, along with the
+# AZCount and NatGatewaysPerAZ it was built with, which is how many route
+# tables it has. Its outputs are then passed in as <Name>VpcId,
+# <Name>CidrBlock, <Name>PublicRouteTables and <Name>PrivateRouteTables, ie:
+#
+#   - name: peering
+#     class_path: stacker_blueprints.vpc_peering.VPCPeering
+#     parameters:
+#       VPCs:
+#         Prod: {AZCount: 3}
+#         Stage: {AZCount: 2, NatGatewaysPerAZ: 2}
+#       ProdVpcId: prodVPC::VpcId
+#       ProdCidrBlock: prodVPC::CidrBlock
+#       ProdPublicRouteTables: prodVPC::PublicRouteTables
+#       ProdPrivateRouteTables: prodVPC::PrivateRouteTables
+#       StageVpcId: stageVPC::VpcId
+#       ...
+#
+# Only VPCs in the same account and region can be peered, and their
+# CidrBlocks must not overlap.
+
+import itertools
+import re
+
+from troposphere import Ref, Output, Select, ec2
+
+from stacker.blueprints.base import Blueprint
+
+PEERING_CONNECTION = "%sTo%sPeeringConnection"
+ROUTE_TABLE_TYPES = ("Public", "Private")
+VPC_NAME_PATTERN = re.compile(r"^[A-Za-z0-9]+$")
+
+
+class VPCPeering(Blueprint):
+    LOCAL_PARAMETERS = {
+        # The VPCs to peer, keyed by a name used to prefix their parameters.
+        # Values are a dict with the AZCount and NatGatewaysPerAZ (default: 1)
+        # the VPC was built with.
+        "VPCs": {
+            "type": dict,
+        },
+        # If set, the name of a VPC to peer every other VPC with, rather than
+        # peering each VPC with every other one.
+        "Hub": {
+            "type": str,
+            "default": "",
+        },
+    }
+
+    def _get_parameters(self):
+        parameters = {}
+        for name in self.local_parameters["VPCs"]:
+            parameters["%sVpcId" % name] = {
+                "type": "AWS::EC2::VPC::Id",
+                "description": "Id of the %s VPC." % name}
+            parameters["%sCidrBlock" % name] = {
+                "type": "String",
+                "description": "CIDR block of the %s VPC." % name}
+            for route_table_type in ROUTE_TABLE_TYPES:
+                parameters["%s%sRouteTables" % (name, route_table_type)] = {
+                    "type": "CommaDelimitedList",
+                    "description": "%s route tables in the %s VPC." % (
+                        route_table_type, name)}
+        return parameters
+
+    def route_table_counts(self, name):
+        """Returns how many public and private route tables a VPC has."""
+        attrs = self.local_parameters["VPCs"][name] or {}
+        try:
+            az_count = int(attrs["AZCount"])
+        except KeyError:
+            raise ValueError("VPC %s is missing AZCount." % name)
+        nat_gateways_per_az = int(attrs.get("NatGatewaysPerAZ", 1))
+        return {
+            "Public": az_count,
+            "Private": az_count * nat_gateways_per_az,
+        }
+
+    def get_peers(self):
+        """Returns the pairs of VPC names that should be peered."""
+        names = sorted(self.local_parameters["VPCs"])
+        for name in names:
+            if not VPC_NAME_PATTERN.match(name):
+                raise ValueError("VPC name %s must be alphanumeric." % name)
+        hub = self.local_parameters["Hub"]
+        if not hub:
+            return list(itertools.combinations(names, 2))
+        if hub not in names:
+            raise ValueError("Hub %s is not one of the VPCs." % hub)
+        return [(hub, name) for name in names if name != hub]
+
+    def create_routes(self, peering, source, destination):
+        """Routes traffic from one VPC to another through a peering."""
+        t = self.template
+        counts = self.route_table_counts(source)
+        for route_table_type in ROUTE_TABLE_TYPES:
+            route_tables = Ref(
+                "%s%sRouteTables" % (source, route_table_type))
+            for i in range(counts[route_table_type]):
+                t.add_resource(ec2.Route(
+                    "%sTo%s%sRoute%s" % (source, destination,
+                                         route_table_type, i),
+                    RouteTableId=Select(i, route_tables),
+                    DestinationCidrBlock=Ref("%sCidrBlock" % destination),
+                    VpcPeeringConnectionId=Ref(peering)))
+
+    def create_peering(self, requester, accepter):
+        t = self.template
+        peering = PEERING_CONNECTION % (requester, accepter)
+        t.add_resource(ec2.VPCPeeringConnection(
+            peering,
+            VpcId=Ref("%sVpcId" % requester),
+            PeerVpcId=Ref("%sVpcId" % accepter),
+            Tags=[ec2.Tag("Name", "%s-%s" % (requester, accepter))]))
+        t.add_output(Output(peering, Value=Ref(peering)))
+        self.create_routes(peering, requester, accepter)
+        self.create_routes(peering, accepter, requester)
+
+    def create_template(self):
+        peers = self.get_peers()
+        if not peers:
+            raise ValueError("VPCPeering needs at least two VPCs.")
+        for requester, accepter in peers:
+            self.create_peering(requester, accepter)